@@ -0,0 +1,47 @@
+"""
+Compares the JSON codecs of jsonCodec on a recorded style timeline, and both against writing the response bytes
+straight through as the json output format does.
+
+    python -m Benchmarks.bench_codec --minutes 40 --repeat 50
+"""
+import argparse
+import json
+import time
+from typing import Callable
+
+from Benchmarks.fixtures import make_timeline
+from RiotCrawler import jsonCodec
+
+
+def _time(func: Callable[[], object], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--minutes', type=int, default=40, help='Length of the timeline fixture in minutes')
+    parser.add_argument('--repeat', type=int, default=50, help='Number of times each operation is timed')
+    args = parser.parse_args()
+
+    timeline = make_timeline(1002440062, minutes=args.minutes)
+    data = json.dumps(timeline).encode()
+
+    print(f'{args.minutes} minute timeline, {len(data) / 1024:.0f} KiB, mean of {args.repeat} runs')
+    print(f'{"codec":<10}{"decode":>12}{"encode":>12}{"round trip":>14}')
+
+    for name in jsonCodec.available_codecs():
+        jsonCodec.use_codec(name)
+        decode = _time(lambda: jsonCodec.loads(data), args.repeat)
+        encode = _time(lambda: jsonCodec.dumps(timeline), args.repeat)
+        round_trip = _time(lambda: jsonCodec.dumps(jsonCodec.loads(data)), args.repeat)
+        print(f'{name:<10}{decode * 1000:9.2f} ms{encode * 1000:9.2f} ms{round_trip * 1000:11.2f} ms')
+
+    passthrough = _time(lambda: b'{"game":{},"timeline":' + data + b'}', args.repeat)
+    print(f'{"raw bytes":<10}{"":>12}{"":>12}{passthrough * 1000:11.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
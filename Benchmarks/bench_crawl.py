@@ -0,0 +1,191 @@
+"""
+Crawls a local stub of lolesports and ACS end to end and reports the wall time, requests a second, peak RSS and CPU
+time of each scenario. Each scenario runs in a fresh process so its peak RSS is its own.
+
+    python -m Benchmarks.bench_crawl --scenarios run_all crawl_json --latency 0.05 --error-rate 0.02
+
+Scenarios:
+    run_all     RiotCrawl.run_all over every schedule page the config asks for
+    batch_run   RiotCrawl.batch_crawl then RiotCrawl.get_json, renders the pages so Chromium must be installed
+    crawl_json  crawlJSON.crawl_json over --matches generated match history links
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+import warnings
+from typing import Dict, Union
+
+from Benchmarks.fixtures import make_match_links
+from Benchmarks.stub_server import StubServer
+from RiotCrawler.RiotCrawl import RiotCrawl
+from RiotCrawler.crawlJSON import crawl_json
+
+SCENARIOS = ('run_all', 'batch_run', 'crawl_json')
+
+_CONFIG = """[DEFAULT_INIT]
+region = {region}
+split = {split}
+week = {week}
+
+[LINK]
+lolesports = {lolesports}
+acs = {acs}
+
+[OTHERS]
+year = {year}
+
+[SESSION]
+backoff = 0.01
+"""
+
+
+def write_config(folder: str, server: StubServer, region: str = 'all', split: str = 'spring', week: str = 'all',
+                 year: int = 2017) -> str:
+    """
+    Writes a config.ini that crawls the stub server
+
+    :param folder: The folder to write config.ini in
+    :param server: The stub server to crawl
+    :return: The path of the config
+    """
+
+    path = os.path.join(folder, 'config.ini')
+    with open(path, 'w') as f:
+        f.write(_CONFIG.format(region=region, split=split, week=week, year=year, lolesports=server.lolesports,
+                               acs=server.url))
+
+    return path
+
+
+def _crawl(scenario: str, server_url: str, options: Dict[str, Union[int, float, str]]) -> int:
+    """
+    Runs one scenario in the current process
+
+    :return: The number of games crawled
+    """
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, 'out')
+
+        if scenario == 'crawl_json':
+            crawl_json(make_match_links(options['matches']), out, max_concurrency=options['concurrency'],
+                       acs_base=server_url)
+            return len(os.listdir(out))
+
+        with RiotCrawl(options['config']) as rc:
+            if scenario == 'run_all':
+                rc.run_all(out, max_concurrency=options['concurrency'], backend=options['backend'], resume=False,
+                           index=False)
+            else:
+                rc.make_links()
+                rc.match_links = tuple(rc.batch_crawl(num_process=options['processes']))
+                rc.get_json(path=out, max_concurrency=options['concurrency'])
+
+            return len(rc.match_links)
+
+
+def _measure(scenario: str, server_url: str, options: Dict[str, Union[int, float, str]],
+             results: multiprocessing.Queue) -> None:
+    """
+    Runs a scenario and puts its wall time, games, peak RSS and CPU time on results. Worker processes the scenario
+    starts are included in the CPU time and, the largest of them, in the peak RSS.
+    """
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        games = _crawl(scenario, server_url, options)
+    wall = time.perf_counter() - start
+
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    unit = 1 if sys.platform == 'darwin' else 1024
+
+    results.put({'scenario': scenario, 'wall': wall, 'games': games,
+                 'peak_rss': max(own.ru_maxrss, children.ru_maxrss) * unit,
+                 'cpu': own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime})
+
+
+def run_scenario(scenario: str, server: StubServer, options: Dict[str, Union[int, float, str]]) -> Dict[str, float]:
+    """
+    Runs a scenario in a fresh process against the stub server
+
+    :param scenario: One of SCENARIOS
+    :param server: A started stub server
+    :param options: concurrency, matches, backend and processes, and the path of the config for run_all and batch_run
+    :return: The wall time, games, requests, requests a second, peak RSS in bytes, CPU seconds and CPU percent of the
+             scenario
+    """
+
+    if scenario not in SCENARIOS:
+        raise ValueError(f'scenario must be one of {", ".join(SCENARIOS)}')
+
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    before = server.stats
+
+    process = context.Process(target=_measure, args=(scenario, server.url, options, results))
+    process.start()
+    result = results.get()
+    process.join()
+
+    after = server.stats
+    result.update({key: after[key] - before[key] for key in ('requests', 'errors', 'throttled')})
+    result['requests_per_sec'] = result['requests'] / result['wall']
+    result['cpu_percent'] = 100 * result['cpu'] / result['wall']
+
+    return result
+
+
+def format_result(result: Dict[str, float]) -> str:
+    return (f'{result["scenario"]:<11}{result["wall"]:8.2f} s {result["games"]:6d} games {result["requests"]:6d} req '
+            f'{result["requests_per_sec"]:8.1f} req/s {result["peak_rss"] / 2 ** 20:8.1f} MB peak '
+            f'{result["cpu"]:7.2f} s CPU ({result["cpu_percent"]:.0f}%)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', nargs='+', default=['run_all', 'crawl_json'], choices=SCENARIOS)
+    parser.add_argument('--region', default='all', help='The region of the config crawled by run_all and batch_run')
+    parser.add_argument('--split', default='spring')
+    parser.add_argument('--week', default='all')
+    parser.add_argument('--year', type=int, default=2017)
+    parser.add_argument('--matches', type=int, default=100, help='Number of match links crawl_json fetches')
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds of latency added to each JSON response')
+    parser.add_argument('--page-latency', type=float, default=None,
+                        help='Seconds of latency added to each schedule and match page, --latency if not given')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with a 500')
+    parser.add_argument('--concurrency', type=int, default=16, help='max_concurrency of the JSON fetch')
+    parser.add_argument('--backend', default='direct', choices=('direct', 'render'), help='backend of run_all')
+    parser.add_argument('--processes', type=int, default=4, help='num_process of batch_run')
+    parser.add_argument('--seed', type=int, default=0, help='Seeds which requests --error-rate fails')
+    parser.add_argument('--json', help='Path to also write the results to as JSON')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            StubServer(latency=args.latency, page_latency=args.page_latency, error_rate=args.error_rate,
+                       seed=args.seed) as server:
+        options = {'config': write_config(tmp, server, args.region, args.split, args.week, args.year),
+                   'concurrency': args.concurrency, 'matches': args.matches, 'backend': args.backend,
+                   'processes': args.processes}
+        results = [run_scenario(scenario, server, options) for scenario in args.scenarios]
+
+    print(f'{args.latency * 1000:.0f} ms latency per request, {args.error_rate:.0%} of requests fail')
+    for result in results:
+        print(format_result(result))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
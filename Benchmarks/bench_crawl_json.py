@@ -0,0 +1,42 @@
+"""
+Compares the serial and asynchronous crawl_json paths against a local stub of the ACS stats server.
+
+    python -m Benchmarks.bench_crawl_json --matches 100 --latency 0.05 --concurrency 16
+"""
+import argparse
+import tempfile
+import time
+
+from Benchmarks.fixtures import make_match_links
+from Benchmarks.stub_server import StubServer
+from RiotCrawler.crawlJSON import crawl_json
+
+
+def _time_crawl(links: list, acs_base: str, max_concurrency: int = None) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        crawl_json(links, tmp, max_concurrency=max_concurrency, acs_base=acs_base)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--matches', type=int, default=50, help='Number of match links to crawl')
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds of latency added to each response')
+    parser.add_argument('--concurrency', type=int, default=16, help='max_concurrency for the async path')
+    args = parser.parse_args()
+
+    links = make_match_links(args.matches)
+
+    with StubServer(latency=args.latency) as server:
+        serial = _time_crawl(links, server.url)
+        concurrent = _time_crawl(links, server.url, args.concurrency)
+
+    print(f'{args.matches} matches, {args.latency * 1000:.0f} ms latency per request')
+    for label, seconds in (('serial', serial), (f'async (concurrency={args.concurrency})', concurrent)):
+        print(f'{label + ":":<26}{seconds:8.2f} s {args.matches / seconds:8.1f} matches/sec')
+    print(f'{"speedup:":<26}{serial / concurrent:8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
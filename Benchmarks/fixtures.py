@@ -0,0 +1,189 @@
+import hashlib
+import random
+from typing import Dict, List
+
+TEAM_TAGS = ('TSM', 'C9', 'TL', 'CLG', 'FOX', 'IMT', 'P1', 'NV', 'FLY', 'DIG')
+ROLES = ('Top', 'Jungle', 'Mid', 'ADC', 'Support')
+EVENT_TYPES = ('ITEM_PURCHASED', 'SKILL_LEVEL_UP', 'WARD_PLACED', 'CHAMPION_KILL', 'ITEM_DESTROYED', 'WARD_KILL')
+
+
+def make_game(game_id: int, realm: str = 'TRLH1', minutes: int = 35) -> Dict:
+    """
+    Creates a game JSON document shaped like the ACS v1/stats/game response
+
+    :param game_id: The id of the game, also used to seed the generated values
+    :param realm: The platform id of the game
+    :param minutes: The length of the game in minutes
+    :return: A dict of the game data
+    """
+
+    rng = random.Random(game_id)
+    blue, red = rng.sample(TEAM_TAGS, 2)
+    blue_win = rng.random() > 0.5
+
+    teams = [{'teamId': team_id, 'win': 'Win' if win else 'Fail', 'firstBlood': rng.random() > 0.5,
+              'towerKills': rng.randint(0, 11), 'inhibitorKills': rng.randint(0, 3),
+              'baronKills': rng.randint(0, 2), 'dragonKills': rng.randint(0, 4),
+              'bans': [{'championId': rng.randint(1, 500), 'pickTurn': i + 1} for i in range(5)]}
+             for team_id, win in ((100, blue_win), (200, not blue_win))]
+
+    participants = list()
+    identities = list()
+    for pid in range(1, 11):
+        team_id = 100 if pid <= 5 else 200
+        tag = blue if pid <= 5 else red
+        participants.append({'participantId': pid, 'teamId': team_id, 'championId': rng.randint(1, 500),
+                             'spell1Id': 4, 'spell2Id': rng.choice((7, 11, 12, 14)),
+                             'stats': {'participantId': pid, 'win': (team_id == 100) == blue_win,
+                                       'kills': rng.randint(0, 12), 'deaths': rng.randint(0, 8),
+                                       'assists': rng.randint(0, 15), 'goldEarned': rng.randint(7000, 18000),
+                                       'totalMinionsKilled': rng.randint(20, 350),
+                                       'totalDamageDealtToChampions': rng.randint(3000, 40000),
+                                       'champLevel': rng.randint(11, 18)},
+                             'timeline': {'participantId': pid, 'role': 'SOLO', 'lane': ROLES[(pid - 1) % 5].upper()}})
+        identities.append({'participantId': pid,
+                           'player': {'summonerName': f'{tag} Player{pid}', 'profileIcon': rng.randint(1, 3000)}})
+
+    return {'gameId': game_id, 'platformId': realm, 'gameCreation': 1500000000000 + game_id,
+            'gameDuration': minutes * 60 + rng.randint(0, 59), 'queueId': 0, 'mapId': 11, 'seasonId': 9,
+            'gameVersion': f'7.{rng.randint(1, 24)}.196.6073', 'gameMode': 'CLASSIC', 'gameType': 'CUSTOM_GAME',
+            'teams': teams, 'participants': participants, 'participantIdentities': identities}
+
+
+def _make_event(rng: random.Random, event_type: str, timestamp: int) -> Dict:
+    """
+    Creates a timeline event with the keys ACS gives events of its type, which differ from type to type
+    """
+
+    event = {'type': event_type, 'timestamp': timestamp}
+
+    if event_type in ('ITEM_PURCHASED', 'ITEM_DESTROYED'):
+        event.update(participantId=rng.randint(1, 10), itemId=rng.randint(1001, 3800))
+    elif event_type == 'SKILL_LEVEL_UP':
+        event.update(participantId=rng.randint(1, 10), skillSlot=rng.randint(1, 4), levelUpType='NORMAL')
+    elif event_type == 'WARD_PLACED':
+        event.update(creatorId=rng.randint(1, 10), wardType=rng.choice(('YELLOW_TRINKET', 'CONTROL_WARD')))
+    elif event_type == 'WARD_KILL':
+        event.update(killerId=rng.randint(1, 10), wardType=rng.choice(('YELLOW_TRINKET', 'CONTROL_WARD')))
+    else:
+        killer, victim = rng.sample(range(1, 11), 2)
+        event.update(killerId=killer, victimId=victim,
+                     position={'x': rng.randint(0, 14800), 'y': rng.randint(0, 14800)},
+                     assistingParticipantIds=rng.sample(range(1, 11), rng.randint(0, 4)))
+
+    return event
+
+
+def make_timeline(game_id: int, minutes: int = 35, events_per_frame: int = 25) -> Dict:
+    """
+    Creates a timeline JSON document shaped like the ACS v1/stats/game/.../timeline response
+
+    :param game_id: The id of the game, also used to seed the generated values
+    :param minutes: The number of one minute frames to create
+    :param events_per_frame: The number of events in each frame
+    :return: A dict of the timeline data
+    """
+
+    rng = random.Random(-game_id)
+    frames = list()
+    gold = [500] * 10
+    xp = [0] * 10
+    cs = [0] * 10
+
+    for minute in range(minutes + 1):
+        participant_frames = dict()
+        for i in range(10):
+            participant_frames[str(i + 1)] = {'participantId': i + 1,
+                                              'position': {'x': rng.randint(0, 14800), 'y': rng.randint(0, 14800)},
+                                              'currentGold': rng.randint(0, 2000), 'totalGold': gold[i],
+                                              'level': min(18, 1 + xp[i] // 1000), 'xp': xp[i],
+                                              'minionsKilled': cs[i], 'jungleMinionsKilled': rng.randint(0, 4),
+                                              'dominionScore': 0, 'teamScore': 0}
+            gold[i] += rng.randint(250, 500)
+            xp[i] += rng.randint(300, 600)
+            cs[i] += rng.randint(4, 10)
+
+        events: List[Dict] = list()
+        if minute:
+            for _ in range(events_per_frame):
+                events.append(_make_event(rng, rng.choice(EVENT_TYPES), (minute - 1) * 60000 + rng.randint(0, 59999)))
+            events.sort(key=lambda e: e['timestamp'])
+
+        frames.append({'participantFrames': participant_frames, 'events': events, 'timestamp': minute * 60000})
+
+    return {'frames': frames, 'frameInterval': 60000}
+
+
+def make_match_links(count: int, realm: str = 'TRLH1', first_id: int = 1002440000) -> List[str]:
+    """
+    Creates match history links in the same format as the ones found on lolesports
+
+    :param count: The number of links to create
+    :param realm: The platform id used in the links
+    :param first_id: The game id of the first link
+    :return: A list of match history links
+    """
+
+    return [f'https://matchhistory.na.leagueoflegends.com/en/#match-details/{realm}/{game_id}'
+            f'?gameHash={game_id:016x}' for game_id in range(first_id, first_id + count)]
+
+
+def _path_seed(path: str) -> int:
+    return int.from_bytes(hashlib.blake2b(path.encode(), digest_size=4).digest(), 'little')
+
+
+def match_page_paths(schedule_path: str, matches: int = 4) -> List[str]:
+    """
+    The paths of the match pages a stub schedule page links to
+
+    :param schedule_path: The path of the schedule page, as /en_US/na-lcs/na_2017_spring/schedule/regular_season/1
+    :param matches: The number of matches on each schedule page
+    :return: A list of paths to match pages, under the same league and season as the schedule page
+    """
+
+    season = schedule_path.split('/schedule/')[0]
+    week = f'{_path_seed(schedule_path):08x}'
+    return [f'{season}/matches/{week}/{i}' for i in range(1, matches + 1)]
+
+
+def match_page_games(match_path: str, games: int = 2) -> List[int]:
+    """
+    The game ids of the match history links on a stub match page
+
+    :param match_path: The path of the match page
+    :param games: The number of games in each match
+    :return: A list of game ids, the same every time for the same path
+    """
+
+    first_id = 1000000000 + _path_seed(match_path) % 10 ** 7 * 10
+    return list(range(first_id, first_id + games))
+
+
+def make_schedule_page(schedule_path: str, matches: int = 4) -> str:
+    """
+    Creates the HTML of a schedule page linking to its match pages, the way lolesports does once rendered
+
+    :param schedule_path: The path of the schedule page
+    :param matches: The number of matches on the page
+    :return: The HTML of the page
+    """
+
+    anchors = ''.join(f'<li><a href="{path}">Match {i}</a></li>'
+                      for i, path in enumerate(match_page_paths(schedule_path, matches), 1))
+    return f'<html><head><title>Schedule</title></head><body><ul class="schedule">{anchors}</ul></body></html>'
+
+
+def make_match_page(match_path: str, games: int = 2, realm: str = 'TRLH1') -> str:
+    """
+    Creates the HTML of a match page with a stats link to the match history page of each game
+
+    :param match_path: The path of the match page
+    :param games: The number of games in the match
+    :param realm: The platform id used in the links
+    :return: The HTML of the page
+    """
+
+    links = [f'https://matchhistory.na.leagueoflegends.com/en/#match-details/{realm}/{game_id}'
+             f'?gameHash={game_id:016x}' for game_id in match_page_games(match_path, games)]
+    anchors = ''.join(f'<a class="stats-link" href="{link}">Game {i}</a>' for i, link in enumerate(links, 1))
+    return f'<html><head><title>Match</title></head><body><div class="games">{anchors}</div></body></html>'
@@ -0,0 +1,228 @@
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from Benchmarks.fixtures import make_game, make_match_page, make_schedule_page, make_timeline
+
+GAME_PATH = re.compile(r'^/v1/stats/game/(?P<realm>[^/]+)/(?P<game_id>\d+)(?P<timeline>/timeline)?$')
+SCHEDULE_PATH = re.compile(r'^/[^/]+/[^/]+/[^/]+/schedule/.+$')
+MATCH_PATH = re.compile(r'^/[^/]+/[^/]+/[^/]+/matches/.+$')
+REGULAR_SEASON_WEEK = re.compile(r'/schedule/regular_season/(\d+)$')
+
+
+@lru_cache(maxsize=256)
+def _game_bytes(realm: str, game_id: int) -> bytes:
+    return json.dumps(make_game(game_id, realm)).encode()
+
+
+@lru_cache(maxsize=256)
+def _timeline_bytes(game_id: int) -> bytes:
+    return json.dumps(make_timeline(game_id)).encode()
+
+
+@lru_cache(maxsize=1024)
+def _schedule_bytes(path: str, matches: int) -> bytes:
+    return make_schedule_page(path, matches).encode()
+
+
+@lru_cache(maxsize=1024)
+def _match_bytes(path: str, games: int) -> bytes:
+    return make_match_page(path, games).encode()
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+    def do_GET(self, head: bool = False):
+        self.head = head
+        path = self.path.split('?')[0]
+        page = SCHEDULE_PATH.match(path) or MATCH_PATH.match(path)
+
+        with self.server.lock:
+            self.server.stats['requests'] += 1
+            self.server.in_flight += 1
+            throttle = self.server.max_in_flight and self.server.in_flight > self.server.max_in_flight
+            if throttle:
+                self.server.stats['throttled'] += 1
+            error = not throttle and self.server.rng.random() < self.server.error_rate
+            if error:
+                self.server.stats['errors'] += 1
+
+        try:
+            latency = self.server.page_latency if page else self.server.latency
+            if latency:
+                time.sleep(latency)
+
+            if throttle:
+                self._send(429, b'{}', retry_after=self.server.retry_after)
+            elif error:
+                self._send(500, b'{}')
+            else:
+                self._get(path)
+        finally:
+            with self.server.lock:
+                self.server.in_flight -= 1
+
+    def _count(self, kind: str) -> None:
+        with self.server.lock:
+            self.server.stats[kind] += 1
+
+    def _get(self, path: str):
+        week = REGULAR_SEASON_WEEK.search(path)
+        if week is not None and self.server.weeks and int(week.group(1)) > self.server.weeks:
+            self._send(404, b'{}')
+            return
+
+        if SCHEDULE_PATH.match(path):
+            self._count('schedule')
+            self._send(200, _schedule_bytes(path, self.server.matches), content_type='text/html;charset=UTF-8')
+            return
+
+        if MATCH_PATH.match(path):
+            self._count('match')
+            self._send(200, _match_bytes(path, self.server.games), content_type='text/html;charset=UTF-8')
+            return
+
+        match = GAME_PATH.match(path)
+        if match is None:
+            self._send(404, b'{}')
+            return
+
+        if match.group('timeline'):
+            self._count('timeline')
+            body = _timeline_bytes(int(match.group('game_id')))
+        else:
+            self._count('game')
+            body = _game_bytes(match.group('realm'), int(match.group('game_id')))
+
+        etag = '"{}"'.format(hashlib.sha1(body).hexdigest())
+        if self.headers.get('If-None-Match') == etag:
+            self._send(304, b'', etag)
+            return
+
+        self._send(200, body, etag)
+
+    def _send(self, status: int, body: bytes, etag: str = None, retry_after: float = None,
+              content_type: str = 'application/json;charset=UTF-8'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if etag is not None:
+            self.send_header('ETag', etag)
+        if retry_after is not None:
+            self.send_header('Retry-After', str(retry_after))
+        self.end_headers()
+        if not self.head:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(object):
+    """
+    A local stand in for lolesports and the ACS stats server. Serves generated game and timeline JSON on the same
+    paths as acs.leagueoflegends.com, and schedule and match pages on the paths makeLinks creates under
+    StubServer.lolesports: every schedule page links to matches match pages and every match page to the match history
+    links of games games. The same path always gives the same page, so crawls of the stub are reproducible. If weeks
+    is given regular season weeks after it are answered 404, as pages that do not exist. HEAD requests are answered
+    as GET requests without the body.
+
+    Each request waits a fixed latency, page_latency for schedule and match pages. If max_in_flight is given requests
+    beyond that many at once are answered 429 with a Retry-After, the way Riot throttles, and error_rate of the
+    requests are answered 500.
+
+    >>> with StubServer(latency=0.05) as server:
+    ...     crawl_json(links, acs_base=server.url)
+    """
+
+    def __init__(self, latency: float = 0.0, host: str = '127.0.0.1', port: int = 0, max_in_flight: int = 0,
+                 retry_after: int = 1, page_latency: float = None, error_rate: float = 0.0, matches: int = 4,
+                 games: int = 2, seed: int = 0, weeks: int = 0):
+        """
+        :param latency: Seconds to wait before answering each request, simulates the round trip to Riot
+        :param host: The host to bind to
+        :param port: The port to bind to, 0 picks a free port
+        :param max_in_flight: The most requests answered at once before throttling, 0 never throttles
+        :param retry_after: The whole seconds of the Retry-After sent with a 429
+        :param page_latency: Seconds to wait before answering a schedule or match page, latency if None
+        :param error_rate: The share of requests answered with a 500, between 0 and 1
+        :param matches: The number of match pages each schedule page links to
+        :param games: The number of games on each match page
+        :param seed: Seeds which requests error_rate fails
+        :param weeks: The number of weeks of every regular season, 0 for any number
+        """
+
+        self.httpd = ThreadingHTTPServer((host, port), _StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency
+        self.httpd.page_latency = latency if page_latency is None else page_latency
+        self.httpd.max_in_flight = max_in_flight
+        self.httpd.retry_after = retry_after
+        self.httpd.error_rate = error_rate
+        self.httpd.rng = random.Random(seed)
+        self.httpd.matches = matches
+        self.httpd.games = games
+        self.httpd.weeks = weeks
+        self.httpd.in_flight = 0
+        self.httpd.lock = threading.Lock()
+        self.httpd.stats = dict.fromkeys(('requests', 'throttled', 'errors', 'schedule', 'match', 'game', 'timeline'),
+                                         0)
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    @property
+    def lolesports(self) -> str:
+        """
+        The base of the schedule pages, for the lolesports setting of config.ini
+        """
+
+        return f'{self.url}en_US/'
+
+    @property
+    def stats(self) -> dict:
+        """
+        The number of requests, of requests throttled or failed, and of each kind of page answered
+        """
+
+        with self.httpd.lock:
+            return dict(self.httpd.stats)
+
+    @property
+    def requests(self) -> int:
+        return self.httpd.stats['requests']
+
+    @property
+    def throttled(self) -> int:
+        return self.httpd.stats['throttled']
+
+    @property
+    def errors(self) -> int:
+        return self.httpd.stats['errors']
+
+    def start(self) -> 'StubServer':
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> 'StubServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
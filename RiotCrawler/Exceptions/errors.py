@@ -20,3 +20,7 @@ class SplitError(Exception):
 
 class BatchError(Exception):
     pass
+
+
+class LinksNotFoundError(Exception):
+    pass
@@ -1,11 +1,31 @@
+import os
+import time
 import warnings
-from typing import Union
-
-from .batchProcessing import batch_process_links
-from .crawlJSON import crawl_json
-from .makeLinks import create_links
-from .matchCrawler import get_match_history_links
+from collections import Counter
+from functools import partial
+from typing import Callable, Dict, Iterable, Iterator, List, Union
+
+from .batchProcessing import _direct_page_processor, _page_processor, batch_process_links, parse_tier_settings, \
+    stream_process_links, tiered_process_links
+from .browserPool import BrowserPagePool
+from .crawlJSON import ACS_BASE, crawl_json, fetch_game
+from .crawlMetrics import METRICS, MetricsReporter, format_summary
+from .crawlSession import create_session, parse_session_settings
+from .directLinks import API_BASE, direct_match_pages, direct_stats_links, get_direct_match_history_links
+from .gameRecord import GameRecord
+from .jobLedger import GAME, LEDGER_FILE, MATCH, SCHEDULE, JobLedger
+from .linkDedup import BloomFilter, SeenSet
+from .makeLinks import create_links, verify_setting
+from .matchCrawler import get_match_history_links, render_match_pages, render_stats_links
+from .matchIndex import INDEX_FILE, IndexingSink, MatchIndex, rebuild_index
+from .memoryBudget import LinkSpool, MemoryBudget, parse_memory_settings
+from .pageRender import DEFAULT_FALLBACK_SLEEP, DEFAULT_READY_TIMEOUT, summarize_timings
 from .parseConfig import parse_config
+from .pipeline import stream_pipeline
+from .responseCache import finished_matches_policy
+from .seasonCalendar import SeasonCalendar
+from .storageSinks import FORMATS, StorageSink, open_sink
+from .workQueue import WorkQueue, format_summary as format_queue_summary, run_worker
 
 
 class RiotCrawl(object):
@@ -28,7 +48,7 @@ class RiotCrawl(object):
     >>> rc = RiotCrawl('./path_to_config.ini')
     >>> schedule_links = rc.make_links(inplace=False)
     >>> match_links = rc.match_history_links(schedule_links, inplace=False)
-    >>> json = rc.get_json(match_links)
+    >>> games = list(rc.get_json(match_links))
 
     ***** WARNING *****
 
@@ -38,107 +58,727 @@ class RiotCrawl(object):
 
     >>> rc.run_all(path='path_to_folder')
 
-    Links can be run as a batch using batch_run see warning in method for why this could be a problem.
+    Links can be run in several processes using batch_run see warning in method for why this could be a problem.
+
+    >>> rc.batch_run(links, num_process=10)
+
+    Every stage makes its requests through RiotCrawl.session, a pooled keep-alive session with timeouts and retries
+    configured from config.ini. Close it when finished, or use the crawler as a context manager.
+
+    >>> with RiotCrawl('./path_to_config.ini') as rc:
+    ...     rc.run_all(path='path_to_folder')
+
+    run_all keeps a ledger of every page and game it has finished in the download folder. If a run dies, running the
+    same config again only fetches what is missing. An incremental run also looks again at the pages of unfinished
+    seasons for new weeks and games.
+
+    >>> rc.run_all(path='path_to_folder', incremental=True)
+
+    stream runs every stage at once, each match history link is fetched as soon as it is found and the games are
+    yielded as they finish rather than after the whole crawl
+
+    >>> for game in rc.stream():
+    ...     print(game['gameId'])
+
+    tiered_run renders the pages in a small pool of processes and fetches the JSON in a large pool of threads, each
+    sized from the WORKERS section of config.ini
+
+    >>> for link in rc.tiered_run(path='path_to_folder'):
+    ...     pass
 
-    >>> rc.batch_run(links, batch_size, num_process)
+    coordinate and work crawl one config across several hosts through a workQueue.WorkQueue they share
+
+    >>> rc.coordinate('/shared/work_queue.sqlite')  # on one host
+    >>> rc.work('/shared/work_queue.sqlite', '/shared/path_to_folder')  # on every host
+
+    run_all also indexes every game it saves, so saved games can be found without opening their files
+
+    >>> rc.query(region='lck', year=2017, split='summer', team='SKT')
     """
 
-    def __init__(self, config_file_path: str):
+    def __init__(self, config_file_path: str, ledger: str = None):
         """
         Creates the RiotCrawl class from a config_file path.
         :param config_file_path: Path to the config.ini file
+        :param ledger: Path to a jobLedger.JobLedger file to checkpoint every stage in, see RiotCrawl.use_ledger
         """
 
         self.config_dict = parse_config(config_file_path)
         self.schedule_links = None
         self.match_links = None
+        self.session_settings = parse_session_settings(self.config_dict)
+        self.tier_settings = parse_tier_settings(self.config_dict)
+        self.memory_settings = parse_memory_settings(self.config_dict)
+        self.session = create_session(**self.session_settings)
+        self.render_timings = list()
+        self.browser_pool = None
+        self.ledger = None
+        self.index = None
+        self.page_errors = dict()
+
+        if ledger is not None:
+            self.use_ledger(ledger)
+
+        try:
+            self.acs_base = self.config_dict['extra']['acs']
+        except KeyError:
+            self.acs_base = ACS_BASE
+
+        try:
+            self.api_base = self.config_dict['extra']['api']
+        except KeyError:
+            self.api_base = API_BASE
+
+        self.calendar = SeasonCalendar(self.config_dict.get('extra', {}).get('calendar'))
+
+        self.output_format = self.config_dict.get('extra', {}).get('format', 'json')
+        if self.output_format not in FORMATS:
+            raise ValueError(f'format in config.ini must be one of {", ".join(FORMATS)}')
+
+    def use_ledger(self, path: str) -> JobLedger:
+        """
+        Checkpoints every following stage in a jobLedger.JobLedger. Schedule pages, match pages and games already done
+        in the ledger are not fetched again, and a page or game that fails is recorded instead of stopping the crawl.
 
-    def make_links(self, inplace: bool = True) -> Union[None, tuple]:
+        :param path: Path to the ledger file, created if it does not exist
+        :return: The ledger, also stored in RiotCrawl.ledger
         """
-        Creates links to the schedule page from which the match history links can be found
+
+        if self.ledger is not None:
+            self.ledger.close()
+
+        self.ledger = JobLedger(path)
+        if self.index is not None:
+            self.index.ledger = self.ledger
+        return self.ledger
+
+    def use_index(self, path: str) -> MatchIndex:
+        """
+        Adds every game saved from now on to a matchIndex.MatchIndex, see RiotCrawl.query
+
+        :param path: Path to the index file, created if it does not exist
+        :return: The index, also stored in RiotCrawl.index
+        """
+
+        if self.index is not None:
+            self.index.close()
+
+        self.index = MatchIndex(path, self.ledger)
+        return self.index
+
+    def query(self, **filters) -> List[dict]:
+        """
+        Finds saved games in RiotCrawl.index by region, year, split, week, team, game_id, patch, min_duration or
+        max_duration, see matchIndex.MatchIndex.query
+
+        :return: The index rows of the games
+        """
+
+        if self.index is None:
+            raise ValueError('query requires an index, call use_index or rebuild_index first')
+
+        return self.index.query(**filters)
+
+    def rebuild_index(self, path: str, processes: int = None) -> int:
+        """
+        Indexes the games already saved in a download folder again, reading the files in parallel, and uses the index
+        from then on. See matchIndex.rebuild_index
+
+        :param path: The download folder
+        :param processes: The number of processes reading files, the number of CPUs if None
+        :return: The number of games indexed
+        """
+
+        if self.index is not None:
+            self.index.close()
+            self.index = None
+
+        index_path = os.path.join(path, INDEX_FILE)
+        ledger_path = self.ledger.path if self.ledger is not None else None
+        count = rebuild_index(path, index_path, processes, ledger_path)
+        self.use_index(index_path)
+        return count
+
+    def make_links(self, inplace: bool = True, verify: bool = None, workers: int = 16) -> Union[None, tuple]:
+        """
+        Creates links to the schedule page from which the match history links can be found. Only the weeks and playoff
+        rounds in RiotCrawl.calendar are created, kept in the file set by calendar in config.ini if there is one.
 
         :param inplace: Inplace tuple creation and stored in RiotCrawl.schedule_links. Else returns tuple of links.
+        :param verify: If True the pages not checked before are checked with HEAD requests and the missing ones
+                       dropped, see seasonCalendar.verify_plan. If None they are checked unless verify = false in
+                       config.ini
+        :param workers: The number of pages checked at once
         :return: None or a tuple of links to the schedule page
         """
 
+        if verify is None:
+            verify = verify_setting(self.config_dict)
+
+        links = create_links(self.config_dict, self.calendar, verify, self.session, workers)
+
+        if self.ledger is not None:
+            self.ledger.add(SCHEDULE, links)
+
         if inplace:
-            self.schedule_links = create_links(self.config_dict)
+            self.schedule_links = links
             return None
         else:
-            return create_links(self.config_dict)
+            return links
 
     def match_history_links(self, schedule_links: tuple = None, xpath: str = '/matches/',
                             css_selector: str = '.stats-link',
-                            inplace: bool = True) -> Union[None, tuple]:
+                            inplace: bool = True, ready_timeout: float = DEFAULT_READY_TIMEOUT,
+                            fallback_sleep: int = DEFAULT_FALLBACK_SLEEP,
+                            tabs: int = None, backend: str = 'render', workers: int = None) -> Union[None, tuple]:
         """
-        Finds the links to the full match history pages and returns them as a tuple or modifies inplace.
+        Finds the links to the full match history pages and returns them as a tuple or modifies inplace. The time taken
+        to render each page is recorded in RiotCrawl.render_timings. A page that fails is skipped and its error stored
+        in RiotCrawl.page_errors under its link, so one bad page does not stop the crawl.
+
+        The 'direct' backend reads the links from the page source, its embedded JSON and the lolesports API with plain
+        HTTP requests and only renders the pages the links could not be extracted from, see
+        directLinks.get_direct_match_history_links.
+
+        If tabs is given the pages are rendered concurrently in that many tabs of one headless browser, kept in
+        RiotCrawl.browser_pool and reused by later calls until RiotCrawl.close(). workers crawls that many pages at
+        once with either backend: in as many tabs when rendering, in as many threads for the direct backend, which
+        renders only the pages it can not read, one at a time while the threads are idle. The links are returned in the
+        same order whatever the number of workers.
 
         :param schedule_links: Links to the schedule page of lolesports from which match history links can be found
         :param xpath: The xpath selector for the match history links. Don't change unless Riot modifies their website
         :param css_selector: The css selector from which the specific stats links can be found.
         :param inplace: If True will store results in RiotCrawl.match_links. Else returns a tuple of links
+        :param ready_timeout: Seconds to wait for the links to appear on each page before falling back
+        :param fallback_sleep: Seconds to sleep when rendering again after the links did not appear, 0 disables it
+        :param tabs: The number of browser tabs to render pages in at once, None renders one page at a time
+        :param backend: One of 'render' or 'direct'
+        :param workers: The number of pages crawled at once, the tabs when rendering if tabs is not given
         :return: None or a tuple of links
         """
 
+        if backend not in ('render', 'direct'):
+            raise ValueError('backend must be one of render or direct')
+
+        if workers is not None and (not isinstance(workers, int) or workers < 1):
+            raise ValueError('workers must be an int greater than 0')
+
         if schedule_links is None:
             schedule_links = self.schedule_links
 
+        if backend == 'direct':
+            workers = workers or 1
+            links = get_direct_match_history_links(schedule_links, xpath, css_selector, self.session, self.api_base,
+                                                   True, ready_timeout, fallback_sleep, self.render_timings,
+                                                   ledger=self.ledger, workers=workers, errors=self.page_errors)
+        else:
+            if tabs is None and workers is not None and workers > 1:
+                tabs = workers
+            links = self._render_match_history_links(schedule_links, xpath, css_selector, ready_timeout,
+                                                     fallback_sleep, tabs, errors=self.page_errors)
+
         if inplace:
-            self.match_links = get_match_history_links(schedule_links, xpath, css_selector)
+            self.match_links = links
             return None
         else:
-            return get_match_history_links(schedule_links, xpath, css_selector)
+            return links
+
+    def _render_match_history_links(self, schedule_links: tuple, xpath: str, css_selector: str, ready_timeout: float,
+                                    fallback_sleep: int, tabs: Union[None, int], session=None,
+                                    on_found: Callable[[List[str]], None] = None,
+                                    errors: Dict[str, Exception] = None) -> tuple:
+        """
+        Renders the pages through the session, or through RiotCrawl.browser_pool when tabs is given
 
-    def get_json(self, match_links: tuple = None, path: Union[None, str] = None) -> Union[None, dict]:
+        :param session: The session to render with, RiotCrawl.session if None
+        :param on_found: Called with the match history links of each match page as soon as they are found
+        :param errors: If provided a page that fails is stored in it under its link and skipped
+        :return: A tuple of links to the match history pages
         """
-        Will return the JSON information as a dict that includes the total match history as well as the timeline stats
 
-        :param match_links: Links to the match history page
-        :param path: A folder path to save the JSON information.
-        :return: None or a dict of JSON stats
+        if session is None:
+            session = self.session
+
+        pool = None
+        if tabs is not None:
+            if self.browser_pool is None or self.browser_pool.size != tabs:
+                self._close_browser_pool()
+                self.browser_pool = BrowserPagePool(tabs, cache=self.session.response_cache,
+                                                    limiter=self.session.rate_limiter)
+            pool = self.browser_pool
+            pool.ready_timeout = ready_timeout
+            pool.fallback_sleep = fallback_sleep
+
+        return get_match_history_links(schedule_links, xpath, css_selector, session, ready_timeout,
+                                       fallback_sleep, self.render_timings, pool, self.ledger, on_found,
+                                       errors=errors)
+
+    def get_json(self, match_links: Iterable[str] = None, path: Union[None, str] = None,
+                 max_concurrency: int = None) -> Union[None, Iterator[GameRecord]]:
+        """
+        Will return the JSON information of every game as a gameRecord.GameRecord that holds the total match history
+        and the timeline stats. The games are returned as an iterator that fetches them lazily as it is consumed, so
+        only a few are held in memory at once, and the timeline of a game is only decoded when it is used.
+
+        :param match_links: Links to the match history page, any iterable such as a memoryBudget.LinkSpool
+        :param path: A folder path to save the JSON information in the format of RiotCrawl.output_format
+        :param max_concurrency: If provided the JSON is fetched with this many matches at once
+        :return: None or an iterator of the JSON stats of each game in the order of match_links
         """
 
         if match_links is None:
             match_links = self.match_links
 
         if path is not None:
-            crawl_json(match_links, path)
+            with self.open_sink(path) as sink:
+                crawl_json(match_links, sink, max_concurrency, self.acs_base, self.session, self.ledger)
+        else:
+            return crawl_json(match_links, max_concurrency=max_concurrency, acs_base=self.acs_base,
+                              session=self.session)
+
+    def open_sink(self, path: str) -> StorageSink:
+        """
+        Opens the sink games are saved to, chosen by the format setting of config.ini: json, jsonl, jsonl.gz, jsonl.zst
+        or parquet, see storageSinks.open_sink
+
+        :param path: The folder to save to
+        :return: A storageSinks.StorageSink to be closed by the caller, adding the games to RiotCrawl.index if one is
+                 in use
+        """
+
+        sink = open_sink(path, self.output_format)
+        if self.index is not None:
+            sink = IndexingSink(sink, self.index)
+
+        return sink
+
+    def stream(self, path: Union[None, str] = None, schedule_links: tuple = None, backend: str = 'render',
+               xpath: str = '/matches/', css_selector: str = '.stats-link', tabs: int = None, fetchers: int = 8,
+               queue_size: int = 64, ready_timeout: float = DEFAULT_READY_TIMEOUT,
+               fallback_sleep: int = DEFAULT_FALLBACK_SLEEP) -> Iterator[Union[str, GameRecord]]:
+        """
+        Crawls the pages and fetches the JSON at the same time. The match history links are handed to fetchers threads
+        as soon as each match page is crawled, so games are saved or yielded while the rest of the schedule is still
+        being crawled, and the full lists of links are never held in memory. See pipeline.stream_pipeline.
+
+        The pages are crawled in a thread of their own with a session made for it, the JSON is fetched through
+        RiotCrawl.session. Stopping the iteration early stops the crawl.
+
+        :param path: A folder path to save the JSON information in the format of RiotCrawl.output_format, if None the
+                     JSON is yielded
+        :param schedule_links: Links to the schedule page, if None RiotCrawl.schedule_links or the links of the config
+        :param backend: The backend used to find the match history links, one of 'render' or 'direct'
+        :param xpath: The xpath selector for the match history links. Don't change unless Riot modifies their website
+        :param css_selector: The css selector from which the specific stats links can be found.
+        :param tabs: The number of browser tabs to render pages in at once, None renders one page at a time
+        :param fetchers: The number of games fetched at once
+        :param queue_size: The number of match history links that may wait to be fetched before the crawl is paused
+        :param ready_timeout: Seconds to wait for the links to appear on each page before falling back
+        :param fallback_sleep: Seconds to sleep when rendering again after the links did not appear, 0 disables it
+        :return: An iterator of the gameRecord.GameRecord of each game, or of the match history link of each game
+                 saved
+        """
+
+        if backend not in ('render', 'direct'):
+            raise ValueError('backend must be one of render or direct')
+
+        if schedule_links is None:
+            schedule_links = self.schedule_links if self.schedule_links is not None else self.make_links(inplace=False)
+
+        def _discover(on_found: Callable[[List[str]], None]) -> None:
+            session = create_session(**self.session_settings, limiter=self.session.rate_limiter)
+            try:
+                if backend == 'direct':
+                    get_direct_match_history_links(schedule_links, xpath, css_selector, session, self.api_base, True,
+                                                   ready_timeout, fallback_sleep, self.render_timings,
+                                                   ledger=self.ledger, on_found=on_found)
+                else:
+                    self._render_match_history_links(schedule_links, xpath, css_selector, ready_timeout,
+                                                     fallback_sleep, tabs, session, on_found)
+            finally:
+                session.close()
+
+        sink = self.open_sink(path) if path is not None else None
+
+        return _closing(stream_pipeline(_discover, self._game_fetcher(path, sink), fetchers, queue_size), sink)
+
+    def tiered_run(self, path: Union[None, str] = None, schedule_links: tuple = None, render_processes: int = None,
+                   render_tabs: int = None, json_workers: int = None, queue_size: int = None,
+                   backend: str = 'render', seen: Union[None, SeenSet, BloomFilter] = None, xpath: str = '/matches/',
+                   css_selector: str = '.stats-link') -> Iterator[Union[str, GameRecord]]:
+        """
+        Crawls the pages and fetches the JSON in two pools sized on their own. Pages are rendered in a small pool of
+        processes, as each runs a Chromium of its own, and the match history links they find are fetched by a large
+        pool of threads through RiotCrawl.session, so the network can be kept busy without running out of memory. The
+        tiers are joined by a bounded queue and rendering is paused while it is full. See
+        batchProcessing.tiered_process_links.
+
+        Every size not passed is read from the WORKERS section of config.ini, see RiotCrawl.tier_settings. The render
+        processes are replaced after pages_per_worker pages and fitted in the rss_budget of the MEMORY section, see
+        RiotCrawl.memory_settings.
+
+        :param path: A folder path to save the JSON information in the format of RiotCrawl.output_format, if None the
+                     JSON is yielded
+        :param schedule_links: Links to the schedule page, if None RiotCrawl.schedule_links or the links of the config
+        :param render_processes: The number of processes rendering pages
+        :param render_tabs: The number of browser tabs each render process renders in, 0 renders one page at a time
+        :param json_workers: The number of threads fetching games at once
+        :param queue_size: The number of match history links that may wait to be fetched before rendering is paused
+        :param backend: The backend the processes find the match history links with, one of 'render' or 'direct'. The
+                        direct backend reads the pages with plain HTTP requests and renders only those it can not read
+        :param seen: The links already crawled, see batchProcessing.tiered_process_links
+        :param xpath: The xpath selector for the match history links. Don't change unless Riot modifies their website
+        :param css_selector: The css selector from which the specific stats links can be found.
+        :return: An iterator of the gameRecord.GameRecord of each game, or of the match history link of each game
+                 saved
+        """
+
+        if backend not in ('render', 'direct'):
+            raise ValueError('backend must be one of render or direct')
+
+        if schedule_links is None:
+            schedule_links = self.schedule_links if self.schedule_links is not None else self.make_links(inplace=False)
+
+        if backend == 'direct':
+            processor = partial(_direct_page_processor, api_base=self.api_base, xpath=xpath, css_selector=css_selector)
         else:
-            return crawl_json(match_links)
+            processor = partial(_page_processor, xpath=xpath, css_selector=css_selector)
 
-    def run_all(self, path: str) -> None:
+        settings = dict(self.tier_settings)
+        for key, value in (('render_processes', render_processes), ('render_tabs', render_tabs),
+                           ('json_workers', json_workers), ('queue_size', queue_size)):
+            if value is not None:
+                settings[key] = value
+
+        ledger_path = self.ledger.path if self.ledger is not None else None
+        sink = self.open_sink(path) if path is not None else None
+
+        stream = tiered_process_links(list(schedule_links), self._game_fetcher(path, sink),
+                                      settings['render_processes'], settings['json_workers'], settings['queue_size'],
+                                      self.session_settings, self.render_timings, settings['render_tabs'] or None,
+                                      ledger_path, processor, seen, self.memory_settings['pages_per_worker'],
+                                      memory=self.memory_budget())
+        return _closing(stream, sink)
+
+    def memory_budget(self) -> Union[None, MemoryBudget]:
+        """
+        :return: The memoryBudget.MemoryBudget of rss_budget in config.ini, None if it is not set
+        """
+
+        if not self.memory_settings['rss_budget']:
+            return None
+
+        return MemoryBudget(self.memory_settings['rss_budget'])
+
+    def coordinate(self, queue_path: str, schedule_links: tuple = None, wait: bool = True,
+                   poll: float = 5.0) -> Dict[str, Dict[str, int]]:
+        """
+        Puts the schedule links on a workQueue.WorkQueue for workers on any host to crawl with RiotCrawl.work, and
+        waits for them to finish. Once done the match history links of the crawl are kept in RiotCrawl.match_links.
+        Coordinating a queue again only adds the links it does not have yet, so a crawl can be picked up after a crash.
+
+        :param queue_path: Path of the SQLite file of the queue, on a filesystem every worker can reach
+        :param schedule_links: Links to the schedule page, if None RiotCrawl.schedule_links or the links of the config
+        :param wait: If True the progress is printed every poll seconds until no task is pending or leased
+        :param poll: Seconds between checks of the progress
+        :return: The number of tasks of each status in each stage, see workQueue.WorkQueue.summary
+        """
+
+        if schedule_links is None:
+            schedule_links = self.schedule_links if self.schedule_links is not None else self.make_links(inplace=False)
+
+        with WorkQueue(queue_path) as queue:
+            print(f'Queued {queue.put(SCHEDULE, schedule_links)} schedule pages')
+
+            last = None
+            while wait and not queue.is_finished():
+                time.sleep(poll)
+                summary = queue.summary()
+                if summary != last:
+                    print(format_queue_summary(summary))
+                    last = summary
+
+            if wait:
+                self.match_links = tuple(queue.keys(GAME))
+
+            return queue.summary()
+
+    def work(self, queue_path: str, path: str, backend: str = 'direct', worker: str = None, batch: int = 1,
+             lease: float = 300.0, poll: float = 1.0, idle_timeout: float = None, xpath: str = '/matches/',
+             css_selector: str = '.stats-link', ready_timeout: float = DEFAULT_READY_TIMEOUT,
+             fallback_sleep: int = DEFAULT_FALLBACK_SLEEP) -> Dict[str, int]:
+        """
+        Crawls the tasks of a workQueue.WorkQueue filled by RiotCrawl.coordinate until none are left, see
+        workQueue.run_worker. Schedule and match pages are crawled with the backend and the links found are put back on
+        the queue, games are saved in the format of RiotCrawl.output_format. Every worker can save to the same folder,
+        each game is written to a file of its own or to files named after the process writing them.
+
+        :param queue_path: Path of the SQLite file of the queue
+        :param path: A folder path to save the JSON information in, shared by the workers
+        :param backend: The backend used to find the match history links, one of 'render' or 'direct'
+        :param worker: The name of the worker, the host name and process id if None
+        :param batch: The number of tasks leased at once
+        :param lease: Seconds to finish a task in before it is handed to another worker
+        :param poll: Seconds to wait before asking again when no task is waiting
+        :param idle_timeout: If provided the worker stops after this many seconds without a task
+        :param xpath: The xpath selector for the match history links. Don't change unless Riot modifies their website
+        :param css_selector: The css selector from which the specific stats links can be found.
+        :param ready_timeout: Seconds to wait for the links to appear on each page before falling back
+        :param fallback_sleep: Seconds to sleep when rendering again after the links did not appear, 0 disables it
+        :return: The number of tasks done and failed, {'done': count, 'failed': count}
+        """
+
+        if backend not in ('render', 'direct'):
+            raise ValueError('backend must be one of render or direct')
+
+        timing = dict(ready_timeout=ready_timeout, fallback_sleep=fallback_sleep, timings=self.render_timings)
+        if backend == 'direct':
+            stats = Counter()
+            handlers = {SCHEDULE: partial(direct_match_pages, session=self.session, xpath=xpath, fallback=True,
+                                          stats=stats, **timing),
+                        MATCH: partial(direct_stats_links, session=self.session, css_selector=css_selector,
+                                       api_base=self.api_base, fallback=True, stats=stats, **timing)}
+        else:
+            handlers = {SCHEDULE: partial(render_match_pages, session=self.session, xpath=xpath, **timing),
+                        MATCH: partial(render_stats_links, session=self.session, css_selector=css_selector,
+                                       **timing)}
+
+        with self.open_sink(path) as sink, WorkQueue(queue_path) as queue:
+            def _game(link: str) -> List[str]:
+                fetch_game(self.session, link, sink, self.acs_base)
+                return list()
+
+            handlers[GAME] = _game
+            return run_worker(queue, handlers, worker, batch, lease, poll, idle_timeout)
+
+    def _game_fetcher(self, path: Union[None, str],
+                      sink: Union[None, StorageSink]) -> Callable[[str], Union[None, str, GameRecord]]:
+        """
+        :return: A function fetching the game of a match history link into sink, returning the game if path is None,
+                 else the link once saved. Games already done in the ledger are skipped when saving
+        """
+
+        def _fetch(link: str) -> Union[None, str, GameRecord]:
+            if path is not None and self.ledger is not None and self.ledger.is_done(GAME, link):
+                return None
+
+            game = fetch_game(self.session, link, sink, self.acs_base, self.ledger)
+            if path is None:
+                return game
+            if self.ledger is None or self.ledger.is_done(GAME, link):
+                return link
+
+        return _fetch
+
+    def run_all(self, path: str, max_concurrency: int = None, backend: str = 'render', resume: bool = True,
+                incremental: bool = False, index: bool = True, progress: bool = False, metrics_jsonl: str = None,
+                prometheus: str = None, workers: int = None, low_memory: bool = None) -> None:
         """
         Will run all of the commands necessary to download the JSON data and save it to the path specified.
 
+        In low memory mode the pages are crawled and the games fetched at once with RiotCrawl.tiered_run, so no game
+        waits in memory for the crawl of the pages to finish, the worker processes crawling the pages keep to the
+        rss_budget and pages_per_worker of config.ini, and the links seen are kept in a linkDedup.BloomFilter of
+        seen_capacity links rather than a set. The links of the games saved are spilled to a memoryBudget.LinkSpool
+        kept in RiotCrawl.match_links, which RiotCrawl.get_json reads as it fetches.
+
         :param path: A path to a folder for saving the information
+        :param max_concurrency: If provided the JSON is fetched asynchronously with this many matches at once
+        :param backend: The backend used to find the match history links, one of 'render' or 'direct'
+        :param resume: If True and no ledger is in use, the ledger in path is used so a rerun only fetches what is
+                       missing
+        :param incremental: If True schedule and match pages of unfinished seasons, or that had no links, are crawled
+                            again to pick up new weeks and games. Games already saved are still skipped
+        :param index: If True and no index is in use, every game saved is added to the index in path
+        :param progress: If True a line of the count, rate and p95 latency of every stage is redrawn each second
+        :param metrics_jsonl: If provided a snapshot of crawlMetrics.METRICS is appended to this JSON Lines file each
+                              second
+        :param prometheus: If provided crawlMetrics.METRICS is written to this file each second in the Prometheus text
+                           format
+        :param workers: The number of schedule and match pages crawled at once, see RiotCrawl.match_history_links. In
+                        low memory mode the number of browser tabs when rendering
+        :param low_memory: If True the crawl runs in low memory mode, if None low_memory in config.ini decides
         :return: None
         """
         warnings.warn('This may take a long time depending on amount of game information to collect')
 
+        METRICS.reset()
+        if progress or metrics_jsonl is not None or prometheus is not None:
+            with MetricsReporter(bar=progress, jsonl=metrics_jsonl, prometheus=prometheus):
+                self._run_all(path, max_concurrency, backend, resume, incremental, index, workers, low_memory)
+        else:
+            self._run_all(path, max_concurrency, backend, resume, incremental, index, workers, low_memory)
+
+        print(f'Stages: {format_summary(METRICS.summary())}')
+        print('Done!!!')
+
+    def _run_all(self, path: str, max_concurrency: Union[None, int], backend: str, resume: bool, incremental: bool,
+                 index: bool, workers: Union[None, int], low_memory: Union[None, bool]) -> None:
+
+        if resume and self.ledger is None:
+            self.use_ledger(os.path.join(path, LEDGER_FILE))
+
+        if index and self.index is None:
+            self.use_index(os.path.join(path, INDEX_FILE))
+
+        if incremental:
+            if self.ledger is None:
+                raise ValueError('incremental requires a ledger, pass resume=True or call use_ledger first')
+            reopened = self.reopen_unfinished()
+            print(f'Looking again at {reopened} unfinished pages')
+
         self.make_links()
         print('Links made')
+
+        if low_memory is None:
+            low_memory = self.memory_settings['low_memory']
+        if low_memory:
+            print('Getting the match history links and JSON information together, may take a while')
+            self._close_match_links()
+            self.match_links = LinkSpool(self.memory_settings['spill_dir'])
+            tabs = workers if backend == 'render' and workers is not None and workers > 1 else None
+            seen = BloomFilter(self.memory_settings['seen_capacity'])
+            self.match_links.extend(self.tiered_run(path, render_tabs=tabs, json_workers=max_concurrency,
+                                                    backend=backend, seen=seen))
+            print(f'{len(self.match_links)} games saved')
+        else:
+            self._match_history_then_json(path, max_concurrency, backend, workers)
+
+        if self.ledger is not None:
+            print(f'Ledger: {self.ledger.summary()}')
+
+    def _match_history_then_json(self, path: str, max_concurrency: Union[None, int], backend: str,
+                                 workers: Union[None, int]) -> None:
         print('Getting the match history links, may take a while')
-        self.match_history_links()
+        self.match_history_links(backend=backend, workers=workers)
         print('Match history links made')
+        if self.page_errors:
+            print(f'{len(self.page_errors)} pages failed and were skipped, see RiotCrawl.page_errors')
+        print('Render times: {pages} pages, {ready} ready before timeout, p50 {p50:.2f}s, p95 {p95:.2f}s, '
+              'max {max:.2f}s'.format(**summarize_timings(self.render_timings)))
         print('Getting JSON information now, may take a while')
-        self.get_json(path=path)
-        print('Done!!!')
+        self.get_json(path=path, max_concurrency=max_concurrency)
+
+    def reopen_unfinished(self) -> int:
+        """
+        Sets the schedule and match pages in the ledger that may still gain games back to pending. These are pages of
+        a season that is not over yet and pages that had no links when they were crawled.
+
+        :return: The number of pages reopened
+        """
+
+        def _unfinished(link: str, found: List[str]) -> bool:
+            return not found or not finished_matches_policy(link)
+
+        return self.ledger.reopen(SCHEDULE, _unfinished) + self.ledger.reopen(MATCH, _unfinished)
 
     @staticmethod
-    def batch_run(links: Union[list, tuple] = None, batch_size: int = None, num_process: int = None) -> list:
+    def batch_run(links: Union[list, tuple] = None, batch_size: int = None, num_process: int = None,
+                  tabs: int = None) -> list:
         """
         ****WARNING****
         This should only be run when with a computer that can handle the multi processes and I/O. If you run into
         problems, try running one region, or sets of weeks at a time.
 
-        Processes the links passed using multiprocessing in a batch manner. Best performance when tested was with
-        batch_size of 2 with 10 processes. This was not fully tested. Smaller batches and larger process should
-        increase performance.
+        Processes the links passed using multiprocessing. Each schedule and match page is handed to the next idle
+        process, so there is no batch size to tune and one slow page does not hold up any other, see
+        batchProcessing.stream_process_links. Every process creates a session of its own with the default settings,
+        see RiotCrawl.batch_crawl for a run with the session, ledger and memory settings of a crawler.
 
         :param links: A list or tuple of links to the schedule page of lolesports
-        :param batch_size: The size to cut up the lists into
-        :param num_process: The number of processes to be passed to _multi_process
-        :return: A list of links to the stats match history pages
+        :param batch_size: Deprecated and ignored
+        :param num_process: The number of processes, the number of CPUs if None
+        :param tabs: If provided each process renders its pages in a browser of this many tabs started once
+        :return: A list of links to the stats match history pages without duplicates
+        """
+
+        return batch_process_links(links, batch_size, num_process, tabs=tabs)
+
+    def batch_crawl(self, links: Union[list, tuple] = None, num_process: int = None, tabs: int = None,
+                    low_memory: bool = None, xpath: str = '/matches/',
+                    css_selector: str = '.stats-link') -> Union[list, LinkSpool]:
+        """
+        RiotCrawl.batch_run with the settings of this crawler. The processes keep to the session settings of config.ini
+        and checkpoint their pages in RiotCrawl.ledger, and the render times are kept in RiotCrawl.render_timings.
+
+        The MEMORY section of config.ini can replace each process after pages_per_worker pages and fit the processes
+        in an rss_budget. In low memory mode the links are spilled to a memoryBudget.LinkSpool instead of a list.
+
+        :param links: A list or tuple of links to the schedule page, if None RiotCrawl.schedule_links or the links of
+                      the config
+        :param num_process: The number of processes, the number of CPUs if None
+        :param tabs: If provided each process renders its pages in a browser of this many tabs started once
+        :param low_memory: If True the links are returned in a LinkSpool, if None low_memory in config.ini decides
+        :param xpath: The xpath selector for the match history links. Don't change unless Riot modifies their website
+        :param css_selector: The css selector from which the specific stats links can be found.
+        :return: A list, or LinkSpool, of links to the stats match history pages without duplicates
+        """
+
+        if links is None:
+            links = self.schedule_links if self.schedule_links is not None else self.make_links(inplace=False)
+
+        ledger_path = self.ledger.path if self.ledger is not None else None
+        pages_per_worker = self.memory_settings['pages_per_worker']
+
+        if low_memory is None:
+            low_memory = self.memory_settings['low_memory']
+        if not low_memory:
+            return batch_process_links(links, None, num_process, self.session_settings, self.render_timings, tabs,
+                                       ledger_path, pages_per_worker=pages_per_worker, memory=self.memory_budget(),
+                                       xpath=xpath, css_selector=css_selector)
+
+        spool = LinkSpool(self.memory_settings['spill_dir'])
+        try:
+            processor = partial(_page_processor, xpath=xpath, css_selector=css_selector)
+            spool.extend(stream_process_links(links, num_process, self.session_settings, self.render_timings, tabs,
+                                              ledger_path, processor, pages_per_worker=pages_per_worker,
+                                              memory=self.memory_budget()))
+        except BaseException:
+            spool.close()
+            raise
+
+        return spool
+
+    def _close_match_links(self) -> None:
+        if isinstance(self.match_links, LinkSpool):
+            self.match_links.close()
+
+    def _close_browser_pool(self) -> None:
+        if self.browser_pool is not None:
+            self.browser_pool.close()
+            self.browser_pool = None
+
+    def close(self) -> None:
         """
+        Closes the shared session and browser page pool along with any headless browser that was started, and deletes
+        the file of match history links spilled in low memory mode
+
+        :return: None
+        """
+
+        self._close_browser_pool()
+        self._close_match_links()
+        self.session.close()
+
+        if self.ledger is not None:
+            self.ledger.close()
+            self.ledger = None
+
+        if self.index is not None:
+            self.index.close()
+            self.index = None
+
+    def __enter__(self) -> 'RiotCrawl':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
 
-        return batch_process_links(links, batch_size, num_process)
+def _closing(stream: Iterator, sink: Union[None, StorageSink]) -> Iterator:
+    try:
+        yield from stream
+    finally:
+        if sink is not None:
+            sink.close()
@@ -1,85 +1,340 @@
+import os
+import queue
+import warnings
+from collections import deque
+from functools import partial
 from multiprocessing import Pool
-from typing import Union, List
-from requests_html import HTMLSession
+from multiprocessing.util import Finalize
+from typing import Any, Callable, Dict, Iterator, Tuple, Union, List
+
 from RiotCrawler.Exceptions.errors import BatchError
+from RiotCrawler.browserPool import BrowserPagePool, _match_pages, _stats_links
+from RiotCrawler.crawlMetrics import METRICS
+from RiotCrawler.crawlSession import DEFAULT_SESSION_SETTINGS, create_session
+from RiotCrawler.directLinks import API_BASE, direct_match_pages, direct_stats_links
+from RiotCrawler.jobLedger import MATCH, SCHEDULE, JobLedger, checkpoint, checkpoint_async
+from RiotCrawler.linkDedup import BloomFilter, SeenSet
+from RiotCrawler.matchCrawler import render_match_pages, render_stats_links
+from RiotCrawler.memoryBudget import MemoryBudget
+from RiotCrawler.pipeline import stream_pipeline
+
+# The render tier is kept small as every process runs its own Chromium, the JSON tier is large as fetching is I/O bound
+DEFAULT_TIER_SETTINGS = {'render_processes': min(4, os.cpu_count() or 1), 'render_tabs': 0, 'json_workers': 32,
+                         'queue_size': 256}
+
+_worker_session = None
+_worker_pool = None
+_worker_ledger = None
+
+
+def _init_worker(session_settings: Dict[str, Union[int, float]] = None, tabs: int = None,
+                 ledger_path: str = None) -> None:
+    """
+    Pool initializer that creates the one session, and browser page pool if tabs is given, each worker process uses
+    for every page it is given. Both are closed when the worker exits so no Chromium process is left behind.
+
+    :param session_settings: Keyword arguments for create_session, see crawlSession.parse_session_settings
+    :param tabs: The number of tabs in the browser page pool of the worker, None renders through the session
+    :param ledger_path: Path to the jobLedger.JobLedger of the crawl, opened by each worker
+    :return: None
+    """
+    global _worker_session, _worker_pool, _worker_ledger
+
+    _worker_session = create_session(**(session_settings or {}))
+    Finalize(_worker_session, _worker_session.close, exitpriority=10)
+
+    if tabs:
+        _worker_pool = BrowserPagePool(size=tabs, cache=_worker_session.response_cache,
+                                       limiter=_worker_session.rate_limiter)
+        Finalize(_worker_pool, _worker_pool.close, exitpriority=10)
+
+    if ledger_path:
+        _worker_ledger = JobLedger(ledger_path)
+        Finalize(_worker_ledger, _worker_ledger.close, exitpriority=10)
+
 
+def parse_tier_settings(config_dict: Dict[str, Dict[str, str]]) -> Dict[str, int]:
+    """
+    Reads the sizes of the render and JSON tiers out of the extra section of the config dict, using the defaults for
+    any not provided
+
+    :param config_dict: Dict parsed from the config.ini file
+    :return: A dict of render_processes, render_tabs, json_workers and queue_size
+    """
+
+    settings = DEFAULT_TIER_SETTINGS.copy()
+    extra = config_dict.get('extra', {})
+
+    for key in DEFAULT_TIER_SETTINGS:
+        if key in extra:
+            try:
+                settings[key] = int(extra[key])
+            except ValueError:
+                raise ValueError(f'{key} in config.ini must be of type int')
+
+    for key in ('render_processes', 'json_workers', 'queue_size'):
+        if settings[key] < 1:
+            raise ValueError(f'{key} in config.ini must be greater than 0')
 
-def _create_batch(links: Union[list, tuple] = None, batch_size: int = None) -> List[Union[list, tuple]]:
+    return settings
+
+
+def _worker_settings(session_settings: Union[None, Dict[str, Union[int, float]]],
+                     num_process: int) -> Dict[str, Union[int, float]]:
     """
-    Creates batches of links and returns a list of them
+    Splits the per host request rate and requests in flight of the session settings between the worker processes, so
+    the pool as a whole keeps to the budget a single session would
 
-    :param links: A tuple or list of links that can be iterated over
-    :param batch_size: How big of batches to create
-    :return: A list of tuple/lists of size batch_size
+    :param session_settings: Keyword arguments for create_session, may be None
+    :param num_process: The number of worker processes
+    :return: The session settings of each worker
     """
 
-    return [links[i:i + batch_size] for i in range(0, len(links), batch_size)]
+    settings = dict(DEFAULT_SESSION_SETTINGS, **(session_settings or {}))
+    settings['rate'] = settings['rate'] / num_process
+    if settings['host_concurrency']:
+        settings['host_concurrency'] = max(1, settings['host_concurrency'] // num_process)
+
+    return settings
 
 
-def _link_processor(batch_links: List[Union[list, tuple]]) -> list:
+def _page_processor(stage: str, link: str, xpath: str = '/matches/',
+                    css_selector: str = '.stats-link') -> Tuple[str, List[str], list, dict]:
     """
-    Processes links in a batch manner, similar to get_match_history_links
+    Crawls one schedule or match page in a worker process
 
-    :param batch_links: A list that contains either lists or tuples
-    :return: A list of links to the match history stats pages
+    :param stage: jobLedger.SCHEDULE for a schedule page or jobLedger.MATCH for a match page
+    :param link: The link of the page
+    :param xpath: The xpath selector for the match history links
+    :param css_selector: The css selector from which the specific stats links can be found
+    :return: The stage, the links found on the page, a list of the RenderTimings of the page and the metrics the worker
+             recorded since its last page, see crawlMetrics.Metrics.drain
     """
 
-    results = []
-    session = HTMLSession()
+    if _worker_session is None:
+        _init_worker()
+
+    timings = []
+
+    if _worker_pool is not None:
+        if stage == SCHEDULE:
+            find = partial(_match_pages, pool=_worker_pool, xpath=xpath, timings=timings)
+        else:
+            find = partial(_stats_links, pool=_worker_pool, css_selector=css_selector, timings=timings)
+        found = _worker_pool.run(checkpoint_async(_worker_ledger, stage, link, find))
+    else:
+        if stage == SCHEDULE:
+            find = partial(render_match_pages, session=_worker_session, xpath=xpath, timings=timings)
+        else:
+            find = partial(render_stats_links, session=_worker_session, css_selector=css_selector, timings=timings)
+        found = checkpoint(_worker_ledger, stage, link, find)
+
+    return stage, found or list(), timings, METRICS.drain()
 
-    for l in batch_links:
-        r = session.get(l)
-        r.html.render(sleep=10)
-        tmp_next = r.html.xpath('//a[contains(@href, "/matches/")]')
-        next_link = list()
 
-        for tl in tmp_next:
-            next_link.extend(([h for h in tl.absolute_links]))
+def _direct_page_processor(stage: str, link: str, api_base: str = API_BASE, xpath: str = '/matches/',
+                           css_selector: str = '.stats-link') -> Tuple[str, List[str], list, dict]:
+    """
+    Reads the links of one schedule or match page in a worker process with plain HTTP requests, rendering the page
+    only if they can not be read from it, see directLinks.get_direct_match_history_links
+
+    :param stage: jobLedger.SCHEDULE for a schedule page or jobLedger.MATCH for a match page
+    :param link: The link of the page
+    :param api_base: The base address of the lolesports API
+    :param xpath: The xpath selector for the match history links
+    :param css_selector: The css selector from which the specific stats links can be found
+    :return: The same as _page_processor
+    """
 
-        for nl in next_link:
-            r = session.get(nl)
-            r.html.render(sleep=10)
-            stat_link = r.html.find('{}'.format('.stats-link'))
+    if _worker_session is None:
+        _init_worker()
 
-            for stat in stat_link:
-                results.extend([h for h in stat.absolute_links])
+    timings = []
 
-    return results
+    if stage == SCHEDULE:
+        find = partial(direct_match_pages, session=_worker_session, xpath=xpath, timings=timings)
+    else:
+        find = partial(direct_stats_links, session=_worker_session, css_selector=css_selector, api_base=api_base,
+                       timings=timings)
+    found = checkpoint(_worker_ledger, stage, link, find)
 
+    return stage, found or list(), timings, METRICS.drain()
 
-def _multi_process(batch: List[Union[list, tuple]] = None, num_process: int = None) -> list:
+
+def stream_process_links(links: Union[list, tuple], num_process: int = None,
+                         session_settings: Dict[str, Union[int, float]] = None, timings: list = None,
+                         tabs: int = None, ledger_path: str = None,
+                         processor: Callable[[str, str], Tuple[str, List[str], list]] = _page_processor,
+                         seen: Union[None, SeenSet, BloomFilter] = None, pages_per_worker: int = None,
+                         memory: MemoryBudget = None) -> Iterator[str]:
     """
-    Creates the multiprocess for running batch links
+    Crawls the schedule pages in a pool of worker processes one page at a time. Every schedule page and every match
+    page found on one is a separate task, and a worker that finishes a page takes the next one waiting, so a slow page
+    only holds up its own worker. Match pages are handed out before schedule pages so match history links start coming
+    back as soon as the first schedule page is crawled. Links are yielded as they are found, each only once.
+
+    For crawls that run for hours each worker can be replaced after pages_per_worker pages, closing its browser with
+    whatever memory it has grown to. With a memory budget the number of workers is fitted to it, and no page is handed
+    out while the crawl is over it until a page in flight finishes.
 
-    :param batch: The batch of links to process
-    :param num_process: The number of process to run
-    :return: A list of links to the stats match history pages
+    :param links: A list or tuple of links to the schedule page of lolesports
+    :param num_process: The number of worker processes, the number of CPUs if None
+    :param session_settings: Keyword arguments for the session created in each worker process, the rate limit is
+                             split between the workers
+    :param timings: If provided a pageRender.RenderTiming is appended to it for every page rendered
+    :param tabs: The number of browser tabs in the browser page pool each worker renders in, the browser is started
+                 once per worker and reused for every page it is given
+    :param ledger_path: Path to the jobLedger.JobLedger of the crawl, pages done in it are not crawled again
+    :param processor: Run in the workers for each page, called with the stage and link of the page
+    :param seen: The links already crawled. Every link the workers find is checked against it in this process, so a
+                 page or link is handed out once across all workers. A new linkDedup.SeenSet if None
+    :param pages_per_worker: If provided each worker process is replaced by a new one after this many pages
+    :param memory: If provided the RSS budget of the crawl, see memoryBudget.MemoryBudget
+    :return: An iterator of links to the stats match history pages
     """
+    if not isinstance(links, (list, tuple)):
+        raise TypeError('The links provided were not of type list or tuple')
+
+    num_process = num_process or os.cpu_count()
+    if memory is not None:
+        num_process = memory.processes(num_process, tabs)
+    in_flight_limit = num_process * 2
+    finished = queue.Queue()
+    if seen is None:
+        seen = SeenSet()
+
+    waiting = {SCHEDULE: deque(link for link in links if seen.add(link)), MATCH: deque()}
+    in_flight = 0
+
+    pool = Pool(processes=num_process, initializer=_init_worker,
+                initargs=(_worker_settings(session_settings, num_process), tabs, ledger_path),
+                maxtasksperchild=pages_per_worker or None)
+    completed = False
+
+    try:
+        while True:
+            while in_flight < in_flight_limit and (waiting[MATCH] or waiting[SCHEDULE]):
+                if in_flight and memory is not None and memory.over():
+                    METRICS.count('throttled', stage='memory')
+                    break
+                stage = MATCH if waiting[MATCH] else SCHEDULE
+                pool.apply_async(processor, (stage, waiting[stage].popleft()), callback=finished.put,
+                                 error_callback=finished.put)
+                in_flight += 1
+
+            if not in_flight:
+                break
+
+            result = finished.get()
+            in_flight -= 1
 
-    pool = Pool(processes=num_process)
-    output = pool.map(_link_processor, batch)
-    pool.close()
-    pool.join()
+            if isinstance(result, BaseException):
+                raise result
 
-    return output
+            stage, found, page_timings = result[:3]
+            if len(result) > 3:
+                METRICS.merge(result[3])
+            if timings is not None:
+                timings.extend(page_timings)
 
+            for link in found:
+                if not seen.add(link):
+                    continue
 
-def batch_process_links(links: Union[list, tuple] = None, batch_size: int = None, num_process: int = None) -> list:
+                if stage == SCHEDULE:
+                    waiting[MATCH].append(link)
+                else:
+                    yield link
+
+        completed = True
+    finally:
+        if completed:
+            pool.close()
+        else:
+            pool.terminate()
+        pool.join()
+
+
+def batch_process_links(links: Union[list, tuple] = None, batch_size: int = None, num_process: int = None,
+                        session_settings: Dict[str, Union[int, float]] = None, timings: list = None,
+                        tabs: int = None, ledger_path: str = None,
+                        seen: Union[None, SeenSet, BloomFilter] = None, pages_per_worker: int = None,
+                        memory: MemoryBudget = None, xpath: str = '/matches/',
+                        css_selector: str = '.stats-link') -> list:
     """
-    Processes the links passed using multiprocessing in a batch manner. Best performance when tested was with batch_size
-    of 2 with 10 processes. This was not fully tested. Smaller batches and larger process should increase performance
+    Processes the links passed using multiprocessing, see stream_process_links. Pages are handed to the workers one at
+    a time as they become idle so there is no batch size to tune, num_process is the only setting
 
     :param links: A list or tuple of links to the schedule page of lolesports
-    :param batch_size: The size to cut up the lists into
-    :param num_process: The number of processes to be passed to _multi_process
-    :return: A list of links to the stats match history pages
+    :param batch_size: Deprecated and ignored, pages are no longer crawled in fixed batches
+    :param num_process: The number of worker processes, the number of CPUs if None
+    :param session_settings: Keyword arguments for the session created in each worker process
+    :param timings: If provided a pageRender.RenderTiming is appended to it for every page rendered
+    :param tabs: The number of browser tabs each worker renders in, see browserPool.BrowserPagePool
+    :param ledger_path: Path to the jobLedger.JobLedger of the crawl, pages done in it are not crawled again
+    :param seen: The links already crawled, see stream_process_links
+    :param pages_per_worker: If provided each worker process is replaced by a new one after this many pages
+    :param memory: If provided the RSS budget of the crawl, see memoryBudget.MemoryBudget
+    :param xpath: The xpath selector for the match history links
+    :param css_selector: The css selector from which the specific stats links can be found
+    :return: A list of links to the stats match history pages without duplicates
     """
-    if not all([batch_size, num_process]):
-        raise BatchError('One of batch_size or num_process was None')
+    if links is None:
+        raise BatchError('No links were given to process')
+
+    if batch_size is not None:
+        warnings.warn('batch_size is ignored, pages are handed to the workers one at a time', DeprecationWarning)
 
-    print('Creating Batches')
-    batch = _create_batch(links, batch_size)
     print('Starting Multiprocess run')
-    stats_links = _multi_process(batch, num_process)
+    processor = partial(_page_processor, xpath=xpath, css_selector=css_selector)
+    return list(stream_process_links(links, num_process, session_settings, timings, tabs, ledger_path, processor, seen,
+                                     pages_per_worker, memory))
+
+
+def tiered_process_links(links: Union[list, tuple], fetch: Callable[[str], Any], render_processes: int = None,
+                         json_workers: int = DEFAULT_TIER_SETTINGS['json_workers'],
+                         queue_size: int = DEFAULT_TIER_SETTINGS['queue_size'],
+                         session_settings: Dict[str, Union[int, float]] = None, timings: list = None,
+                         tabs: int = None, ledger_path: str = None,
+                         processor: Callable[[str, str], Tuple[str, List[str], list]] = _page_processor,
+                         seen: Union[None, SeenSet, BloomFilter] = None, pages_per_worker: int = None,
+                         memory: MemoryBudget = None) -> Iterator[Any]:
+    """
+    Crawls the schedule pages in a small pool of render_processes worker processes, see stream_process_links, and
+    fetches every match history link they find in a large pool of json_workers threads, see pipeline.stream_pipeline.
+    The tiers are joined by a queue of queue_size links. When it is full no more pages are handed to the render
+    processes until the JSON tier catches up, so the two can be sized on their own without links piling up in memory.
+
+    :param links: A list or tuple of links to the schedule page of lolesports
+    :param fetch: Called in the JSON tier with a match history link, returns the result to yield or None
+    :param render_processes: The number of worker processes rendering pages, the number of CPUs if None
+    :param json_workers: The number of threads fetching at once
+    :param queue_size: The number of match history links that may wait for the JSON tier before rendering is paused
+    :param session_settings: Keyword arguments for the session created in each worker process
+    :param timings: If provided a pageRender.RenderTiming is appended to it for every page rendered
+    :param tabs: The number of browser tabs each worker renders in, see browserPool.BrowserPagePool
+    :param ledger_path: Path to the jobLedger.JobLedger of the crawl, pages done in it are not crawled again
+    :param processor: Run in the workers for each page, called with the stage and link of the page
+    :param seen: The links already crawled, see stream_process_links. With a linkDedup.BloomFilter the links fetched
+                 are kept in a BloomFilter of the same size too
+    :param pages_per_worker: If provided each render process is replaced by a new one after this many pages
+    :param memory: If provided the RSS budget of the crawl, see memoryBudget.MemoryBudget
+    :return: An iterator of the results of fetch in the order they finish
+    """
+    if not isinstance(links, (list, tuple)):
+        raise TypeError('The links provided were not of type list or tuple')
+
+    def _discover(on_found: Callable[[List[str]], None]) -> None:
+        found = stream_process_links(links, render_processes, session_settings, timings, tabs, ledger_path,
+                                     processor, seen, pages_per_worker, memory)
+        try:
+            for link in found:
+                on_found([link])
+        finally:
+            # Stops the render processes when the JSON tier failed or the consumer stopped early
+            found.close()
+
+    # A crawl that bounds the memory of the links it has seen with a BloomFilter bounds the links fetched the same way
+    fetched = BloomFilter(seen.capacity, seen.error_rate) if isinstance(seen, BloomFilter) else None
 
-    return stats_links
+    return stream_pipeline(_discover, fetch, json_workers, queue_size, fetched)
@@ -0,0 +1,268 @@
+import asyncio
+import time
+from functools import partial
+from typing import Callable, Dict, List, Tuple, Union
+
+import pyppeteer
+from requests_html import HTML
+
+from RiotCrawler.pageRender import DEFAULT_FALLBACK_SLEEP, DEFAULT_READY_TIMEOUT, RenderTiming, cached_render, \
+    href_selector, ready_script, store_render
+from RiotCrawler.jobLedger import MATCH, SCHEDULE, JobLedger, checkpoint_async
+from RiotCrawler.linkDedup import BloomFilter, SeenSet, canonical_links, ordered_links
+from RiotCrawler.rateLimiter import RateLimiter
+from RiotCrawler.responseCache import ResponseCache
+
+
+class BrowserPagePool(object):
+    """
+    A fixed number of tabs in one headless Chromium that pages are rendered in concurrently. The browser is started
+    once and its tabs are reused for every page, so the cost of starting Chromium is paid once per pool rather than once
+    per session. Each tab is closed and replaced after recycle_after renders to keep the memory of the browser flat on
+    long runs.
+
+    The pool runs on its own event loop so it can be used from synchronous code:
+
+    >>> pool = BrowserPagePool(size=4)
+    >>> links = pool.run(discover_links(pool, schedule_links, '/matches/', '.stats-link'))
+    >>> pool.close()
+    """
+
+    def __init__(self, size: int = 4, ready_timeout: float = DEFAULT_READY_TIMEOUT,
+                 fallback_sleep: int = DEFAULT_FALLBACK_SLEEP, recycle_after: int = 50,
+                 browser_args: Tuple[str] = ('--no-sandbox',), cache: ResponseCache = None,
+                 limiter: RateLimiter = None):
+        """
+        :param size: The number of tabs, which is the number of pages rendered at once
+        :param ready_timeout: Seconds to navigate to a page and wait for its ready selector, in total
+        :param fallback_sleep: Seconds to sleep when the ready selector did not appear, 0 disables the fallback
+        :param recycle_after: The number of renders after which a tab is replaced
+        :param browser_args: Command line arguments passed to Chromium
+        :param cache: A response cache that finished pages are stored in and served from without rendering
+        :param limiter: A rate limiter every page load waits for, see rateLimiter.RateLimiter
+        """
+
+        if not isinstance(size, int) or size < 1:
+            raise ValueError('size must be an int greater than 0')
+
+        self.size = size
+        self.ready_timeout = ready_timeout
+        self.fallback_sleep = fallback_sleep
+        self.recycle_after = recycle_after
+        self.browser_args = list(browser_args)
+        self.cache = cache
+        self.limiter = limiter
+        self.loop = asyncio.new_event_loop()
+        self.browser = None
+        self._pages = None
+        self._uses = dict()
+
+    def run(self, coro):
+        """
+        Runs a coroutine that uses the pool on the pool's event loop and returns its result
+
+        :param coro: The coroutine to run
+        :return: The result of the coroutine
+        """
+
+        return self.loop.run_until_complete(coro)
+
+    async def _start(self) -> None:
+        if self.browser is not None:
+            return
+
+        self.browser = await pyppeteer.launch(headless=True, args=self.browser_args, handleSIGINT=False,
+                                              handleSIGTERM=False, handleSIGHUP=False)
+        self._pages = asyncio.Queue()
+        for _ in range(self.size):
+            page = await self.browser.newPage()
+            self._uses[page] = 0
+            await self._pages.put(page)
+
+    async def _release(self, page) -> None:
+        self._uses[page] += 1
+
+        if self._uses[page] >= self.recycle_after:
+            del self._uses[page]
+            await page.close()
+            page = await self.browser.newPage()
+            self._uses[page] = 0
+
+        await self._pages.put(page)
+
+    async def render(self, url: str, ready_selector: str, timings: list = None) -> HTML:
+        """
+        Renders a page in the next free tab, returning as soon as ready_selector is in the DOM
+
+        :param url: The url of the page
+        :param ready_selector: A css selector that is present once the page has finished rendering
+        :param timings: If provided a pageRender.RenderTiming for the page is appended to it
+        :return: The rendered HTML
+        """
+
+        html = cached_render(self.cache, url)
+        if html is not None:
+            return html
+
+        await self._start()
+        page = await self._pages.get()
+        host = await self.limiter.request_async(url) if self.limiter is not None else None
+        start = time.perf_counter()
+        status = None
+
+        try:
+            response = await page.goto(url, {'timeout': int(self.ready_timeout * 1000)})
+            status = response.status if response is not None else None
+            if host is not None:
+                host.release(status)
+                host = None
+
+            ready = bool(await page.evaluate(ready_script(ready_selector, self.ready_timeout)))
+
+            if not ready and self.fallback_sleep:
+                await asyncio.sleep(self.fallback_sleep)
+
+            content = await page.content()
+        finally:
+            if host is not None:
+                host.release(status)
+            await self._release(page)
+
+        if timings is not None:
+            timings.append(RenderTiming(url, time.perf_counter() - start, ready))
+
+        if ready:
+            store_render(self.cache, url, content)
+
+        return HTML(url=url, html=content)
+
+    def close(self) -> None:
+        """
+        Closes the browser and the event loop of the pool
+
+        :return: None
+        """
+
+        if self.browser is not None:
+            self.run(self.browser.close())
+            self.browser = None
+        self.loop.close()
+
+
+async def _match_pages(link: str, pool: BrowserPagePool, xpath: str, timings: list = None) -> List[str]:
+    """
+    Renders a schedule page and returns the links to its match pages
+
+    :param link: Link to the lolesports schedule page
+    :return: A list of canonical links to the match pages
+    """
+
+    html = await pool.render(link, href_selector(xpath), timings)
+    next_link = list()
+
+    for nl in html.xpath('//a[contains(@href, "{}")]'.format(xpath)):
+        next_link.extend(([h for h in nl.absolute_links]))
+
+    return canonical_links(next_link)
+
+
+async def _stats_links(link: str, pool: BrowserPagePool, css_selector: str, timings: list = None) -> List[str]:
+    """
+    Renders a match page and returns the links to the full match history pages of its games
+
+    :param link: Link to the lolesports match page
+    :return: A list of canonical links to the match history pages
+    """
+
+    html = await pool.render(link, css_selector, timings)
+    stats_links = list()
+
+    for stat in html.find('{}'.format(css_selector)):
+        stats_links.extend([h for h in stat.absolute_links])
+
+    return canonical_links(stats_links)
+
+
+async def _checkpoint_stats_links(ledger: JobLedger, link: str, find_stats_links,
+                                  on_found: Callable[[List[str]], None] = None,
+                                  seen: Union[SeenSet, BloomFilter] = None, page_links: Dict[str, List[str]] = None,
+                                  errors: Dict[str, Exception] = None) -> List[str]:
+    found = await checkpoint_async(ledger, MATCH, link, find_stats_links, errors) or list()
+    stats_links = [s for s in found if seen.add(s)]
+
+    if page_links is not None:
+        page_links[link] = found
+
+    if on_found is not None and stats_links:
+        on_found(stats_links)
+
+    return stats_links
+
+
+async def _schedule_page_links(pool: BrowserPagePool, link: str, xpath: str, css_selector: str,
+                               timings: list = None, ledger: JobLedger = None,
+                               on_found: Callable[[List[str]], None] = None,
+                               seen: Union[SeenSet, BloomFilter] = None, page_links: Dict[str, List[str]] = None,
+                               errors: Dict[str, Exception] = None) -> List[str]:
+    """
+    Renders one schedule page, then renders all of its match pages at once and collects their stats links
+
+    :param pool: The pool to render in
+    :param link: Link to the lolesports schedule page
+    :param xpath: The href substring of the links to the match pages
+    :param css_selector: The css selector of the links to the full match history pages
+    :param timings: If provided the RenderTimings of every page are appended to it
+    :param ledger: The ledger of the crawl, may be None
+    :param on_found: Called with the match history links of each match page as soon as they are found
+    :param seen: The links already crawled, match pages and links in it are skipped
+    :param page_links: If provided the links found on every page are stored in it, {page: links}
+    :param errors: If provided a page that fails is stored in it under its link and skipped
+    :return: A list of links to the match history pages in the order they appear
+    """
+
+    find_stats_links = partial(_stats_links, pool=pool, css_selector=css_selector, timings=timings)
+    next_link = await checkpoint_async(ledger, SCHEDULE, link,
+                                       partial(_match_pages, pool=pool, xpath=xpath, timings=timings),
+                                       errors) or list()
+
+    if page_links is not None:
+        page_links[link] = next_link
+
+    match_pages = await asyncio.gather(*[_checkpoint_stats_links(ledger, l, find_stats_links, on_found, seen,
+                                                                 page_links, errors)
+                                         for l in next_link if seen.add(l)])
+
+    return [l for stats_links in match_pages for l in stats_links]
+
+
+async def discover_links(pool: BrowserPagePool, schedule_links: Tuple[str], xpath: str, css_selector: str,
+                         timings: list = None, ledger: JobLedger = None,
+                         on_found: Callable[[List[str]], None] = None,
+                         seen: Union[None, SeenSet, BloomFilter] = None,
+                         errors: Dict[str, Exception] = None) -> List[str]:
+    """
+    Fans every schedule page and match page out to the tabs of the pool and collects the match history links. Every
+    page and link is crawled once and the links are returned in the same order however the pages finish, see
+    matchCrawler.crawl_schedule_pages
+
+    :param pool: The pool to render in
+    :param schedule_links: A Tuple of links to the lolesports schedule page
+    :param xpath: The href substring of the links to the match pages
+    :param css_selector: The css selector of the links to the full match history pages
+    :param timings: If provided the RenderTimings of every page are appended to it
+    :param ledger: The ledger of the crawl, pages already done in it are not rendered again
+    :param on_found: Called with the match history links of each match page as soon as they are found
+    :param seen: The links already crawled, a new linkDedup.SeenSet if None
+    :param errors: If provided a page that fails is stored in it under its link and skipped
+    :return: A list of links to the match history pages in the order of schedule_links
+    """
+
+    if seen is None:
+        seen = SeenSet()
+
+    page_links = dict()
+    results = await asyncio.gather(*[_schedule_page_links(pool, link, xpath, css_selector, timings, ledger, on_found,
+                                                          seen, page_links, errors)
+                                     for link in schedule_links if seen.add(link)])
+
+    return ordered_links(schedule_links, page_links, {l for links in results for l in links})
@@ -1,12 +1,22 @@
-import json
-import os
-import pathlib
-from typing import Tuple, Union
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice
+from typing import Iterable, Iterator, List, Tuple, Union
 
 import requests
 
+from RiotCrawler.crawlMetrics import METRICS
+from RiotCrawler.crawlSession import DEFAULT_SESSION_SETTINGS, create_session
+from RiotCrawler.gameRecord import GameRecord
+from RiotCrawler.jobLedger import GAME, JobLedger
+from RiotCrawler.linkDedup import SeenSet, link_game_key, unique_links
+from RiotCrawler.storageSinks import StorageSink, as_sink
 
-def _create_json_links(link: str) -> Tuple[str, str]:
+ACS_BASE = 'https://acs.leagueoflegends.com/'
+
+
+def _create_json_links(link: str, acs_base: str = ACS_BASE) -> Tuple[str, str]:
     """
     Parses the links to the match hisotyr page and returns links to the JSON data.
     There are two relevant JSON's they are of the template:
@@ -14,6 +24,7 @@ def _create_json_links(link: str) -> Tuple[str, str]:
     https://acs.leagueoflegends.com/v1/stats/game/TRLH1/1002440062/timeline?gameHash=a3b08c115923f00d
 
     :param link: Link to the match history page
+    :param acs_base: The base address of the ACS stats server, must end in '/'
     :return: A list of two links one to the full match JSON and the other the timeline JSON
     """
 
@@ -21,56 +32,321 @@ def _create_json_links(link: str) -> Tuple[str, str]:
     link_ext = link_ext.split('/')
     link_ext[1] = link_ext[1].split('?')
 
-    game_ext = f'https://acs.leagueoflegends.com/v1/stats/game/{link_ext[0]}/{link_ext[1][0]}?{link_ext[1][1]}'
-    time_ext = f'https://acs.leagueoflegends.com/v1/stats/game/{link_ext[0]}/{link_ext[1][0]}/timeline?{link_ext[1][1]}'
+    game_ext = f'{acs_base}v1/stats/game/{link_ext[0]}/{link_ext[1][0]}?{link_ext[1][1]}'
+    time_ext = f'{acs_base}v1/stats/game/{link_ext[0]}/{link_ext[1][0]}/timeline?{link_ext[1][1]}'
 
     return game_ext, time_ext
 
 
-def _save_json(path_to_folder: str, json_link: str, json_data: dict) -> None:
+def _get_json(session: requests.Session, json_link: str) -> bytes:
+    """
+    Blocking GET of a single JSON document through a shared session
+
+    :param session: The session whose connection pool is reused between calls
+    :param json_link: Link to the JSON data
+    :return: The undecoded JSON data, decoded later by gameRecord.GameRecord when it is used
+    """
+
+    with METRICS.timer(stage='fetch'):
+        r = session.get(json_link)
+        r.raise_for_status()
+
+    METRICS.count('bytes', len(r.content), stage='fetch')
+    return r.content
+
+
+def _save(sink: StorageSink, record: GameRecord) -> None:
+    with METRICS.timer(stage='save'):
+        sink.write(record)
+
+
+def fetch_game(session: requests.Session, link: str, path: Union[None, str, StorageSink] = None,
+               acs_base: str = ACS_BASE, ledger: JobLedger = None) -> Union[None, GameRecord]:
+    """
+    Fetches the game and timeline JSON of one match history link into a GameRecord, saving it if a path is given
+
+    :param session: The session to make the requests through
+    :param link: Link to the match history page
+    :param path: The folder or storageSinks.StorageSink to save the JSON data to, if None the data is returned. A folder
+                 is written to through a storageSinks.JsonSink opened for this game, pass a sink when fetching many
+    :param acs_base: The base address of the ACS stats server
+    :param ledger: The ledger of the crawl, only used when saving. A game already done in it is skipped and a game that
+                   fails is recorded in it instead of raising
+    :return: None or the GameRecord
+    """
+
+    if path is None:
+        ledger = None
+    elif ledger is not None and ledger.is_done(GAME, link):
+        return None
+
+    tmp_links = _create_json_links(link, acs_base)
+
+    try:
+        json_resp1 = _get_json(session, tmp_links[0])
+        json_resp2 = _get_json(session, tmp_links[1])
+    except Exception as e:
+        if ledger is None:
+            raise
+        ledger.fail(GAME, link, e)
+        return None
+
+    record = GameRecord(link_game_key(link), json_resp1, json_resp2, link)
+
+    if path is None:
+        return record
+
+    sink, owned = as_sink(path)
+    _save(sink, record)
+    if owned:
+        sink.close()
+
+    if ledger is not None:
+        ledger.complete(GAME, link)
+
+
+def _owned_session(max_concurrency: Union[None, int]) -> requests.Session:
+    """
+    Creates a session for a crawl that was not given one, with enough pooled connections for every request in flight
+
+    :param max_concurrency: The number of matches fetched at once, each of which has two requests in flight
+    :return: A session to be closed by the caller
+    """
+
+    pool_size = max(DEFAULT_SESSION_SETTINGS['pool_size'], (max_concurrency or 1) * 2)
+    host_concurrency = max(DEFAULT_SESSION_SETTINGS['host_concurrency'], (max_concurrency or 1) * 2)
+    return create_session(pool_size=pool_size, host_concurrency=host_concurrency)
+
+
+async def _fetch_game_async(executor: ThreadPoolExecutor, session: requests.Session, semaphore: asyncio.Semaphore,
+                            link: str, sink: Union[None, StorageSink], acs_base: str,
+                            ledger: JobLedger = None) -> Union[None, GameRecord]:
     """
-    Saves JSON data to a file
+    Fetches the game and timeline JSON for one match history link at the same time into a GameRecord
 
-    :param json_link: Link to the JSON data for use in filename only
-    :param json_data: JSON data to save to file
-    :return: None
+    :param executor: The thread pool the blocking requests are run in
+    :param session: The shared session
+    :param semaphore: Bounds the number of matches being fetched at once
+    :param link: Link to the match history page
+    :param sink: The sink to save the JSON data to, if None the data is returned
+    :param acs_base: The base address of the ACS stats server
+    :param ledger: The ledger of the crawl, only used when saving
+    :return: None or the GameRecord
     """
-    pathlib.Path(path_to_folder).mkdir(parents=True, exist_ok=True)
 
-    split_link = json_link.split('/')
-    file_name = f'game_{split_link[6]}_{split_link[7][:10]}.json'
-    path = os.path.join(path_to_folder, file_name)
+    loop = asyncio.get_running_loop()
+    tmp_links = _create_json_links(link, acs_base)
+
+    if sink is None:
+        ledger = None
+    elif ledger is not None and ledger.is_done(GAME, link):
+        return None
 
-    with open(path, 'a') as jfile:
-        json.dump(json_data, jfile, indent=4)
+    async with semaphore:
+        try:
+            json_resp1, json_resp2 = await asyncio.gather(
+                loop.run_in_executor(executor, _get_json, session, tmp_links[0]),
+                loop.run_in_executor(executor, _get_json, session, tmp_links[1]))
+        except Exception as e:
+            if ledger is None:
+                raise
+            ledger.fail(GAME, link, e)
+            return None
 
+        record = GameRecord(link_game_key(link), json_resp1, json_resp2, link)
+
+        if sink is not None:
+            await loop.run_in_executor(executor, _save, sink, record)
+            if ledger is not None:
+                ledger.complete(GAME, link)
+            return None
+        else:
+            return record
+
+
+async def _crawl_json_async(json_links: Union[list, tuple], sink: Union[None, StorageSink], max_concurrency: int,
+                            acs_base: str, session: requests.Session,
+                            ledger: JobLedger = None) -> List[Union[None, GameRecord]]:
+    """
+    Runs the fetch of every match history link on the event loop
 
-def crawl_json(json_links: tuple, path: Union[None, str] = None, ) -> Union[None, dict]:
+    :param json_links: Links to the match history pages
+    :param sink: The sink to save the JSON data to, if None the data is returned
+    :param max_concurrency: The maximum number of matches fetched at once
+    :param acs_base: The base address of the ACS stats server
+    :param session: The session the requests are made through
+    :param ledger: The ledger of the crawl, only used when saving
+    :return: A list of GameRecords or None in the order of json_links
     """
-    Crawls the JSON data and either saves it to a json file or returns it
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    with ThreadPoolExecutor(max_workers=max_concurrency * 2) as executor:
+        tasks = [_fetch_game_async(executor, session, semaphore, link, sink, acs_base, ledger) for link in json_links]
+        return await asyncio.gather(*tasks)
+
+
+def crawl_json_async(json_links: Union[list, tuple], path: Union[None, str, StorageSink] = None,
+                     max_concurrency: int = 10,
+                     acs_base: str = ACS_BASE, session: requests.Session = None,
+                     ledger: JobLedger = None) -> Union[None, List[GameRecord]]:
+    """
+    Crawls the JSON data concurrently. The game and timeline JSON of a match are fetched at the same time and up to
+    max_concurrency matches are in flight at once over a shared pool of keep-alive connections.
 
     :param json_links: Links to the JSON data for each game
-    :param path: The path to the location to save the JSON data if save = True
-    :return: JSON data or None
+    :param path: The folder or storageSinks.StorageSink to save the JSON data to, if None the data is returned. A
+                 folder is written to with a storageSinks.JsonSink
+    :param max_concurrency: The maximum number of matches to fetch at once
+    :param acs_base: The base address of the ACS stats server
+    :param session: The session to make the requests through, see crawlSession.create_session. If None a session is
+                    created for this crawl and closed afterwards
+    :param ledger: A jobLedger.JobLedger, when saving games already done in it are skipped and a game that fails is
+                   recorded in it instead of stopping the crawl
+    :return: A list of gameRecord.GameRecords in the order of json_links, each game once, or None
     """
     if not isinstance(json_links, (tuple, list)):
         raise TypeError('json_links must be of type tuple or list')
 
-    if json_links:
-        for link in json_links:
-            tmp_links = _create_json_links(link)
+    if not isinstance(max_concurrency, int) or max_concurrency < 1:
+        raise ValueError('max_concurrency must be an int greater than 0')
+
+    if not json_links:
+        raise Exception('The JSON links passed were empty')
+
+    json_links = unique_links(json_links)
+
+    owned = session is None
+    if owned:
+        session = _owned_session(max_concurrency)
+
+    sink, owned_sink = as_sink(path) if path is not None else (None, False)
+
+    try:
+        results = asyncio.run(_crawl_json_async(json_links, sink, max_concurrency, acs_base, session, ledger))
+    finally:
+        if owned:
+            session.close()
+        if owned_sink:
+            sink.close()
+
+    if path is None:
+        return results
+
+
+def _iter_games(json_links: Iterable[str], max_concurrency: Union[None, int], acs_base: str,
+                session: requests.Session, owned: bool) -> Iterator[GameRecord]:
+    """
+    Yields the GameRecord of each match history link in order. With max_concurrency up to that many games are fetched
+    ahead in a thread pool, so no more than max_concurrency games are ever held at once however many links are given.
+
+    :param json_links: Links to the match history pages
+    :param max_concurrency: The number of games fetched ahead, None fetches one at a time
+    :param acs_base: The base address of the ACS stats server
+    :param session: The session to make the requests through
+    :param owned: If True the session is closed once the iterator is finished or closed
+    :return: An iterator of GameRecords
+    """
+
+    window = deque()
 
-            r = requests.get(tmp_links[0])
-            json_resp1 = r.json()
-            r = requests.get(tmp_links[1])
-            json_resp2 = r.json()
+    try:
+        if not max_concurrency:
+            for link in json_links:
+                yield fetch_game(session, link, None, acs_base)
+            return
 
-            concat_json = json_resp1.copy()
-            concat_json.update(json_resp2)
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            links = iter(json_links)
+            window.extend(executor.submit(fetch_game, session, link, None, acs_base)
+                          for link in islice(links, max_concurrency))
 
-            if path is not None:
-                _save_json(path, tmp_links[0], concat_json)
-            else:
-                return concat_json
+            while window:
+                game = window.popleft().result()
+                window.extend(executor.submit(fetch_game, session, link, None, acs_base)
+                              for link in islice(links, 1))
+                yield game
+    finally:
+        for future in window:
+            future.cancel()
+        if owned:
+            session.close()
+
+
+def _unique(json_links: Iterable[str]) -> Iterator[str]:
+    seen = SeenSet()
+    return (link for link in json_links if seen.add(link))
+
+
+def _chunks(links: Iterable[str], size: int) -> Iterator[List[str]]:
+    links = iter(links)
+    while True:
+        chunk = list(islice(links, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def crawl_json(json_links: Iterable[str], path: Union[None, str, StorageSink] = None, max_concurrency: int = None,
+               acs_base: str = ACS_BASE, session: requests.Session = None,
+               ledger: JobLedger = None) -> Union[None, Iterator[GameRecord]]:
+    """
+    Crawls the JSON data and either saves it or returns it. When no path is given the games are not fetched up front,
+    an iterator is returned that fetches them as it is consumed and yields the gameRecord.GameRecord
+    of each link in order. A game linked more than once is only fetched once.
+
+    The links may be any iterable, such as the memoryBudget.LinkSpool of a low memory crawl. Only a tuple or list is
+    read up front, any other iterable is read as the games are fetched.
+
+    >>> for game in crawl_json(links, max_concurrency=8):
+    ...     print(game['gameId'])
+
+    :param json_links: Links to the JSON data for each game
+    :param path: The folder or storageSinks.StorageSink to save the JSON data to, if None an iterator is returned
+    :param max_concurrency: If provided this many matches are fetched at once, through crawl_json_async when saving
+    :param acs_base: The base address of the ACS stats server
+    :param session: The session to make the requests through, if None one is created for this crawl
+    :param ledger: A jobLedger.JobLedger, when saving games already done in it are skipped and a game that fails is
+                   recorded in it instead of stopping the crawl
+    :return: None or an iterator of gameRecord.GameRecords
+    """
+    if isinstance(json_links, (tuple, list)):
+        if max_concurrency is not None and path is not None:
+            return crawl_json_async(json_links, path, max_concurrency, acs_base, session, ledger)
+        if not json_links:
+            raise Exception('The JSON links passed were empty')
+        json_links = unique_links(json_links)
+    elif isinstance(json_links, (str, bytes)) or not isinstance(json_links, Iterable):
+        raise TypeError('json_links must be an iterable of links, as a tuple or list')
     else:
-        raise Exception('The JSON links passed were empty')
+        json_links = _unique(json_links)
+        first = next(json_links, None)
+        if first is None:
+            raise Exception('The JSON links passed were empty')
+        json_links = chain((first,), json_links)
+
+    if max_concurrency is not None and (not isinstance(max_concurrency, int) or max_concurrency < 1):
+        raise ValueError('max_concurrency must be an int greater than 0')
+
+    owned = session is None
+    if owned:
+        session = _owned_session(max_concurrency)
+
+    if path is None:
+        return _iter_games(json_links, max_concurrency, acs_base, session, owned)
+
+    # The sink is opened once for the whole crawl, a JSON Lines or Parquet file is not reopened for every game
+    sink, owned_sink = as_sink(path)
+    try:
+        if max_concurrency is not None:
+            # Only a window of the links is held at once
+            for chunk in _chunks(json_links, max_concurrency * 64):
+                crawl_json_async(chunk, sink, max_concurrency, acs_base, session, ledger)
+        else:
+            for link in json_links:
+                fetch_game(session, link, sink, acs_base, ledger)
+    finally:
+        if owned_sink:
+            sink.close()
+        if owned:
+            session.close()
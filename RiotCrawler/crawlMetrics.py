@@ -0,0 +1,325 @@
+import bisect
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, IO, Iterator, List, Tuple
+
+STAGES = ('links', 'schedule', 'match', 'fetch', 'save')
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name: str, labels: Dict[str, str]) -> _Key:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Histogram(object):
+    """
+    Counts of observations in fixed buckets, as Prometheus histograms, with their sum
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """
+        :param q: The quantile, 0.95 for p95
+        :return: The quantile interpolated within its bucket, 0 if nothing was observed
+        """
+
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+
+        return self.buckets[-1]
+
+    def merge(self, counts: List[int], total: float) -> None:
+        self.counts = [a + b for a, b in zip(self.counts, counts)]
+        self.sum += total
+        self.count += sum(counts)
+
+
+class Metrics(object):
+    """
+    Counters and latency histograms of a crawl, kept by name and labels. Every stage records to METRICS, the registry
+    of the process, under a stage label of links, schedule, match, fetch or save.
+
+    >>> METRICS.count('bytes', len(body), stage='fetch')
+    >>> with METRICS.timer('seconds', stage='fetch'):
+    ...     fetch()
+    >>> METRICS.summary()['fetch']['p95']
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.counters = dict()
+        self.histograms = dict()
+
+    def count(self, name: str, value: float = 1, **labels) -> None:
+        """
+        :param name: The name of the counter, as pages, bytes or retries
+        :param value: The amount to add
+        :param labels: The labels of the counter, as stage='fetch'
+        :return: None
+        """
+
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """
+        :param name: The name of the histogram
+        :param value: The observation, seconds for latencies
+        :param labels: The labels of the histogram
+        :return: None
+        """
+
+        key = _key(name, labels)
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+    @contextmanager
+    def timer(self, name: str = 'seconds', **labels) -> Iterator[None]:
+        """
+        Observes the seconds the block took and counts it under done. A block that raises is counted under errors
+        instead.
+        """
+
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.count('errors', **labels)
+            raise
+        self.observe(name, time.perf_counter() - start, **labels)
+        self.count('done', **labels)
+
+    def drain(self) -> dict:
+        """
+        Takes the counts recorded so far and resets them, to hand the counts of a worker process to the parent
+
+        :return: The counts, for Metrics.merge
+        """
+
+        with self._lock:
+            state = {'counters': list(self.counters.items()),
+                     'histograms': [(k, h.counts, h.sum) for k, h in self.histograms.items()]}
+            self.counters = dict()
+            self.histograms = dict()
+
+        return state
+
+    def merge(self, state: dict) -> None:
+        """
+        :param state: Counts returned by Metrics.drain in another process
+        :return: None
+        """
+
+        with self._lock:
+            for key, value in state['counters']:
+                key = (key[0], tuple(tuple(label) for label in key[1]))
+                self.counters[key] = self.counters.get(key, 0) + value
+            for key, counts, total in state['histograms']:
+                key = (key[0], tuple(tuple(label) for label in key[1]))
+                if key not in self.histograms:
+                    self.histograms[key] = Histogram()
+                self.histograms[key].merge(counts, total)
+
+    def reset(self) -> None:
+        self.drain()
+        self.started = time.time()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        :return: For each stage its counters, as done, errors, bytes, retries or cache_hits, the rate done, or requests
+                 for the http stage, a second since the registry was started or reset, and the p50, p95 and mean of its
+                 latency
+        """
+
+        elapsed = max(time.time() - self.started, 1e-9)
+        summary = dict()
+
+        with self._lock:
+            for (name, labels), value in self.counters.items():
+                stage = dict(labels).get('stage')
+                if stage is not None:
+                    summary.setdefault(stage, dict())[name] = value
+
+            for (name, labels), histogram in self.histograms.items():
+                stage = dict(labels).get('stage')
+                if stage is not None and name == 'seconds':
+                    row = summary.setdefault(stage, dict())
+                    row['p50'] = histogram.quantile(0.5)
+                    row['p95'] = histogram.quantile(0.95)
+                    row['mean'] = histogram.sum / histogram.count
+
+        for row in summary.values():
+            row['per_sec'] = row.get('done', row.get('requests', 0)) / elapsed
+
+        return {stage: summary[stage] for stage in sorted(summary, key=_stage_order)}
+
+    def snapshot(self) -> dict:
+        """
+        :return: The time, the summary, every counter and every histogram as JSON serializable dicts
+        """
+
+        with self._lock:
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in self.counters.items()]
+            histograms = [{'name': name, 'labels': dict(labels), 'count': h.count, 'sum': h.sum,
+                           'p50': h.quantile(0.5), 'p95': h.quantile(0.95)}
+                          for (name, labels), h in self.histograms.items()]
+
+        return {'time': time.time(), 'summary': self.summary(), 'counters': counters, 'histograms': histograms}
+
+    def to_prometheus(self, prefix: str = 'riotcrawler') -> str:
+        """
+        :param prefix: Prepended to the name of every metric
+        :return: The metrics in the Prometheus text exposition format
+        """
+
+        def _labels(labels: Tuple[Tuple[str, str], ...], **extra) -> str:
+            pairs = list(labels) + list(extra.items())
+            return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}' if pairs else ''
+
+        lines = list()
+        with self._lock:
+            for name in sorted({n for n, _ in self.counters}):
+                lines.append(f'# TYPE {prefix}_{name}_total counter')
+                for (n, labels), value in sorted(self.counters.items()):
+                    if n == name:
+                        lines.append(f'{prefix}_{name}_total{_labels(labels)} {value}')
+
+            for name in sorted({n for n, _ in self.histograms}):
+                lines.append(f'# TYPE {prefix}_{name} histogram')
+                for (n, labels), h in sorted(self.histograms.items(), key=lambda item: item[0]):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(h.buckets + (float('inf'),), h.counts):
+                        cumulative += count
+                        le = '+Inf' if bound == float('inf') else repr(bound)
+                        lines.append(f'{prefix}_{name}_bucket{_labels(labels, le=le)} {cumulative}')
+                    lines.append(f'{prefix}_{name}_sum{_labels(labels)} {h.sum}')
+                    lines.append(f'{prefix}_{name}_count{_labels(labels)} {h.count}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _stage_order(stage: str) -> Tuple[int, str]:
+    return (STAGES.index(stage) if stage in STAGES else len(STAGES)), stage
+
+
+METRICS = Metrics()
+
+
+def format_summary(summary: Dict[str, Dict[str, float]]) -> str:
+    """
+    :param summary: Returned by Metrics.summary
+    :return: One short line of the count, rate and latency of each stage
+    """
+
+    parts = list()
+    for stage, row in summary.items():
+        part = f'{stage} {row.get("done", row.get("requests", 0)):.0f} ({row["per_sec"]:.1f}/s'
+        if 'p95' in row:
+            part += f', p95 {row["p95"]:.2f}s'
+        if row.get('errors'):
+            part += f', {row["errors"]:.0f} errors'
+        parts.append(part + ')')
+
+    return ' | '.join(parts)
+
+
+class MetricsReporter(object):
+    """
+    Reports a Metrics registry every interval seconds from a background thread: redraws a one line progress bar,
+    appends a snapshot to a JSON Lines file and rewrites a Prometheus text file, which ever are asked for. A report is
+    also made when it is stopped.
+
+    >>> with MetricsReporter(bar=True, jsonl='metrics.jsonl', prometheus='riotcrawler.prom'):
+    ...     rc.run_all('Json Downloads')
+    """
+
+    def __init__(self, metrics: Metrics = None, interval: float = 1.0, bar: bool = True, jsonl: str = None,
+                 prometheus: str = None, stream: IO = None):
+        """
+        :param metrics: The registry to report, METRICS if None
+        :param interval: Seconds between reports
+        :param bar: If True a progress line is redrawn on stream
+        :param jsonl: Path of a JSON Lines file a snapshot is appended to each report
+        :param prometheus: Path of a text file rewritten each report, for the node_exporter textfile collector
+        :param stream: The stream the progress line is written to, sys.stderr if None
+        """
+
+        self.metrics = metrics if metrics is not None else METRICS
+        self.interval = interval
+        self.bar = bar
+        self.jsonl = jsonl
+        self.prometheus = prometheus
+        self.stream = stream if stream is not None else sys.stderr
+        self._stop = threading.Event()
+        self._thread = None
+
+    def report(self) -> None:
+        if self.bar:
+            self.stream.write('\r' + format_summary(self.metrics.summary()) + '\x1b[K')
+            self.stream.flush()
+
+        if self.jsonl is not None:
+            with open(self.jsonl, 'a') as f:
+                f.write(json.dumps(self.metrics.snapshot()) + '\n')
+
+        if self.prometheus is not None:
+            tmp_path = f'{self.prometheus}.tmp'
+            with open(tmp_path, 'w') as f:
+                f.write(self.metrics.to_prometheus())
+            os.replace(tmp_path, self.prometheus)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.report()
+
+    def start(self) -> 'MetricsReporter':
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.report()
+            if self.bar:
+                self.stream.write('\n')
+
+    def __enter__(self) -> 'MetricsReporter':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
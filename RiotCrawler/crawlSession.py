@@ -0,0 +1,208 @@
+import time
+from typing import Dict, Union
+
+from requests import Response
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests_html import HTMLSession
+from urllib3.util.retry import Retry
+
+from RiotCrawler.crawlMetrics import METRICS
+from RiotCrawler.rateLimiter import THROTTLE_STATUSES, RateLimiter, parse_retry_after
+from RiotCrawler.responseCache import CachedResponse, ResponseCache
+
+DEFAULT_SESSION_SETTINGS = {'timeout': 30.0, 'retries': 5, 'backoff': 0.5, 'pool_size': 20, 'cache': None,
+                            'cache_size': 1024, 'rate': 0.0, 'host_concurrency': 16}
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """
+    An HTTPAdapter that applies a default timeout to every request that does not set its own. If a RateLimiter is given
+    every request waits for its host's limiter, and a throttled response is reported to it and retried up to
+    throttle_retries times after the Retry-After of the response or an exponential backoff.
+    """
+
+    def __init__(self, timeout: float = None, limiter: RateLimiter = None, throttle_retries: int = 0,
+                 backoff: float = 0.0, **kwargs):
+        self.timeout = timeout
+        self.limiter = limiter
+        self.throttle_retries = throttle_retries
+        self.backoff = backoff
+        super().__init__(**kwargs)
+
+    def _send(self, request, **kwargs) -> Response:
+        response = super().send(request, **kwargs)
+
+        METRICS.count('requests', stage='http')
+        retries = getattr(response.raw, 'retries', None)
+        if retries is not None and retries.history:
+            METRICS.count('retries', len(retries.history), stage='http')
+        if response.status_code in THROTTLE_STATUSES:
+            METRICS.count('throttled', stage='http')
+
+        return response
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+
+        if self.limiter is None:
+            return self._send(request, **kwargs)
+
+        for attempt in range(self.throttle_retries + 1):
+            with self.limiter.request(request.url) as outcome:
+                response = self._send(request, **kwargs)
+                outcome.status = response.status_code
+                outcome.retry_after = parse_retry_after(response.headers.get('Retry-After'))
+
+            if response.status_code not in THROTTLE_STATUSES or attempt == self.throttle_retries:
+                return response
+
+            response.close()
+            METRICS.count('retries', stage='http')
+            if outcome.retry_after is None:
+                time.sleep(self.backoff * 2 ** attempt)
+
+
+class CachingHTTPAdapter(TimeoutHTTPAdapter):
+    """
+    A TimeoutHTTPAdapter that answers GET requests from a ResponseCache. Entries that never expire are returned without
+    a request, others are revalidated with the server and returned from the cache on a 304.
+    """
+
+    def __init__(self, cache: ResponseCache, **kwargs):
+        self.cache = cache
+        super().__init__(**kwargs)
+
+    def _cached_response(self, request, entry: CachedResponse) -> Response:
+        METRICS.count('cache_hits', stage='http')
+        response = Response()
+        response.status_code = entry.status
+        response.headers = CaseInsensitiveDict(entry.headers)
+        response._content = entry.body
+        response.url = request.url
+        response.request = request
+        response.reason = 'OK'
+        response.connection = self
+        response.from_cache = True
+
+        return response
+
+    def send(self, request, **kwargs):
+        if request.method != 'GET':
+            return super().send(request, **kwargs)
+
+        entry = self.cache.get(request.url)
+
+        if entry is not None:
+            if entry.immutable:
+                return self._cached_response(request, entry)
+            if entry.etag:
+                request.headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                request.headers['If-Modified-Since'] = entry.last_modified
+
+        response = super().send(request, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            response.close()
+            return self._cached_response(request, entry)
+
+        if response.status_code == 200:
+            self.cache.put(request.url, response.status_code, dict(response.headers), response.content)
+
+        return response
+
+    def close(self):
+        super().close()
+        self.cache.close()
+
+
+def parse_session_settings(config_dict: Dict[str, Dict[str, str]]) -> Dict[str, Union[int, float]]:
+    """
+    Reads the session settings out of the extra section of the config dict, using the defaults for any not provided
+
+    :param config_dict: Dict parsed from the config.ini file
+    :return: A dict of timeout, retries, backoff, pool_size, cache, cache_size, rate and host_concurrency
+    """
+
+    settings = DEFAULT_SESSION_SETTINGS.copy()
+
+    try:
+        extra = config_dict['extra']
+    except KeyError:
+        return settings
+
+    for key, default in DEFAULT_SESSION_SETTINGS.items():
+        if key in extra:
+            try:
+                settings[key] = extra[key] if default is None else type(default)(extra[key])
+            except ValueError:
+                raise ValueError(f'{key} in config.ini must be of type {type(default).__name__}')
+
+    return settings
+
+
+def create_session(timeout: float = DEFAULT_SESSION_SETTINGS['timeout'],
+                   retries: int = DEFAULT_SESSION_SETTINGS['retries'],
+                   backoff: float = DEFAULT_SESSION_SETTINGS['backoff'],
+                   pool_size: int = DEFAULT_SESSION_SETTINGS['pool_size'],
+                   cache: str = DEFAULT_SESSION_SETTINGS['cache'],
+                   cache_size: int = DEFAULT_SESSION_SETTINGS['cache_size'],
+                   rate: float = DEFAULT_SESSION_SETTINGS['rate'],
+                   host_concurrency: int = DEFAULT_SESSION_SETTINGS['host_concurrency'],
+                   limiter: RateLimiter = None) -> HTMLSession:
+    """
+    Creates the session shared by every stage of the crawler. HTMLSession is a requests Session, so the same object
+    renders the lolesports pages and downloads the ACS JSON. Connections are pooled and kept alive per host, responses
+    are gzip encoded, and GET requests that fail with 429 or 5xx are retried with exponential backoff honouring any
+    Retry-After header.
+
+    If cache is given responses are kept in a responseCache.ResponseCache at that path, available to the rest of the
+    crawler as session.response_cache (None when not caching).
+
+    Requests to each host are paced by a rateLimiter.RateLimiter that lowers the requests in flight and the request
+    rate when the host answers 429 or 503 and raises them again once it recovers. It is available as
+    session.rate_limiter and may be passed to other sessions so they share the same budget.
+
+    :param timeout: Default connect and read timeout in seconds for each request
+    :param retries: The number of times to retry a failed request
+    :param backoff: The backoff factor, retry n sleeps backoff * 2 ** (n - 1) seconds
+    :param pool_size: The number of keep-alive connections kept for each host
+    :param cache: Path to the SQLite file of the response cache, None disables caching
+    :param cache_size: The size of the response cache in megabytes
+    :param rate: The most requests a second to each host, 0 only limits the requests in flight
+    :param host_concurrency: The most requests in flight to each host, 0 disables the rate limiter
+    :param limiter: A RateLimiter to share with other sessions, used instead of creating one from rate and
+                    host_concurrency
+    :return: An HTMLSession
+    """
+
+    if limiter is None and host_concurrency:
+        limiter = RateLimiter(rate, host_concurrency)
+
+    # Throttled responses are retried by the adapter so the limiter sees them, the rest by urllib3
+    status_forcelist = RETRY_STATUSES if limiter is None else [s for s in RETRY_STATUSES
+                                                               if s not in THROTTLE_STATUSES]
+    retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=status_forcelist,
+                  allowed_methods=frozenset(['GET', 'HEAD']), respect_retry_after_header=limiter is None,
+                  raise_on_status=False)
+    adapter_kwargs = dict(timeout=timeout, limiter=limiter, throttle_retries=retries, backoff=backoff,
+                          max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
+
+    if cache:
+        response_cache = ResponseCache(cache, cache_size * 1024 ** 2)
+        adapter = CachingHTTPAdapter(response_cache, **adapter_kwargs)
+    else:
+        response_cache = None
+        adapter = TimeoutHTTPAdapter(**adapter_kwargs)
+
+    session = HTMLSession()
+    session.response_cache = response_cache
+    session.rate_limiter = limiter
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({'Accept-Encoding': 'gzip, deflate', 'Connection': 'keep-alive'})
+
+    return session
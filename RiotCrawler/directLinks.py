@@ -0,0 +1,294 @@
+import json
+import re
+import threading
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Tuple, Union
+
+from requests_html import HTML, HTMLSession
+
+from RiotCrawler.Exceptions.errors import LinksNotFoundError
+from RiotCrawler.crawlSession import create_session
+from RiotCrawler.jobLedger import JobLedger
+from RiotCrawler.linkDedup import MATCH_HISTORY_BASE, BloomFilter, SeenSet, canonical_links
+from RiotCrawler.matchCrawler import crawl_schedule_pages
+from RiotCrawler.pageRender import DEFAULT_FALLBACK_SLEEP, DEFAULT_READY_TIMEOUT, href_selector, render_page
+
+API_BASE = 'https://api.lolesports.com/api/'
+
+STATS_LINK = re.compile(r'https?://matchhistory\.[a-z0-9]+\.leagueoflegends\.com/[A-Za-z_]+/#match-details/'
+                        r'[A-Za-z0-9]+/\d+\?gameHash=[0-9a-fA-F]+')
+_JSON_ASSIGNMENT = re.compile(r'=\s*(?=[{\[])')
+_stats_lock = threading.Lock()
+
+
+def _walk(obj: Union[dict, list]) -> Iterator[dict]:
+    """
+    Yields every dict nested anywhere inside a decoded JSON document
+
+    :param obj: The decoded JSON document
+    :return: An iterator of dicts
+    """
+
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            yield item
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+
+
+def _links_from_payload(payload: Union[dict, list]) -> List[str]:
+    """
+    Builds match history links from a lolesports JSON payload. The game realm and id are found on the game objects
+    and the hash either on the same object or in the gameIdMappings of the match details, joined by the game's uuid.
+
+    :param payload: A decoded JSON document from the page or the lolesports API
+    :return: A list of links to the match history pages
+    """
+
+    games = dict()
+    hashes = dict()
+
+    for item in _walk(payload):
+        if 'gameHash' in item and 'id' in item:
+            hashes[item['id']] = item['gameHash']
+        if 'gameId' in item and ('gameRealm' in item or 'platformId' in item):
+            key = item.get('id', len(games))
+            games[key] = (item.get('gameRealm') or item.get('platformId'), item['gameId'], item.get('gameHash'))
+
+    links = list()
+    for key, (realm, game_id, game_hash) in games.items():
+        game_hash = game_hash or hashes.get(key)
+        if realm and game_id and game_hash:
+            links.append(f'{MATCH_HISTORY_BASE}{realm}/{game_id}?gameHash={game_hash}')
+
+    return links
+
+
+def _embedded_payloads(html: HTML) -> Iterator[Union[dict, list]]:
+    """
+    Yields the JSON documents embedded in the script tags of a page, both application/json scripts and objects
+    assigned to a variable such as window.__INITIAL_STATE__ = {...}
+
+    :param html: The unrendered HTML of the page
+    :return: An iterator of decoded JSON documents
+    """
+
+    decoder = json.JSONDecoder()
+
+    for script in html.find('script'):
+        text = script.text.strip()
+        if not text:
+            continue
+
+        if script.attrs.get('type', '').endswith('json'):
+            try:
+                yield json.loads(text)
+            except ValueError:
+                pass
+            continue
+
+        for match in _JSON_ASSIGNMENT.finditer(text):
+            try:
+                yield decoder.raw_decode(text, match.end())[0]
+            except ValueError:
+                pass
+
+
+def extract_stats_links(html: HTML) -> List[str]:
+    """
+    Finds the match history links in the unrendered source of a page, from links written into the page and from the
+    JSON the page embeds for its scripts
+
+    :param html: The unrendered HTML of the page
+    :return: A list of canonical links to the match history pages in the order found
+    """
+
+    links = STATS_LINK.findall(html.html.replace('\\/', '/'))
+
+    for payload in _embedded_payloads(html):
+        links.extend(_links_from_payload(payload))
+
+    return canonical_links(links)
+
+
+def _match_details_links(session: HTMLSession, html: HTML, api_base: str) -> List[str]:
+    """
+    Requests the lolesports highlanderMatchDetails API for the tournament and match ids embedded in a match page
+
+    :param session: The session to make the request with
+    :param html: The unrendered HTML of the match page
+    :param api_base: The base address of the lolesports API
+    :return: A list of links to the match history pages, empty if the ids were not found or the request failed
+    """
+
+    ids = dict()
+    for payload in _embedded_payloads(html):
+        for item in _walk(payload):
+            for key in ('tournamentId', 'matchId'):
+                if isinstance(item.get(key), str):
+                    ids.setdefault(key, item[key])
+
+    if len(ids) != 2:
+        return list()
+
+    r = session.get(f'{api_base}v2/highlanderMatchDetails', params=ids)
+    if not r.ok:
+        return list()
+
+    try:
+        return canonical_links(_links_from_payload(r.json()))
+    except ValueError:
+        return list()
+
+
+def _tally(stats: Union[None, Dict[str, int]], key: str) -> None:
+    if stats is None:
+        return
+    with _stats_lock:
+        stats[key] += 1
+
+
+def _match_page_links(html: HTML, xpath: str) -> List[str]:
+    next_link = list()
+    for nl in html.xpath('//a[contains(@href, "{}")]'.format(xpath)):
+        next_link.extend(sorted(nl.absolute_links))
+
+    return canonical_links(next_link)
+
+
+def direct_match_pages(link: str, session: HTMLSession, xpath: str, fallback: bool = True,
+                       ready_timeout: float = DEFAULT_READY_TIMEOUT, fallback_sleep: int = DEFAULT_FALLBACK_SLEEP,
+                       timings: list = None, stats: Dict[str, int] = None) -> List[str]:
+    """
+    Reads the links to the match pages from the source of a schedule page, rendering it if there are none. Without
+    fallback a page with none raises LinksNotFoundError, so it is not taken for a page without matches
+
+    :param link: Link to the lolesports schedule page
+    :param session: The session to fetch, and if needed render, the page with
+    :param xpath: The href substring of the links to the match pages
+    :param fallback: If True the page is rendered when no links can be read from its source
+    :param ready_timeout: Seconds to wait for the links to appear on a page rendered as a fallback
+    :param fallback_sleep: Seconds to sleep when a fallback render did not find the links, 0 disables it
+    :param timings: If provided a pageRender.RenderTiming is appended to it for a fallback render
+    :param stats: If provided 1 is added to its 'direct' or 'rendered' count
+    :return: A list of links to the match pages
+    """
+
+    next_link = _match_page_links(session.get(link).html, xpath)
+
+    if next_link:
+        _tally(stats, 'direct')
+    elif fallback:
+        _tally(stats, 'rendered')
+        html = render_page(session, link, href_selector(xpath), ready_timeout, fallback_sleep, timings)
+        next_link = _match_page_links(html, xpath)
+    else:
+        raise LinksNotFoundError(f'No match page links could be read from {link} without rendering it')
+
+    return next_link
+
+
+def direct_stats_links(link: str, session: HTMLSession, css_selector: str, api_base: str = API_BASE,
+                       fallback: bool = True, ready_timeout: float = DEFAULT_READY_TIMEOUT,
+                       fallback_sleep: int = DEFAULT_FALLBACK_SLEEP, timings: list = None,
+                       stats: Dict[str, int] = None) -> List[str]:
+    """
+    Reads the match history links of a match page from its source, embedded JSON or the match details API, rendering
+    it if none of them have the links. Without fallback a page with none raises LinksNotFoundError
+
+    :param link: Link to the lolesports match page
+    :param session: The session to fetch, and if needed render, the page with
+    :param css_selector: The class of the links to the match history pages, used by the render fallback
+    :param api_base: The base address of the lolesports API
+    :param fallback: If True the page is rendered when no links can be read from it
+    :param ready_timeout: Seconds to wait for the links to appear on a page rendered as a fallback
+    :param fallback_sleep: Seconds to sleep when a fallback render did not find the links, 0 disables it
+    :param timings: If provided a pageRender.RenderTiming is appended to it for a fallback render
+    :param stats: If provided 1 is added to its 'direct' or 'rendered' count
+    :return: A list of links to the match history pages
+    """
+
+    html = session.get(link).html
+    found = extract_stats_links(html) or _match_details_links(session, html, api_base)
+
+    if found:
+        _tally(stats, 'direct')
+    elif fallback:
+        _tally(stats, 'rendered')
+        html = render_page(session, link, css_selector, ready_timeout, fallback_sleep, timings)
+        for stat in html.find('{}'.format(css_selector)):
+            found.extend(sorted(stat.absolute_links))
+        found = canonical_links(found)
+    else:
+        raise LinksNotFoundError(f'No match history links could be read from {link} without rendering it')
+
+    return found
+
+
+def get_direct_match_history_links(schedule_links: Tuple[str], xpath: str = None, css_selector: str = None,
+                                   session: HTMLSession = None, api_base: str = API_BASE, fallback: bool = True,
+                                   ready_timeout: float = DEFAULT_READY_TIMEOUT,
+                                   fallback_sleep: int = DEFAULT_FALLBACK_SLEEP, timings: list = None,
+                                   stats: Dict[str, int] = None, ledger: JobLedger = None,
+                                   on_found: Callable[[List[str]], None] = None,
+                                   seen: Union[None, SeenSet, BloomFilter] = None, workers: int = 1,
+                                   errors: Dict[str, Exception] = None) -> tuple:
+    """
+    Finds the match history links with plain HTTP requests instead of rendering. The schedule and match pages are
+    downloaded without running their JavaScript and the links are read from the page source, the JSON embedded in it,
+    and the lolesports match details API. Any page the links can not be extracted from is rendered instead when
+    fallback is True. Without fallback such a page fails with LinksNotFoundError, so it is recorded as failed in the
+    ledger and errors and tried again by a later run rather than taken for a page without links.
+
+    With more than one worker the pages are downloaded in that many threads over the session. A session can only
+    render from one thread, so each page that needs rendering is crawled on its own in the calling thread while the
+    threads are idle, and the match pages found on it are downloaded in the threads again.
+
+    :param schedule_links: A Tuple of links to the lolesports schedule page
+    :param xpath: The href substring of the links to the match pages
+    :param css_selector: The class for the links to the full match history pages, used by the render fallback
+    :param session: The session to make the requests with, see crawlSession.create_session
+    :param api_base: The base address of the lolesports API
+    :param fallback: If True pages without extractable links are rendered, else they fail
+    :param ready_timeout: Seconds to wait for the links to appear on a page rendered as a fallback
+    :param fallback_sleep: Seconds to sleep when a fallback render did not find the links, 0 disables it
+    :param timings: If provided a pageRender.RenderTiming is appended to it for every fallback render
+    :param stats: If provided the counts of pages read directly and rendered are added under 'direct' and 'rendered'
+    :param ledger: A jobLedger.JobLedger, pages already done in it are not fetched again
+    :param on_found: Called with the match history links of each match page as soon as they are found
+    :param seen: The links already crawled, see matchCrawler.crawl_schedule_pages
+    :param workers: The number of pages downloaded at once
+    :param errors: If provided a page that fails is stored in it under its link and skipped, see
+                   matchCrawler.crawl_schedule_pages
+    :return: A tuple of links to the match history pages
+    """
+    if any([xpath is None, css_selector is None]):
+        raise ValueError('xpath and css_selector must not be None')
+
+    if not isinstance(schedule_links, (list, tuple)):
+        raise TypeError('The links provided were not of type list or tuple')
+
+    if session is None:
+        session = create_session()
+
+    if stats is None:
+        stats = dict()
+    stats.setdefault('direct', 0)
+    stats.setdefault('rendered', 0)
+
+    settings = dict(session=session, ready_timeout=ready_timeout, fallback_sleep=fallback_sleep, timings=timings,
+                    stats=stats)
+
+    def _finders(render: bool) -> Tuple[Callable[[str], List[str]], Callable[[str], List[str]]]:
+        return (partial(direct_match_pages, xpath=xpath, fallback=render, **settings),
+                partial(direct_stats_links, css_selector=css_selector, api_base=api_base, fallback=render,
+                        **settings))
+
+    threaded = fallback and workers > 1
+    match_history_list = crawl_schedule_pages(schedule_links, *_finders(fallback and not threaded), ledger, on_found,
+                                              seen, workers, errors, _finders(True) if threaded else None)
+
+    return match_history_list
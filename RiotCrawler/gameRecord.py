@@ -0,0 +1,143 @@
+from collections.abc import Mapping
+from typing import Iterator, List, Union
+
+from RiotCrawler import jsonCodec
+from RiotCrawler.linkDedup import game_key
+
+
+class GameRecord(Mapping):
+    """
+    The game and timeline JSON of one game, kept apart as the ACS server sent them. Each is held as the raw response
+    bytes and only decoded the first time it is used, so a job that reads the end of game stats in record.game never
+    pays for decoding the much larger timeline and its frames. Decoding uses the fastest installed codec, see jsonCodec.
+
+    A record can also be read like the old merged dict. A key is looked up in the game first and only then in the
+    timeline, so game keys are never overwritten and record['frames'] decodes the timeline on demand.
+
+    >>> record = GameRecord('TRLH1_1002440062', game_bytes, timeline_bytes)
+    >>> record.game['gameDuration']      # the timeline is still undecoded
+    >>> record.frames[-1]['timestamp']   # decodes the timeline
+    """
+
+    def __init__(self, key: str, game: Union[bytes, dict], timeline: Union[bytes, dict], link: str = None):
+        """
+        :param key: The realm and game id of the game, as 'TRLH1_1002440062'
+        :param game: The game JSON as the raw bytes of the response or already decoded
+        :param timeline: The timeline JSON as the raw bytes of the response or already decoded
+        :param link: The match history link the game was fetched from, if known
+        """
+
+        self.key = key
+        self.link = link
+        self._raw = {'game': None, 'timeline': None}
+        self._decoded = {'game': None, 'timeline': None}
+
+        for part, value in (('game', game), ('timeline', timeline)):
+            if isinstance(value, (bytes, bytearray, memoryview)):
+                self._raw[part] = bytes(value)
+            else:
+                self._decoded[part] = value
+
+    def _part(self, part: str) -> dict:
+        if self._decoded[part] is None:
+            self._decoded[part] = jsonCodec.loads(self._raw[part])
+        return self._decoded[part]
+
+    @property
+    def game(self) -> dict:
+        """
+        :return: The decoded game JSON, the end of game stats of the teams and participants
+        """
+
+        return self._part('game')
+
+    @property
+    def timeline(self) -> dict:
+        """
+        :return: The decoded timeline JSON
+        """
+
+        return self._part('timeline')
+
+    @property
+    def frames(self) -> List[dict]:
+        """
+        :return: The frames of the timeline, decoding the timeline if it has not been yet
+        """
+
+        return self.timeline.get('frames', [])
+
+    def is_decoded(self, part: str) -> bool:
+        """
+        :param part: 'game' or 'timeline'
+        :return: True if the part has been decoded
+        """
+
+        return self._decoded[part] is not None
+
+    def raw(self, part: str) -> bytes:
+        """
+        :param part: 'game' or 'timeline'
+        :return: The JSON of the part as bytes, the response bytes unless the record was made from a decoded dict
+        """
+
+        if self._raw[part] is None:
+            self._raw[part] = jsonCodec.dumps(self._decoded[part])
+        return self._raw[part]
+
+    def to_json(self) -> bytes:
+        """
+        Writes the record as {"game": ..., "timeline": ...} from the raw bytes of both parts without decoding them
+
+        :return: The JSON of the record as bytes
+        """
+
+        return b'{"game":' + self.raw('game') + b',"timeline":' + self.raw('timeline') + b'}'
+
+    def to_dict(self) -> dict:
+        """
+        :return: {'game': game, 'timeline': timeline}, decoding both parts
+        """
+
+        return {'game': self.game, 'timeline': self.timeline}
+
+    @classmethod
+    def from_dict(cls, data: dict, key: str = None) -> 'GameRecord':
+        """
+        Reads a record saved with to_json, or a merged game and timeline dict from an older crawl
+
+        :param data: The decoded JSON of the record
+        :param key: The key of the game, made from its platformId and gameId if None
+        :return: A GameRecord
+        """
+
+        if 'game' in data and 'timeline' in data:
+            game, timeline = data['game'], data['timeline']
+        else:
+            timeline = {k: data[k] for k in ('frames', 'frameInterval') if k in data}
+            game = {k: v for k, v in data.items() if k not in timeline}
+
+        if key is None:
+            key = game_key(game.get('platformId'), game.get('gameId'))
+
+        return cls(key, game, timeline)
+
+    def __getitem__(self, item: str):
+        game = self.game
+        if item in game:
+            return game[item]
+        return self.timeline[item]
+
+    def __contains__(self, item) -> bool:
+        return item in self.game or item in self.timeline
+
+    def __iter__(self) -> Iterator[str]:
+        game = self.game
+        yield from game
+        yield from (k for k in self.timeline if k not in game)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f'GameRecord({self.key!r})'
@@ -0,0 +1,331 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Union
+
+from RiotCrawler.crawlMetrics import METRICS
+
+LEDGER_FILE = 'crawl_ledger.sqlite'
+
+SCHEDULE = 'schedule'
+MATCH = 'match'
+GAME = 'game'
+
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    stage TEXT NOT NULL,
+    key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    updated REAL NOT NULL,
+    parent TEXT,
+    PRIMARY KEY (stage, key)
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (stage, status);
+"""
+
+
+class JobLedger(object):
+    """
+    A checkpoint of a crawl kept in one SQLite file. Every schedule link, match page and game is a job in one of the
+    stages SCHEDULE, MATCH or GAME with a status of PENDING, DONE or FAILED. The links a schedule or match page led to
+    are stored with it, so a rerun can rebuild the links of finished pages without fetching them again and only fetches
+    what is pending or failed. Each match page and game also keeps the page it was found on, see JobLedger.parent.
+
+    >>> ledger = JobLedger('./Json Downloads/crawl_ledger.sqlite')
+    >>> ledger.result(SCHEDULE, link)  # None unless the page was crawled
+    >>> ledger.complete(SCHEDULE, link, match_pages)
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: Path of the SQLite file, created along with its folder if it does not exist
+        """
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(_SCHEMA)
+
+        # Ledgers written before parents were kept
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(jobs)')]
+        if 'parent' not in columns:
+            self._conn.execute('ALTER TABLE jobs ADD COLUMN parent TEXT')
+            self._conn.commit()
+
+    def add(self, stage: str, keys: Iterable[str], parent: str = None) -> None:
+        """
+        Adds jobs as pending, jobs already in the ledger keep their status
+
+        :param stage: One of SCHEDULE, MATCH or GAME
+        :param keys: The links of the jobs
+        :param parent: The link of the page the jobs were found on, kept for jobs that do not have one yet
+        :return: None
+        """
+
+        now = time.time()
+        with self._lock:
+            self._conn.executemany('INSERT INTO jobs (stage, key, status, updated, parent) VALUES (?, ?, ?, ?, ?) '
+                                   'ON CONFLICT (stage, key) DO UPDATE SET parent = COALESCE(parent, excluded.parent)',
+                                   [(stage, k, PENDING, now, parent) for k in keys])
+            self._conn.commit()
+
+    def complete(self, stage: str, key: str, result: List[str] = None) -> None:
+        """
+        Marks a job as done and stores the links it led to
+
+        :param stage: One of SCHEDULE, MATCH or GAME
+        :param key: The link of the job
+        :param result: The links found on the page, stored so a rerun can use them without fetching the page
+        :return: None
+        """
+
+        self._set(stage, key, DONE, json.dumps(result) if result is not None else None, None)
+
+    def fail(self, stage: str, key: str, error: Union[str, Exception]) -> None:
+        """
+        Marks a job as failed so it is tried again on the next run
+
+        :param stage: One of SCHEDULE, MATCH or GAME
+        :param key: The link of the job
+        :param error: The error the job failed with
+        :return: None
+        """
+
+        self._set(stage, key, FAILED, None, f'{type(error).__name__}: {error}' if isinstance(error, Exception)
+                  else str(error))
+
+    def _set(self, stage: str, key: str, status: str, result: Union[None, str], error: Union[None, str]) -> None:
+        with self._lock:
+            self._conn.execute('INSERT INTO jobs (stage, key, status, attempts, result, error, updated) '
+                               'VALUES (?, ?, ?, 1, ?, ?, ?) ON CONFLICT (stage, key) DO UPDATE SET '
+                               'status = excluded.status, attempts = attempts + 1, result = excluded.result, '
+                               'error = excluded.error, updated = excluded.updated',
+                               (stage, key, status, result, error, time.time()))
+            self._conn.commit()
+
+    def status(self, stage: str, key: str) -> Union[None, str]:
+        """
+        :param stage: One of SCHEDULE, MATCH or GAME
+        :param key: The link of the job
+        :return: The status of the job or None if it is not in the ledger
+        """
+
+        with self._lock:
+            row = self._conn.execute('SELECT status FROM jobs WHERE stage = ? AND key = ?', (stage, key)).fetchone()
+
+        return row[0] if row is not None else None
+
+    def parent(self, stage: str, key: str) -> Union[None, str]:
+        """
+        :param stage: MATCH or GAME
+        :param key: The link of the job
+        :return: The link of the schedule page a match page, or the match page a game, was found on, None if not known.
+                 Jobs added before parents were kept are looked up in the stored results of the stage before
+        """
+
+        with self._lock:
+            row = self._conn.execute('SELECT parent FROM jobs WHERE stage = ? AND key = ?', (stage, key)).fetchone()
+            if row is not None and row[0] is not None:
+                return row[0]
+
+            found_on = SCHEDULE if stage == MATCH else MATCH
+            row = self._conn.execute('SELECT key FROM jobs WHERE stage = ? AND status = ? AND instr(result, ?) > 0 '
+                                     'LIMIT 1', (found_on, DONE, json.dumps(key))).fetchone()
+
+        return row[0] if row is not None else None
+
+    def is_done(self, stage: str, key: str) -> bool:
+        return self.status(stage, key) == DONE
+
+    def result(self, stage: str, key: str) -> Union[None, List[str]]:
+        """
+        :param stage: One of SCHEDULE, MATCH or GAME
+        :param key: The link of the job
+        :return: The stored links of the job if it is done, else None
+        """
+
+        with self._lock:
+            row = self._conn.execute('SELECT result FROM jobs WHERE stage = ? AND key = ? AND status = ?',
+                                     (stage, key, DONE)).fetchone()
+
+        if row is None:
+            return None
+
+        return json.loads(row[0]) if row[0] is not None else list()
+
+    def results(self, stage: str) -> Dict[str, List[str]]:
+        """
+        :param stage: One of SCHEDULE, MATCH or GAME
+        :return: The stored links of every done job in the stage, {key: links}
+        """
+
+        with self._lock:
+            rows = self._conn.execute('SELECT key, result FROM jobs WHERE stage = ? AND status = ?',
+                                      (stage, DONE)).fetchall()
+
+        return {key: json.loads(result) if result is not None else list() for key, result in rows}
+
+    def keys(self, stage: str, status: str = None) -> List[str]:
+        """
+        :param stage: One of SCHEDULE, MATCH or GAME
+        :param status: If provided only the jobs with this status are returned
+        :return: The links of the jobs in the stage
+        """
+
+        with self._lock:
+            if status is None:
+                rows = self._conn.execute('SELECT key FROM jobs WHERE stage = ?', (stage,)).fetchall()
+            else:
+                rows = self._conn.execute('SELECT key FROM jobs WHERE stage = ? AND status = ?',
+                                          (stage, status)).fetchall()
+
+        return [r[0] for r in rows]
+
+    def reopen(self, stage: str, predicate: Callable[[str, List[str]], bool]) -> int:
+        """
+        Sets done jobs back to pending so they are crawled again, used by incremental runs to look for new games
+
+        :param stage: One of SCHEDULE, MATCH or GAME
+        :param predicate: Called with the link and stored result of each done job, returns True to reopen it
+        :return: The number of jobs reopened
+        """
+
+        with self._lock:
+            rows = self._conn.execute('SELECT key, result FROM jobs WHERE stage = ? AND status = ?',
+                                      (stage, DONE)).fetchall()
+            reopen = [(PENDING, time.time(), stage, key) for key, result in rows
+                      if predicate(key, json.loads(result) if result is not None else list())]
+            self._conn.executemany('UPDATE jobs SET status = ?, updated = ? WHERE stage = ? AND key = ?', reopen)
+            self._conn.commit()
+
+        return len(reopen)
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        """
+        :return: The number of jobs of each status in each stage, {stage: {status: count}}
+        """
+
+        with self._lock:
+            rows = self._conn.execute('SELECT stage, status, COUNT(*) FROM jobs GROUP BY stage, status').fetchall()
+
+        summary = dict()
+        for stage, status, count in rows:
+            summary.setdefault(stage, dict())[status] = count
+
+        return summary
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def checkpoint(ledger: Union[None, JobLedger], stage: str, key: str, find: Callable[[str], List[str]],
+               errors: Dict[str, Exception] = None) -> Union[None, List[str]]:
+    """
+    Runs find for a page unless the ledger already has its result. Without a ledger or errors, errors are raised as
+    before. With either a failing page is recorded, as failed in the ledger and under its link in errors, and None is
+    returned so the rest of the crawl carries on.
+
+    :param ledger: The ledger of the crawl, may be None
+    :param stage: SCHEDULE or MATCH
+    :param key: The link of the page
+    :param find: Called with the link, returns the links found on the page
+    :param errors: If provided the error of a failing page is stored in it under the link of the page
+    :return: The links found on the page or None if it failed
+    """
+
+    if ledger is not None:
+        found = ledger.result(stage, key)
+        if found is not None:
+            METRICS.count('skipped', stage=stage)
+            return found
+
+    try:
+        found = _timed(stage, find, key)
+    except Exception as e:
+        if not _failed(ledger, stage, key, e, errors):
+            raise
+        return None
+
+    _record(ledger, stage, key, found)
+    return found
+
+
+async def checkpoint_async(ledger: Union[None, JobLedger], stage: str, key: str, find,
+                           errors: Dict[str, Exception] = None) -> Union[None, List[str]]:
+    """
+    The same as checkpoint for a find that is a coroutine function
+
+    :param ledger: The ledger of the crawl, may be None
+    :param stage: SCHEDULE or MATCH
+    :param key: The link of the page
+    :param find: Coroutine function called with the link, returns the links found on the page
+    :param errors: If provided the error of a failing page is stored in it under the link of the page
+    :return: The links found on the page or None if it failed
+    """
+
+    if ledger is not None:
+        found = ledger.result(stage, key)
+        if found is not None:
+            METRICS.count('skipped', stage=stage)
+            return found
+
+    try:
+        found = await _timed_async(stage, find, key)
+    except Exception as e:
+        if not _failed(ledger, stage, key, e, errors):
+            raise
+        return None
+
+    _record(ledger, stage, key, found)
+    return found
+
+
+def _timed(stage: str, find: Callable[[str], List[str]], key: str) -> List[str]:
+    with METRICS.timer(stage=stage):
+        found = find(key)
+    METRICS.count('found', len(found), stage=stage)
+    return found
+
+
+async def _timed_async(stage: str, find, key: str) -> List[str]:
+    with METRICS.timer(stage=stage):
+        found = await find(key)
+    METRICS.count('found', len(found), stage=stage)
+    return found
+
+
+def _failed(ledger: Union[None, JobLedger], stage: str, key: str, error: Exception,
+            errors: Union[None, Dict[str, Exception]]) -> bool:
+    """
+    Records a failing page in the ledger and errors
+
+    :return: False if there is neither, and the error should be raised
+    """
+
+    if ledger is not None:
+        ledger.fail(stage, key, error)
+    if errors is not None:
+        errors[key] = error
+
+    return ledger is not None or errors is not None
+
+
+def _record(ledger: Union[None, JobLedger], stage: str, key: str, found: List[str]) -> None:
+    if ledger is None:
+        return
+
+    ledger.complete(stage, key, found)
+    ledger.add(MATCH if stage == SCHEDULE else GAME, found, parent=key)
@@ -0,0 +1,90 @@
+import json
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+PREFERENCE = ('orjson', 'msgspec', 'ujson', 'json')
+
+
+def _stdlib() -> Tuple[Callable[[bytes], Any], Callable[[Any], bytes]]:
+    return json.loads, lambda obj: json.dumps(obj, separators=(',', ':')).encode()
+
+
+def _orjson() -> Tuple[Callable[[bytes], Any], Callable[[Any], bytes]]:
+    import orjson
+    return orjson.loads, orjson.dumps
+
+
+def _msgspec() -> Tuple[Callable[[bytes], Any], Callable[[Any], bytes]]:
+    import msgspec
+    return msgspec.json.decode, msgspec.json.encode
+
+
+def _ujson() -> Tuple[Callable[[bytes], Any], Callable[[Any], bytes]]:
+    import ujson
+    return ujson.loads, lambda obj: ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False).encode()
+
+
+_LOADERS = {'orjson': _orjson, 'msgspec': _msgspec, 'ujson': _ujson, 'json': _stdlib}
+
+
+def _available() -> Dict[str, Tuple[Callable[[bytes], Any], Callable[[Any], bytes]]]:
+    codecs = OrderedDict()
+    for name in PREFERENCE:
+        try:
+            codecs[name] = _LOADERS[name]()
+        except ImportError:
+            pass
+
+    return codecs
+
+
+_CODECS = _available()
+CODEC = next(iter(_CODECS))
+_loads, _dumps = _CODECS[CODEC]
+
+
+def available_codecs() -> List[str]:
+    """
+    :return: The names of the installed codecs, fastest first. 'json' is always available
+    """
+
+    return list(_CODECS)
+
+
+def use_codec(name: str) -> None:
+    """
+    Sets the codec used by loads and dumps. The fastest installed codec of orjson, msgspec and ujson is used by
+    default, falling back to the standard library json.
+
+    :param name: One of available_codecs()
+    :return: None
+    """
+    global CODEC, _loads, _dumps
+
+    if name not in _CODECS:
+        raise ValueError(f'codec must be one of {", ".join(_CODECS)}, {name} is not installed')
+
+    CODEC = name
+    _loads, _dumps = _CODECS[name]
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """
+    Decodes JSON with the current codec
+
+    :param data: The JSON as bytes or str
+    :return: The decoded object
+    """
+
+    return _loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Encodes an object as compact UTF-8 JSON with the current codec
+
+    :param obj: The object to encode
+    :return: The JSON as bytes
+    """
+
+    return _dumps(obj)
@@ -0,0 +1,222 @@
+import hashlib
+import math
+import re
+from typing import Dict, Iterable, List, Set, Union
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urlsplit, urlunsplit
+
+MATCH_HISTORY_BASE = 'https://matchhistory.na.leagueoflegends.com/en/#match-details/'
+
+_MATCH_DETAILS = re.compile(r'^/?match-details/([^/?#]+)/(\d+)/?(?:\?(.*))?$')
+_SLASHES = re.compile(r'/{2,}')
+_PATH_SAFE = "/:@!$&'()*+,;=~"
+
+
+def canonical_link(link: str) -> str:
+    """
+    Normalizes a link so every way of writing the same page gives the same string. The scheme becomes https, the host
+    is lowercased and default ports, repeated and trailing slashes, fragments and utm_ parameters are dropped, the path
+    is quoted the same way and the query sorted. A link to a server on its own port, such as a local mirror, keeps its
+    scheme.
+
+    Match history links name a game by the realm, id and gameHash in their fragment, which is all the JSON is fetched
+    by, so they are rewritten onto MATCH_HISTORY_BASE whatever regional host and language they were found with.
+
+    >>> canonical_link('http://matchhistory.euw.leagueoflegends.com/de/#match-details/TRLH1/1?gameHash=A3B0&tab=1')
+    'https://matchhistory.na.leagueoflegends.com/en/#match-details/TRLH1/1?gameHash=a3b0'
+
+    :param link: An absolute link
+    :return: The canonical link, the link unchanged if it is not absolute
+    """
+
+    parts = urlsplit(link.strip())
+    if not parts.scheme or not parts.netloc:
+        return link
+
+    host = (parts.hostname or '').lower()
+    match = _MATCH_DETAILS.match(parts.fragment)
+
+    if host.startswith('matchhistory.') and match is not None:
+        realm, game_id, query = match.groups()
+        game_hash = dict(parse_qsl(query or '')).get('gameHash')
+        link = f'{MATCH_HISTORY_BASE}{realm.upper()}/{game_id}'
+        return f'{link}?gameHash={game_hash.lower()}' if game_hash else link
+
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port in (None, 80, 443):
+        scheme, netloc = 'https', host
+    else:
+        scheme, netloc = parts.scheme.lower(), f'{host}:{port}'
+
+    path = quote(unquote(_SLASHES.sub('/', parts.path)), safe=_PATH_SAFE)
+    if len(path) > 1:
+        path = path.rstrip('/')
+
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not k.startswith('utm_'))
+
+    return urlunsplit((scheme, netloc, path, urlencode(query, quote_via=quote), ''))
+
+
+def game_key(realm: str, game_id: Union[int, str]) -> str:
+    """
+    :param realm: The realm, or platformId, of the game
+    :param game_id: The id of the game
+    :return: The key every game is saved and indexed by, as 'TRLH1_1002440062'
+    """
+
+    return f'{realm}_{game_id}'
+
+
+def link_game_key(link: str) -> Union[None, str]:
+    """
+    >>> link_game_key('https://matchhistory.na.leagueoflegends.com/en/#match-details/ESPORTSTMNT01/690260?gameHash=a3')
+    'ESPORTSTMNT01_690260'
+
+    :param link: A match history link
+    :return: The game_key of the realm and game id in the fragment of the link, None if it is not a match history link
+    """
+
+    match = _MATCH_DETAILS.match(urlsplit(link).fragment)
+    return game_key(*match.groups()[:2]) if match is not None else None
+
+
+def canonical_links(links: Iterable[str]) -> List[str]:
+    """
+    :param links: Absolute links
+    :return: The canonical links without duplicates, in the order they were first found
+    """
+
+    return list(dict.fromkeys(canonical_link(link) for link in links))
+
+
+def _digest(link: str, size: int) -> bytes:
+    return hashlib.blake2b(canonical_link(link).encode(), digest_size=size).digest()
+
+
+class SeenSet(object):
+    """
+    The links already seen in a crawl, kept as a set of 64 bit hashes of their canonical links rather than the links
+    themselves, a fraction of the memory of a set of strings. Two links that differ only in how they are written are
+    the same link.
+
+    >>> seen = SeenSet()
+    >>> [link for link in links if seen.add(link)]  # every link once
+    """
+
+    def __init__(self, links: Iterable[str] = ()):
+        """
+        :param links: Links that are already seen
+        """
+
+        self._hashes = set()
+        for link in links:
+            self.add(link)
+
+    def add(self, link: str) -> bool:
+        """
+        :param link: An absolute link
+        :return: True if the link had not been seen yet
+        """
+
+        digest = int.from_bytes(_digest(link, 8), 'little')
+        if digest in self._hashes:
+            return False
+
+        self._hashes.add(digest)
+        return True
+
+    def __contains__(self, link: str) -> bool:
+        return int.from_bytes(_digest(link, 8), 'little') in self._hashes
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+
+class BloomFilter(object):
+    """
+    A SeenSet of fixed size for very large crawls, about 0.6 bytes a link for each decimal digit of error_rate. In
+    exchange a link that was never added is taken as seen with a probability of error_rate, and would then be
+    skipped.
+
+    >>> seen = BloomFilter(50_000_000, error_rate=1e-7)
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 1e-6, links: Iterable[str] = ()):
+        """
+        :param capacity: The number of links the filter is sized for, error_rate grows past it
+        :param error_rate: The chance that a link not added is taken as seen
+        :param links: Links that are already seen
+        """
+
+        if capacity < 1 or not 0 < error_rate < 1:
+            raise ValueError('capacity must be greater than 0 and error_rate between 0 and 1')
+
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self._count = 0
+
+        for link in links:
+            self.add(link)
+
+    def _positions(self, link: str) -> List[int]:
+        digest = _digest(link, 16)
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, link: str) -> bool:
+        """
+        :param link: An absolute link
+        :return: True if the link had not been seen yet
+        """
+
+        new = False
+        for position in self._positions(link):
+            byte, bit = divmod(position, 8)
+            if not self._bits[byte] & (1 << bit):
+                self._bits[byte] |= 1 << bit
+                new = True
+
+        self._count += new
+        return new
+
+    def __contains__(self, link: str) -> bool:
+        return all(self._bits[p // 8] & (1 << p % 8) for p in self._positions(link))
+
+    def __len__(self) -> int:
+        return self._count
+
+
+def unique_links(links: Iterable[str], seen: Union[None, SeenSet, BloomFilter] = None) -> List[str]:
+    """
+    :param links: Links in the order they were found
+    :param seen: Links already seen, updated with the new links. A new SeenSet if None
+    :return: The links not seen before, each once
+    """
+
+    if seen is None:
+        seen = SeenSet()
+
+    return [link for link in links if seen.add(link)]
+
+
+def ordered_links(schedule_links: Iterable[str], page_links: Dict[str, List[str]], new_links: Set[str]) -> List[str]:
+    """
+    Puts the match history links of a crawl that ran its pages concurrently in the order a crawl of one page at a time
+    finds them: by schedule page, then by match page, then by their order on the page. The result is the same however
+    the pages finished.
+
+    :param schedule_links: The schedule links in the order they were given
+    :param page_links: The links found on each schedule and match page, {page: links}
+    :param new_links: The match history links the crawl found that were not seen before it
+    :return: Each link of new_links once
+    """
+
+    found = (link for schedule_link in schedule_links for match_page in page_links.get(schedule_link, ())
+             for link in page_links.get(match_page, ()) if link in new_links)
+
+    return list(dict.fromkeys(found))
@@ -1,8 +1,12 @@
 import datetime
 import warnings
-from typing import Dict, List, Tuple
+from typing import Dict, List, Tuple, Union
+
+from requests_html import HTMLSession
 
 from RiotCrawler.Exceptions.errors import BaseExtError, RegionError, SplitError
+from RiotCrawler.crawlMetrics import METRICS
+from RiotCrawler.seasonCalendar import SeasonCalendar, plan_weeks, verify_plan
 
 
 def _create_base_ext(config_dict: Dict[str, Dict[str, str]]) -> str:
@@ -75,88 +79,86 @@ def _create_schedule_ext(base_ext: str, config_dict: Dict[str, Dict[str, str]])
     return links
 
 
-def _handle_week(links: List[str], config_dict: Dict[str, Dict[str, str]]) -> Tuple[str]:
+def _parse_week(config_dict: Dict[str, Dict[str, str]]) -> Union[int, range, str]:
     """
-    Creates the final full link by parseing the weeks variable
+    Reads the week of the config, every week up to it if flag = True is set in extras
 
-    :param links: A list of links to add the week property too. Created by _create_schedule_ext
     :param config_dict: The config dict of the config.ini
-    :return: A tuple of full links to the lolesports schedule page
+    :return: A week, a range of weeks, or 'all', 'playoffs' or a playoff round
     """
+
     week = config_dict['default_init']['week']
-    playoff_exts = ['Wild%20Card', 'Round%201', 'Round%202', 'Round%203', 'Finals', 'Quarterfinals', 'Semifinals']
 
     try:
-        if config_dict['extra']['flag'].lower() == 'true':
-            try:
-                week = range(1, int(week) + 1)
-            except ValueError:
-                pass
-        else:
-            try:
-                week = int(week)
-            except ValueError:
-                pass
-    except KeyError:
-        try:
-            week = int(week)
-        except ValueError:
-            pass
+        week = int(week)
+    except ValueError:
+        return week
 
-    if not isinstance(links, list) or (len(links) == 0):
-        raise Exception('Invalid links provided. Must be of type list and have length greater than 0.')
+    if config_dict.get('extra', {}).get('flag', '').lower() == 'true':
+        return range(1, week + 1)
 
-    if isinstance(week, range):
-        return tuple(f'{l}regular_season/{i}' for i in week for l in links)
-    elif isinstance(week, int):
-        return tuple(f'{l}regular_season/{week}' for l in links)
-    else:
-        if week.lower() == 'all':
-            l1 = [f'{l}regular_season/{i}' for i in range(1, 10) for l in links]
+    return week
+
+
+def _handle_week(links: List[str], config_dict: Dict[str, Dict[str, str]],
+                 calendar: SeasonCalendar = None) -> Tuple[str]:
+    """
+    Creates the final full link by parseing the weeks variable. Only the weeks and playoff rounds the season calendar
+    has for each league, split and year are created
+
+    :param links: A list of links to add the week property too. Created by _create_schedule_ext
+    :param config_dict: The config dict of the config.ini
+    :param calendar: The calendar of the seasons, the defaults of seasonCalendar.LEAGUES if None
+    :return: A tuple of full links to the lolesports schedule page
+    """
 
-            if config_dict['default_init']['region'] in ['all', 'lck', 'lms']:
-                l1.extend([f'{l}regular_season/10' for l in links])
+    if not isinstance(links, list) or (len(links) == 0):
+        raise Exception('Invalid links provided. Must be of type list and have length greater than 0.')
 
-            l2 = [f'{l}playoffs/{p}' for p in playoff_exts for l in links]
-            l1.extend(l2)
-            return _clean_up_links(l1)
+    planned = tuple(plan_weeks(links, _parse_week(config_dict), calendar or SeasonCalendar()))
 
-        elif week.lower() == 'playoffs':
-            l1 = [f'{l}playoffs/{p}' for p in playoff_exts for l in links]
-            return _clean_up_links(l1)
+    if len(planned) == 0:
+        warnings.warn('No schedule pages exist for the config. This usually happens when a region did not play in the '
+                      'year given, or when one of NA, EU, or Academy were provided with an invalid playoff '
+                      'specification like Wild%20Card or Round%201')
 
-        else:
-            l1 = [f'{l}playoffs/{config_dict["default_init"]["week"]}' for l in links]
-            return _clean_up_links(l1)
+    return planned
 
 
-def _clean_up_links(links: List[str]) -> Tuple[str]:
+def verify_setting(config_dict: Dict[str, Dict[str, str]]) -> bool:
     """
-    Cleans up links by removing known dead links
-
-    :param links: A list of links to remove dead links from
-    :return: A tuple of good links
+    :param config_dict: The configuration dict created from the config.ini file
+    :return: Whether planned pages are checked before they are crawled, True unless verify = false in config.ini
     """
-    final_list = links.copy()
-    for l in links:
-        if ('%20' in l) and ('-' in l):
-            final_list.remove(l)
-    if len(final_list) != 0:
-        return tuple(final_list)
-    else:
-        warnings.warn('All links were removed during cleanup as they were invalid links. This usually happens when '
-                      'one of NA, EU, or Academy were provided with an invalid playoff specification like '
-                      'Wild%20Card or Round%201')
-        return tuple(final_list)
 
+    return str(config_dict.get('extra', {}).get('verify', 'true')).lower() not in ('false', 'no', '0')
 
-def create_links(config_dict: Dict[str, Dict[str, str]]) -> Tuple[str]:
+
+def create_links(config_dict: Dict[str, Dict[str, str]], calendar: SeasonCalendar = None, verify: bool = False,
+                 session: HTMLSession = None, workers: int = 16) -> Tuple[str]:
     """
-    Will create a list of links to the schedule page on lolesports. From here you can find all the match histories
+    Will create a list of links to the schedule page on lolesports. From here you can find all the match histories.
+    Only the weeks and playoff rounds in the season calendar are created, and with verify the pages the calendar has
+    not checked before are checked with HEAD requests, the missing ones dropped and the calendar updated. Without
+    verify no request is made. Seasons the calendar has no entry for are planned from the guesses in
+    seasonCalendar.LEAGUES, which is why RiotCrawl.make_links verifies unless config.ini turns it off.
+
     :param config_dict: The configuration dict created from the config.ini file
+    :param calendar: The calendar of the seasons, see seasonCalendar.SeasonCalendar
+    :param verify: If True the links are checked, see seasonCalendar.verify_plan
+    :param session: The session to check the links with, if None one is created for the check and closed after it
+    :param workers: The number of links checked at once
     :return: A tuple of links
     """
 
-    base_ext = _create_base_ext(config_dict)
-    links = _create_schedule_ext(base_ext, config_dict)
-    return _handle_week(links, config_dict)
+    if calendar is None:
+        calendar = SeasonCalendar()
+
+    with METRICS.timer(stage='links'):
+        base_ext = _create_base_ext(config_dict)
+        links = _handle_week(_create_schedule_ext(base_ext, config_dict), config_dict, calendar)
+        if verify:
+            links = verify_plan(links, calendar, session, workers)
+
+    METRICS.count('found', len(links), stage='links')
+    return links
@@ -1,16 +1,45 @@
-from typing import Tuple
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+from typing import Callable, Dict, List, Tuple, Union
 
 from requests_html import HTMLSession
 
+from RiotCrawler.Exceptions.errors import LinksNotFoundError
+from RiotCrawler.browserPool import BrowserPagePool, discover_links
+from RiotCrawler.crawlSession import create_session
+from RiotCrawler.jobLedger import MATCH, SCHEDULE, JobLedger, checkpoint
+from RiotCrawler.linkDedup import BloomFilter, SeenSet, canonical_links, ordered_links
+from RiotCrawler.pageRender import DEFAULT_FALLBACK_SLEEP, DEFAULT_READY_TIMEOUT, href_selector, render_page
+
 
 def get_match_history_links(schedule_links: Tuple[str], xpath: str = None,
-                            css_selector: str = None) -> tuple:
+                            css_selector: str = None, session: HTMLSession = None,
+                            ready_timeout: float = DEFAULT_READY_TIMEOUT, fallback_sleep: int = DEFAULT_FALLBACK_SLEEP,
+                            timings: list = None, pool: BrowserPagePool = None, ledger: JobLedger = None,
+                            on_found: Callable[[List[str]], None] = None,
+                            seen: Union[None, SeenSet, BloomFilter] = None, workers: int = None,
+                            errors: Dict[str, Exception] = None) -> tuple:
     """
-    Crawls the schedule page of lolesports to find the match history pages and return the links to them
+    Crawls the schedule page of lolesports to find the match history pages and return the links to them. Each page is
+    rendered only until the links being looked for appear, see pageRender.render_page. If a BrowserPagePool is given,
+    or workers is more than 1, the schedule and match pages are rendered concurrently in the tabs of a pool instead of
+    one at a time through the session. The links are returned in the same order either way.
 
     :param schedule_links: A Tuple of links to the lolesports schedule page
     :param xpath: The xpath selector for the links to the game pages
     :param css_selector: The class for the links to the full match history pages.
+    :param session: The session to fetch and render the pages with, see crawlSession.create_session
+    :param ready_timeout: Seconds to wait for the links to appear on each page
+    :param fallback_sleep: Seconds to sleep when rendering again after the links did not appear, 0 disables it
+    :param timings: If provided a pageRender.RenderTiming is appended to it for every page rendered
+    :param pool: A browser page pool to render the pages in, ready_timeout and fallback_sleep of the pool are used
+    :param ledger: A jobLedger.JobLedger, pages already done in it are not crawled again, see crawl_schedule_pages
+    :param on_found: Called with the match history links of each match page as soon as they are found
+    :param seen: The links already crawled, see crawl_schedule_pages
+    :param workers: The number of pages rendered at once when no pool is given. A BrowserPagePool of this many tabs is
+                    started for the crawl and closed after it
+    :param errors: If provided a page that fails is stored in it under its link and skipped, see crawl_schedule_pages
     :return: A tuple of links to the match history pages
     """
     if any([xpath is None, css_selector is None]):
@@ -19,25 +48,234 @@ def get_match_history_links(schedule_links: Tuple[str], xpath: str = None,
     if not isinstance(schedule_links, (list, tuple)):
         raise TypeError('The links provided were not of type list or tuple')
 
-    session = HTMLSession()
+    if session is None and pool is None:
+        session = create_session()
+
+    if pool is None and workers is not None and workers > 1:
+        pool = BrowserPagePool(workers, ready_timeout, fallback_sleep, cache=session.response_cache,
+                               limiter=session.rate_limiter)
+        try:
+            return get_match_history_links(schedule_links, xpath, css_selector, session, timings=timings, pool=pool,
+                                           ledger=ledger, on_found=on_found, seen=seen, errors=errors)
+        finally:
+            pool.close()
+
+    if pool is not None:
+        return tuple(pool.run(discover_links(pool, schedule_links, xpath, css_selector, timings, ledger, on_found,
+                                             seen, errors)))
+
     session.browser
+
+    return crawl_schedule_pages(schedule_links,
+                                partial(render_match_pages, session=session, xpath=xpath,
+                                        ready_timeout=ready_timeout, fallback_sleep=fallback_sleep, timings=timings),
+                                partial(render_stats_links, session=session, css_selector=css_selector,
+                                        ready_timeout=ready_timeout, fallback_sleep=fallback_sleep, timings=timings),
+                                ledger, on_found, seen, errors=errors)
+
+
+def render_match_pages(link: str, session: HTMLSession, xpath: str, ready_timeout: float = DEFAULT_READY_TIMEOUT,
+                       fallback_sleep: int = DEFAULT_FALLBACK_SLEEP, timings: list = None) -> List[str]:
+    """
+    Renders a schedule page and returns the links to its match pages
+
+    :param link: Link to the lolesports schedule page
+    :param session: The session to fetch and render the page with
+    :param xpath: The href substring of the links to the match pages
+    :param ready_timeout: Seconds to wait for the links to appear
+    :param fallback_sleep: Seconds to sleep when rendering again after the links did not appear, 0 disables it
+    :param timings: If provided a pageRender.RenderTiming is appended to it
+    :return: A list of canonical links to the match pages
+    """
+
+    html = render_page(session, link, href_selector(xpath), ready_timeout, fallback_sleep, timings)
+    next_link = list()
+
+    for nl in html.xpath('//a[contains(@href, "{}")]'.format(xpath)):
+        next_link.extend(([h for h in nl.absolute_links]))
+
+    return canonical_links(next_link)
+
+
+def render_stats_links(link: str, session: HTMLSession, css_selector: str,
+                       ready_timeout: float = DEFAULT_READY_TIMEOUT, fallback_sleep: int = DEFAULT_FALLBACK_SLEEP,
+                       timings: list = None) -> List[str]:
+    """
+    Renders a match page and returns the links to the full match history pages of its games
+
+    :param link: Link to the lolesports match page
+    :param session: The session to fetch and render the page with
+    :param css_selector: The css selector of the links to the full match history pages
+    :param ready_timeout: Seconds to wait for the links to appear
+    :param fallback_sleep: Seconds to sleep when rendering again after the links did not appear, 0 disables it
+    :param timings: If provided a pageRender.RenderTiming is appended to it
+    :return: A list of canonical links to the match history pages
+    """
+
+    html = render_page(session, link, css_selector, ready_timeout, fallback_sleep, timings)
+    stats_links = list()
+
+    for stat in html.find('{}'.format(css_selector)):
+        stats_links.extend([h for h in stat.absolute_links])
+
+    return canonical_links(stats_links)
+
+
+def crawl_schedule_pages(schedule_links: Tuple[str], find_match_pages: Callable[[str], List[str]],
+                         find_stats_links: Callable[[str], List[str]], ledger: JobLedger = None,
+                         on_found: Callable[[List[str]], None] = None,
+                         seen: Union[None, SeenSet, BloomFilter] = None, workers: int = 1,
+                         errors: Dict[str, Exception] = None,
+                         fallback: Tuple[Callable[[str], List[str]], Callable[[str], List[str]]] = None) -> tuple:
+    """
+    Walks every schedule page and each of its match pages with the given functions and collects the match history
+    links. When a ledger is given pages it already has are not fetched again. A page that fails is recorded in the
+    ledger or errors, whichever are given, and skipped rather than stopping the crawl.
+
+    Every page and link is crawled once, however many schedule pages link to it or however it is written, see
+    linkDedup.canonical_link.
+
+    With more than one worker the pages are crawled in that many threads, every schedule page and every match page
+    found on one a separate task, so the functions must be safe to call from several threads at once. The links are
+    returned in the same order as a crawl with one worker. Pages that need to be rendered can not be crawled from the
+    threads, so each page whose function raises LinksNotFoundError is crawled again on its own with the fallback
+    functions in the calling thread while no thread is busy. The match pages found on it go back to the threads.
+
+    :param schedule_links: A Tuple of links to the lolesports schedule page
+    :param find_match_pages: Called with a schedule link, returns the links to its match pages
+    :param find_stats_links: Called with a match page link, returns the links to its match history pages
+    :param ledger: The ledger of the crawl, may be None
+    :param on_found: If provided it is called with the match history links of each match page as soon as they are
+                     found, letting later stages start before the crawl finishes
+    :param seen: The links already crawled, shared with other crawls to skip what they have done. Pages and links
+                 are added as they are crawled. A new linkDedup.SeenSet if None
+    :param workers: The number of pages crawled at once
+    :param errors: If provided the error of every page that failed is stored in it under the link of the page
+    :param fallback: With more than one worker, the find_match_pages and find_stats_links used for the pages that
+                     raised LinksNotFoundError
+    :return: A tuple of links to the match history pages
+    """
+
+    if not isinstance(workers, int) or workers < 1:
+        raise ValueError('workers must be an int greater than 0')
+
+    if seen is None:
+        seen = SeenSet()
+
+    if workers > 1:
+        return _crawl_concurrently(schedule_links, find_match_pages, find_stats_links, ledger, on_found, seen, workers,
+                                   errors, fallback)
+
     match_history_list = list()
 
     for link in schedule_links:
-        r = session.get(link)
-        r.html.render(sleep=10)
-        tmp_next = r.html.xpath('//a[contains(@href, "{}")]'.format(xpath))
-        next_link = list()
+        if not seen.add(link):
+            continue
 
-        for nl in tmp_next:
-            next_link.extend(([h for h in nl.absolute_links]))
+        next_link = checkpoint(ledger, SCHEDULE, link, find_match_pages, errors) or list()
 
         for l in next_link:
-            r = session.get(l)
-            r.html.render(sleep=10)
-            stat_link = r.html.find('{}'.format(css_selector))
+            if not seen.add(l):
+                continue
+
+            stats_links = [s for s in checkpoint(ledger, MATCH, l, find_stats_links, errors) or list()
+                           if seen.add(s)]
+            match_history_list.extend(stats_links)
+
+            if on_found is not None and stats_links:
+                on_found(stats_links)
+
+    return tuple(match_history_list)
+
+
+def _crawl_concurrently(schedule_links: Tuple[str], find_match_pages: Callable[[str], List[str]],
+                        find_stats_links: Callable[[str], List[str]], ledger: Union[None, JobLedger],
+                        on_found: Union[None, Callable[[List[str]], None]], seen: Union[SeenSet, BloomFilter],
+                        workers: int, errors: Union[None, Dict[str, Exception]],
+                        fallback: Union[None, Tuple[Callable[[str], List[str]], Callable[[str], List[str]]]]) -> tuple:
+    """
+    crawl_schedule_pages in a pool of threads. Pages are handed to the threads as they are found and every check of
+    seen is made in this thread, so a page or link is crawled once across the threads. The pages left for the fallback
+    functions are crawled in this thread, one at a time whenever the threads are idle.
+    """
+
+    page_links = dict()
+    new_links = set()
+    # With a fallback every failure is kept here first, to tell the pages to crawl again from the ones that failed
+    failed = dict() if fallback is not None else errors
+
+    def _found(stage: str, link: str, found: List[str]) -> List[str]:
+        """
+        Records the links found on a page
+
+        :return: The match pages still to crawl
+        """
+
+        page_links[link] = found
+        if stage == SCHEDULE:
+            return [l for l in found if seen.add(l)]
+
+        stats_links = [s for s in found if seen.add(s)]
+        new_links.update(stats_links)
+        if on_found is not None and stats_links:
+            on_found(stats_links)
+
+        return list()
+
+    def _needs_fallback(link: str) -> bool:
+        """
+        Forwards the failure of a page to errors, or raises it, unless it only needs the fallback functions
+
+        :return: True if the page raised LinksNotFoundError and is to be crawled again with the fallback functions
+        """
+
+        e = failed.pop(link, None)
+        if isinstance(e, LinksNotFoundError):
+            return True
+        if e is not None:
+            if errors is not None:
+                errors[link] = e
+            elif ledger is None:
+                raise e
+
+        return False
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='crawl_schedule_pages') as executor:
+        running = dict()
+        waiting = deque()
+
+        def _submit(stage: str, link: str) -> None:
+            find = find_match_pages if stage == SCHEDULE else find_stats_links
+            running[executor.submit(checkpoint, ledger, stage, link, find, failed)] = (stage, link)
+
+        for link in schedule_links:
+            if seen.add(link):
+                _submit(SCHEDULE, link)
+
+        try:
+            while running or waiting:
+                if not running:
+                    # Only the page that raised LinksNotFoundError is crawled again, the match pages found on it are
+                    # handed back to the threads and fall back on their own if they need to
+                    stage, link = waiting.popleft()
+                    find = fallback[0] if stage == SCHEDULE else fallback[1]
+                    for l in _found(stage, link, checkpoint(ledger, stage, link, find, errors) or list()):
+                        _submit(MATCH, l)
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
 
-            for stat in stat_link:
-                match_history_list.extend([h for h in stat.absolute_links])
+                for future in done:
+                    stage, link = running.pop(future)
+                    found = future.result()
+                    if found is None and fallback is not None and _needs_fallback(link):
+                        waiting.append((stage, link))
+                        continue
+                    for l in _found(stage, link, found or list()):
+                        _submit(MATCH, l)
+        except BaseException:
+            for future in running:
+                future.cancel()
+            raise
 
-        return tuple(match_history_list)
+    return tuple(ordered_links(schedule_links, page_links, new_links))
@@ -0,0 +1,388 @@
+"""
+Rebuilds the match index of a download folder.
+
+    python -m RiotCrawler.matchIndex rebuild "./Json Downloads" --processes 8
+"""
+import argparse
+import gzip
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from multiprocessing import Pool
+from typing import IO, Dict, Iterable, Iterator, List, Union
+from urllib.parse import unquote
+
+from RiotCrawler import jsonCodec
+from RiotCrawler.gameRecord import GameRecord
+from RiotCrawler.jobLedger import GAME, LEDGER_FILE, MATCH, SCHEDULE, JobLedger
+from RiotCrawler.linkDedup import link_game_key
+from RiotCrawler.storageSinks import JsonSink, StorageSink
+
+INDEX_FILE = 'match_index.sqlite'
+
+COLUMNS = ('key', 'game_id', 'realm', 'game_hash', 'region', 'year', 'split', 'week', 'blue', 'red', 'winner',
+           'duration', 'patch', 'created', 'link', 'schedule_link', 'path')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    key TEXT PRIMARY KEY,
+    game_id INTEGER,
+    realm TEXT,
+    game_hash TEXT,
+    region TEXT,
+    year INTEGER,
+    split TEXT,
+    week TEXT,
+    blue TEXT,
+    red TEXT,
+    winner TEXT,
+    duration INTEGER,
+    patch TEXT,
+    created INTEGER,
+    link TEXT,
+    schedule_link TEXT,
+    path TEXT,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_season ON games (region, year, split, week);
+CREATE INDEX IF NOT EXISTS games_blue ON games (blue COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS games_red ON games (red COLLATE NOCASE);
+"""
+
+_REGIONS = {'na-lcs': 'na', 'eu-lcs': 'eu', 'lms': 'lms', 'lck': 'lck', 'na-academy': 'academy'}
+_SCHEDULE_LINK = re.compile(r'/([a-z-]+)/[a-z_]+?_(\d{4})_(spring|summer)/schedule/[a-z_]+/([^/?#]+)')
+_MATCH_DETAILS = re.compile(r'#match-details/([^/]+)/(\d+)\?gameHash=([0-9a-fA-F]+)')
+_GAME_FILE = re.compile(r'^game_.+\.json$|^[^.].*\.jsonl(\.gz|\.zst)?$')
+
+
+def schedule_context(link: Union[None, str]) -> Dict[str, Union[None, int, str]]:
+    """
+    Reads the region, year, split and week from a lolesports schedule link made by makeLinks.create_links
+
+    :param link: The schedule link, may be None
+    :return: {'region': 'lck', 'year': 2017, 'split': 'summer', 'week': '3'}, values are None if not known
+    """
+
+    match = _SCHEDULE_LINK.search(link or '')
+    if match is None:
+        return {'region': None, 'year': None, 'split': None, 'week': None}
+
+    league, year, split, week = match.groups()
+    return {'region': _REGIONS.get(league, league), 'year': int(year), 'split': split, 'week': unquote(week)}
+
+
+def _team_tag(names: Iterable[str]) -> Union[None, str]:
+    """
+    Pro players are named with their team tag first, as 'SKT Faker', so the most common first word of the names of a
+    team is taken as its tag
+    """
+
+    tags = Counter(n.split(' ', 1)[0] for n in names if n and ' ' in n)
+    return tags.most_common(1)[0][0] if tags else None
+
+
+def game_row(record: GameRecord, schedule_link: str = None, path: str = None) -> Dict[str, Union[None, int, str]]:
+    """
+    Makes the index row of a game. Only the game JSON is decoded, never the timeline.
+
+    :param record: The game
+    :param schedule_link: The schedule link the game was found from, if known
+    :param path: Where the game is saved
+    :return: A dict of COLUMNS
+    """
+
+    game = record.game
+    players = {i.get('participantId'): (i.get('player') or {}).get('summonerName')
+               for i in game.get('participantIdentities', ())}
+    names = dict()
+    for participant in game.get('participants', ()):
+        names.setdefault(participant.get('teamId'), list()).append(players.get(participant.get('participantId')))
+    tags = {team_id: _team_tag(team_names) for team_id, team_names in names.items()}
+    winner = next((t.get('teamId') for t in game.get('teams', ()) if t.get('win') == 'Win'), None)
+    version = game.get('gameVersion')
+
+    match = _MATCH_DETAILS.search(record.link or '')
+    row = {'key': record.key, 'game_id': game.get('gameId'), 'realm': game.get('platformId'),
+           'game_hash': match.group(3) if match is not None else None, 'blue': tags.get(100), 'red': tags.get(200),
+           'winner': tags.get(winner), 'duration': game.get('gameDuration'),
+           'patch': '.'.join(version.split('.')[:2]) if version else None, 'created': game.get('gameCreation'),
+           'link': record.link, 'schedule_link': schedule_link, 'path': path}
+    row.update(schedule_context(schedule_link))
+
+    return row
+
+
+class MatchIndex(object):
+    """
+    An index of the crawled games kept in one SQLite file, so games can be found by region, season, team or patch
+    without opening the saved files. The region, split and week of a game come from the schedule link it was found
+    from, looked up in the ledger of the crawl.
+
+    >>> index = MatchIndex('./Json Downloads/match_index.sqlite', ledger)
+    >>> index.query(region='lck', year=2017, split='summer', team='SKT')
+    """
+
+    def __init__(self, path: str, ledger: JobLedger = None):
+        """
+        :param path: Path of the SQLite file, created along with its folder if it does not exist
+        :param ledger: The ledger of the crawl, used to find the schedule link of each game
+        """
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.path = path
+        self.ledger = ledger
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(_SCHEMA)
+
+    def schedule_link(self, link: Union[None, str]) -> Union[None, str]:
+        """
+        :param link: A match history link
+        :return: The schedule link the game was found from in the ledger, None if it is not known
+        """
+
+        if link is None or self.ledger is None:
+            return None
+
+        match_page = self.ledger.parent(GAME, link)
+        return self.ledger.parent(MATCH, match_page) if match_page is not None else None
+
+    def add(self, record: GameRecord, path: str = None) -> None:
+        """
+        Adds or replaces the row of a game
+
+        :param record: The game
+        :param path: Where the game is saved
+        :return: None
+        """
+
+        self.add_rows([game_row(record, self.schedule_link(record.link), path)])
+
+    def add_rows(self, rows: Iterable[Dict[str, Union[None, int, str]]]) -> None:
+        """
+        :param rows: Rows made by game_row
+        :return: None
+        """
+
+        now = time.time()
+        values = [tuple(row.get(c) for c in COLUMNS) + (now,) for row in rows]
+        with self._lock:
+            self._conn.executemany(f'INSERT OR REPLACE INTO games ({", ".join(COLUMNS)}, updated) '
+                                   f'VALUES ({", ".join("?" * (len(COLUMNS) + 1))})', values)
+            self._conn.commit()
+
+    def query(self, region: str = None, year: int = None, split: str = None, week: Union[int, str] = None,
+              team: str = None, game_id: int = None, patch: str = None, min_duration: int = None,
+              max_duration: int = None) -> List[Dict[str, Union[None, int, str]]]:
+        """
+        Finds games, every filter given must match. Teams are matched by tag on either side, ignoring case.
+
+        :param region: One of na, eu, lms, lck or academy
+        :param year: The year of the season
+        :param split: spring or summer
+        :param week: The week of the regular season, as 3, or the playoff round, as 'Finals'
+        :param team: The tag of a team, as 'SKT'
+        :param game_id: The id of the game
+        :param patch: The patch, as '7.12'
+        :param min_duration: The least game duration in seconds
+        :param max_duration: The most game duration in seconds
+        :return: The rows of the games as dicts of COLUMNS, oldest first
+        """
+
+        where = list()
+        params = list()
+        for column, value in (('region', region), ('year', year), ('split', split), ('game_id', game_id),
+                              ('patch', patch)):
+            if value is not None:
+                where.append(f'{column} = ?')
+                params.append(value)
+
+        if week is not None:
+            where.append('week = ?')
+            params.append(str(week))
+        if team is not None:
+            where.append('(blue = ? COLLATE NOCASE OR red = ? COLLATE NOCASE)')
+            params.extend((team, team))
+        if min_duration is not None:
+            where.append('duration >= ?')
+            params.append(min_duration)
+        if max_duration is not None:
+            where.append('duration <= ?')
+            params.append(max_duration)
+
+        sql = f'SELECT {", ".join(COLUMNS)} FROM games'
+        if where:
+            sql += f' WHERE {" AND ".join(where)}'
+
+        with self._lock:
+            rows = self._conn.execute(sql + ' ORDER BY created, game_id', params).fetchall()
+
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute('DELETE FROM games')
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM games').fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _schedule_links(ledger: JobLedger) -> Dict[str, str]:
+    """
+    :param ledger: The ledger of a crawl
+    :return: The schedule link of every match history link the ledger has found, {match history link: schedule link}
+    """
+
+    match_pages = {page: link for link, pages in ledger.results(SCHEDULE).items() for page in pages}
+    return {game: match_pages.get(page) for page, games in ledger.results(MATCH).items() for game in games}
+
+
+class IndexingSink(StorageSink):
+    """
+    Adds every game written to a sink to a MatchIndex
+    """
+
+    def __init__(self, sink: StorageSink, index: MatchIndex):
+        """
+        :param sink: The sink the games are written to, closed with this sink
+        :param index: The index, left open
+        """
+
+        self.sink = sink
+        self.index = index
+
+    def write(self, record: GameRecord) -> None:
+        self.sink.write(record)
+
+        folder = getattr(self.sink, 'folder', None)
+        if isinstance(self.sink, JsonSink):
+            path = os.path.join(folder, f'game_{record.key}.json')
+        else:
+            path = folder
+        self.index.add(record, path)
+
+    def close(self) -> None:
+        self.sink.close()
+
+
+def _read_games(path: str) -> List[Dict[str, Union[None, int, str]]]:
+    """
+    Makes the index rows of the games saved in a file, run in the processes of rebuild_index
+
+    :param path: A game_<key>.json or JSON Lines file
+    :return: The rows, without the link and schedule of the games
+    """
+
+    if path.endswith('.json'):
+        with open(path, 'rb') as f:
+            return [game_row(GameRecord.from_dict(jsonCodec.loads(f.read())), path=path)]
+
+    if path.endswith('.gz'):
+        f = gzip.open(path, 'rb')
+    elif path.endswith('.zst'):
+        import zstandard
+        f = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    else:
+        f = open(path, 'rb')
+
+    # One game is decoded at a time rather than the whole file at once
+    with f:
+        return [game_row(GameRecord.from_dict(jsonCodec.loads(line)), path=path) for line in _lines(f)
+                if line.strip()]
+
+
+def _lines(f: IO[bytes], chunk_size: int = 2 ** 20) -> Iterator[bytes]:
+    """
+    Yields the lines of a binary file a chunk at a time, for readers such as zstandard's that can not iterate lines
+    """
+
+    rest = b''
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+
+        lines = (rest + chunk).split(b'\n')
+        rest = lines.pop()
+        yield from lines
+
+    if rest:
+        yield rest
+
+
+def rebuild_index(folder: str, index_path: str = None, processes: int = None, ledger_path: str = None) -> int:
+    """
+    Indexes every game saved in a download folder in the json or jsonl formats again. The files are read in parallel
+    by a pool of processes. The links and schedules of the games are taken from the ledger of the folder if it has one.
+
+    :param folder: The download folder
+    :param index_path: Path of the index, INDEX_FILE in folder if None. Its current rows are replaced
+    :param processes: The number of processes reading files, the number of CPUs if None
+    :param ledger_path: Path of the ledger of the crawl, LEDGER_FILE in folder if None and it exists
+    :return: The number of games indexed
+    """
+
+    if index_path is None:
+        index_path = os.path.join(folder, INDEX_FILE)
+    if ledger_path is None and os.path.exists(os.path.join(folder, LEDGER_FILE)):
+        ledger_path = os.path.join(folder, LEDGER_FILE)
+
+    files = sorted(os.path.join(folder, name) for name in os.listdir(folder) if _GAME_FILE.match(name))
+
+    links = dict()
+    schedules = dict()
+    if ledger_path is not None:
+        ledger = JobLedger(ledger_path)
+        try:
+            links = {link_game_key(link): link for link in ledger.keys(GAME)}
+            schedules = _schedule_links(ledger)
+        finally:
+            ledger.close()
+
+    index = MatchIndex(index_path)
+    count = 0
+    try:
+        index.clear()
+        with Pool(processes) as pool:
+            for rows in pool.imap_unordered(_read_games, files, chunksize=max(1, len(files) // 64)):
+                for row in rows:
+                    row['link'] = link = links.get(row['key'])
+                    if link is not None:
+                        row['game_hash'] = _MATCH_DETAILS.search(link).group(3)
+                        row['schedule_link'] = schedules.get(link)
+                        row.update(schedule_context(row['schedule_link']))
+                index.add_rows(rows)
+                count += len(rows)
+    finally:
+        index.close()
+
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=('rebuild',))
+    parser.add_argument('folder', help='The download folder')
+    parser.add_argument('--index', default=None, help=f'Path of the index, {INDEX_FILE} in the folder by default')
+    parser.add_argument('--processes', type=int, default=None, help='Processes reading files, the CPUs by default')
+    parser.add_argument('--ledger', default=None, help=f'Path of the ledger, {LEDGER_FILE} in the folder by default')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count = rebuild_index(args.folder, args.index, args.processes, args.ledger)
+    print(f'Indexed {count} games in {time.perf_counter() - start:.1f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,323 @@
+from operator import attrgetter
+from typing import Callable, Dict, Iterable, List, Tuple, Union
+
+from RiotCrawler.gameRecord import GameRecord
+
+FRAME_FIELDS = ('total_gold', 'current_gold', 'xp', 'level', 'minions_killed', 'jungle_minions_killed', 'x', 'y')
+DEFAULT_FRAME_FIELDS = ('total_gold', 'xp', 'minions_killed')
+PARTICIPANT_FIELDS = ('kills', 'deaths', 'assists', 'gold_earned', 'minions_killed', 'damage_to_champions',
+                      'champion_level')
+
+# The key of each of FRAME_FIELDS in a participant frame of the timeline JSON, x and y are read from its position
+_FRAME_KEYS = {'total_gold': 'totalGold', 'current_gold': 'currentGold', 'xp': 'xp', 'level': 'level',
+               'minions_killed': 'minionsKilled', 'jungle_minions_killed': 'jungleMinionsKilled'}
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError('The array extractors require the numpy package, pip install numpy')
+
+    return numpy
+
+
+class Event(object):
+    """
+    An event of a timeline frame. The type, timestamp and participantId every event has are attributes, anything
+    else the event carries is kept in data.
+    """
+
+    __slots__ = ('type', 'timestamp', 'participant_id', 'data')
+
+    def __init__(self, type: str, timestamp: int, participant_id: int = None, data: dict = None):
+        self.type = type
+        self.timestamp = timestamp
+        self.participant_id = participant_id
+        self.data = data
+
+    @classmethod
+    def from_json(cls, event: dict) -> 'Event':
+        data = {k: v for k, v in event.items() if k not in ('type', 'timestamp', 'participantId')}
+        return cls(event.get('type'), event.get('timestamp'), event.get('participantId'), data or None)
+
+    def __repr__(self) -> str:
+        return f'Event({self.type!r}, {self.timestamp}, {self.participant_id})'
+
+
+class ParticipantFrame(object):
+    """
+    The state of one participant at a timeline frame
+    """
+
+    __slots__ = ('participant_id',) + FRAME_FIELDS
+
+    def __init__(self, participant_id: int, total_gold: int = 0, current_gold: int = 0, xp: int = 0, level: int = 0,
+                 minions_killed: int = 0, jungle_minions_killed: int = 0, x: int = None, y: int = None):
+        self.participant_id = participant_id
+        self.total_gold = total_gold
+        self.current_gold = current_gold
+        self.xp = xp
+        self.level = level
+        self.minions_killed = minions_killed
+        self.jungle_minions_killed = jungle_minions_killed
+        self.x = x
+        self.y = y
+
+    @classmethod
+    def from_json(cls, frame: dict) -> 'ParticipantFrame':
+        position = frame.get('position') or {}
+        return cls(frame.get('participantId'), frame.get('totalGold', 0), frame.get('currentGold', 0),
+                   frame.get('xp', 0), frame.get('level', 0), frame.get('minionsKilled', 0),
+                   frame.get('jungleMinionsKilled', 0), position.get('x'), position.get('y'))
+
+    def __repr__(self) -> str:
+        return f'ParticipantFrame({self.participant_id}, total_gold={self.total_gold}, xp={self.xp})'
+
+
+class Frame(object):
+    """
+    A timeline frame, the participant frames ordered by participantId and the events since the previous frame
+    """
+
+    __slots__ = ('timestamp', 'participants', 'events')
+
+    def __init__(self, timestamp: int, participants: Tuple[ParticipantFrame, ...], events: Tuple[Event, ...] = ()):
+        self.timestamp = timestamp
+        self.participants = participants
+        self.events = events
+
+    @classmethod
+    def from_json(cls, frame: dict) -> 'Frame':
+        participants = sorted((ParticipantFrame.from_json(p) for p in frame.get('participantFrames', {}).values()),
+                              key=attrgetter('participant_id'))
+        events = tuple(Event.from_json(e) for e in frame.get('events', ()))
+        return cls(frame.get('timestamp'), tuple(participants), events)
+
+    def __repr__(self) -> str:
+        return f'Frame({self.timestamp}, {len(self.events)} events)'
+
+
+class Team(object):
+    """
+    The end of game stats of a team
+    """
+
+    __slots__ = ('team_id', 'win', 'first_blood', 'tower_kills', 'inhibitor_kills', 'baron_kills', 'dragon_kills',
+                 'bans')
+
+    def __init__(self, team_id: int, win: bool, first_blood: bool = False, tower_kills: int = 0,
+                 inhibitor_kills: int = 0, baron_kills: int = 0, dragon_kills: int = 0, bans: Tuple[int, ...] = ()):
+        self.team_id = team_id
+        self.win = win
+        self.first_blood = first_blood
+        self.tower_kills = tower_kills
+        self.inhibitor_kills = inhibitor_kills
+        self.baron_kills = baron_kills
+        self.dragon_kills = dragon_kills
+        self.bans = bans
+
+    @classmethod
+    def from_json(cls, team: dict) -> 'Team':
+        bans = tuple(b.get('championId') for b in sorted(team.get('bans', ()), key=lambda b: b.get('pickTurn', 0)))
+        return cls(team.get('teamId'), team.get('win') == 'Win', bool(team.get('firstBlood')),
+                   team.get('towerKills', 0), team.get('inhibitorKills', 0), team.get('baronKills', 0),
+                   team.get('dragonKills', 0), bans)
+
+    def __repr__(self) -> str:
+        return f'Team({self.team_id}, win={self.win})'
+
+
+class Participant(object):
+    """
+    A participant of a game, the player and champion and their end of game stats
+    """
+
+    __slots__ = ('participant_id', 'team_id', 'champion_id', 'summoner_name', 'lane', 'role', 'win') + \
+        PARTICIPANT_FIELDS
+
+    def __init__(self, participant_id: int, team_id: int, champion_id: int, summoner_name: str = None,
+                 lane: str = None, role: str = None, win: bool = False, kills: int = 0, deaths: int = 0,
+                 assists: int = 0, gold_earned: int = 0, minions_killed: int = 0, damage_to_champions: int = 0,
+                 champion_level: int = 0):
+        self.participant_id = participant_id
+        self.team_id = team_id
+        self.champion_id = champion_id
+        self.summoner_name = summoner_name
+        self.lane = lane
+        self.role = role
+        self.win = win
+        self.kills = kills
+        self.deaths = deaths
+        self.assists = assists
+        self.gold_earned = gold_earned
+        self.minions_killed = minions_killed
+        self.damage_to_champions = damage_to_champions
+        self.champion_level = champion_level
+
+    @classmethod
+    def from_json(cls, participant: dict, player: dict = None) -> 'Participant':
+        stats = participant.get('stats', {})
+        timeline = participant.get('timeline', {})
+        return cls(participant.get('participantId'), participant.get('teamId'), participant.get('championId'),
+                   (player or {}).get('summonerName'), timeline.get('lane'), timeline.get('role'),
+                   bool(stats.get('win')), stats.get('kills', 0), stats.get('deaths', 0), stats.get('assists', 0),
+                   stats.get('goldEarned', 0), stats.get('totalMinionsKilled', 0),
+                   stats.get('totalDamageDealtToChampions', 0), stats.get('champLevel', 0))
+
+    def __repr__(self) -> str:
+        return f'Participant({self.participant_id}, {self.summoner_name!r}, champion_id={self.champion_id})'
+
+
+class Game(object):
+    """
+    A game as slotted objects instead of nested dicts, for holding many games in memory. Only the commonly used fields
+    are kept, anything else is still in the GameRecord the game was made from.
+
+    >>> game = Game.from_record(record)
+    >>> game.participants[0].kills
+    >>> game.frames[10].participants[0].total_gold
+    """
+
+    __slots__ = ('key', 'game_id', 'platform_id', 'creation', 'duration', 'version', 'teams', 'participants',
+                 'frames')
+
+    def __init__(self, key: str, game_id: int, platform_id: str, creation: int = None, duration: int = None,
+                 version: str = None, teams: Tuple[Team, ...] = (), participants: Tuple[Participant, ...] = (),
+                 frames: Tuple[Frame, ...] = ()):
+        self.key = key
+        self.game_id = game_id
+        self.platform_id = platform_id
+        self.creation = creation
+        self.duration = duration
+        self.version = version
+        self.teams = teams
+        self.participants = participants
+        self.frames = frames
+
+    @classmethod
+    def from_record(cls, record: Union[GameRecord, dict], frames: bool = True) -> 'Game':
+        """
+        :param record: A GameRecord, or a saved {"game": ..., "timeline": ...} or merged dict
+        :param frames: False to leave out the timeline, which is then never decoded
+        :return: A Game
+        """
+
+        if not isinstance(record, GameRecord):
+            record = GameRecord.from_dict(record)
+
+        game = record.game
+        players = {i.get('participantId'): i.get('player') for i in game.get('participantIdentities', ())}
+        participants = sorted((Participant.from_json(p, players.get(p.get('participantId')))
+                               for p in game.get('participants', ())), key=attrgetter('participant_id'))
+
+        return cls(record.key, game.get('gameId'), game.get('platformId'), game.get('gameCreation'),
+                   game.get('gameDuration'), game.get('gameVersion'),
+                   tuple(Team.from_json(t) for t in game.get('teams', ())), tuple(participants),
+                   tuple(Frame.from_json(f) for f in record.frames) if frames else ())
+
+    def __repr__(self) -> str:
+        return f'Game({self.key!r}, {len(self.frames)} frames)'
+
+
+def _as_games(games: Iterable[Union[Game, GameRecord, dict]], frames: bool = True) -> List[Game]:
+    return [g if isinstance(g, Game) else Game.from_record(g, frames) for g in games]
+
+
+def _frame_readers(fields: Tuple[str, ...]) -> List[Callable[[dict], Union[None, int]]]:
+    """
+    :param fields: Attributes of ParticipantFrame
+    :return: For each field a function reading it from a participant frame of the timeline JSON, with the defaults of
+             ParticipantFrame.from_json
+    """
+
+    readers = list()
+    for field in fields:
+        if field in ('x', 'y'):
+            readers.append(lambda frame, axis=field: (frame.get('position') or {}).get(axis))
+        else:
+            readers.append(lambda frame, key=_FRAME_KEYS[field]: frame.get(key, 0))
+
+    return readers
+
+
+def _participant_rows(frame: Union[Frame, dict], readers: List[Callable[[dict], Union[None, int]]],
+                      getter: Callable[[ParticipantFrame], tuple], participants: int) -> List[tuple]:
+    if isinstance(frame, Frame):
+        return [getter(p) for p in frame.participants[:participants]]
+
+    frames = sorted(frame.get('participantFrames', {}).values(), key=lambda p: p.get('participantId') or 0)
+    return [tuple(read(p) for read in readers) for p in frames[:participants]]
+
+
+def frame_arrays(games: Iterable[Union[Game, GameRecord, dict]], fields: Iterable[str] = DEFAULT_FRAME_FIELDS,
+                 minutes: int = None, participants: int = 10) -> Dict[str, 'numpy.ndarray']:
+    """
+    Extracts per frame values of every participant of a set of games as arrays of shape
+    (games, frames, participants). Games with fewer frames than the longest, or than minutes, are padded with NaN.
+    The participant frames of GameRecords and dicts are read straight from their timeline JSON, the events are skipped
+    and no Game is built.
+
+    >>> arrays = frame_arrays(games, ('total_gold', 'xp'), minutes=15)
+    >>> gold_diff_at_15 = arrays['total_gold'][:, 15, :5].sum(1) - arrays['total_gold'][:, 15, 5:].sum(1)
+
+    :param games: Games, GameRecords or game dicts
+    :param fields: Attributes of ParticipantFrame, see FRAME_FIELDS
+    :param minutes: Only the frames up to this minute, the first frame being minute 0. None for every frame
+    :param participants: The number of participants in a game
+    :return: A dict of field to its float64 array, games in the order they were given
+    """
+
+    np = _numpy()
+    fields = tuple(fields)
+    for field in fields:
+        if field not in FRAME_FIELDS:
+            raise ValueError(f'field must be one of {", ".join(FRAME_FIELDS)}')
+
+    timelines = list()
+    for game in games:
+        if isinstance(game, Game):
+            timelines.append(game.frames)
+        else:
+            timelines.append((game if isinstance(game, GameRecord) else GameRecord.from_dict(game)).frames)
+
+    n_frames = max(map(len, timelines), default=0) if minutes is None else minutes + 1
+    out = np.full((len(fields), len(timelines), n_frames, participants), np.nan)
+    readers = _frame_readers(fields)
+    getter = attrgetter(*fields) if len(fields) > 1 else lambda p: (getattr(p, fields[0]),)
+
+    for g, frames in enumerate(timelines):
+        for f, frame in enumerate(frames[:n_frames]):
+            rows = _participant_rows(frame, readers, getter, participants)
+            if rows:
+                out[:, g, f, :len(rows)] = np.array(rows, dtype=float).T
+
+    return dict(zip(fields, out))
+
+
+def participant_arrays(games: Iterable[Union[Game, GameRecord, dict]], fields: Iterable[str] = PARTICIPANT_FIELDS,
+                       participants: int = 10) -> Dict[str, 'numpy.ndarray']:
+    """
+    Extracts the end of game stats of every participant of a set of games as arrays of shape (games, participants).
+    The timelines are never decoded.
+
+    :param games: Games, GameRecords or game dicts
+    :param fields: Attributes of Participant, see PARTICIPANT_FIELDS
+    :param participants: The number of participants in a game
+    :return: A dict of field to its float64 array, games in the order they were given
+    """
+
+    np = _numpy()
+    fields = tuple(fields)
+    for field in fields:
+        if field not in PARTICIPANT_FIELDS:
+            raise ValueError(f'field must be one of {", ".join(PARTICIPANT_FIELDS)}')
+
+    games = _as_games(games, frames=False)
+    out = np.full((len(fields), len(games), participants), np.nan)
+
+    for g, game in enumerate(games):
+        for p, participant in enumerate(game.participants[:participants]):
+            out[:, g, p] = [getattr(participant, field) for field in fields]
+
+    return dict(zip(fields, out))
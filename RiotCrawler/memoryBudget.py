@@ -0,0 +1,216 @@
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, Iterator, Union
+
+DEFAULT_MEMORY_SETTINGS = {'low_memory': False, 'rss_budget': 0, 'pages_per_worker': 0, 'spill_dir': None,
+                           'seen_capacity': 1_000_000}
+
+# Rough resident memory in megabytes of a worker process with its session, and of each tab of its headless browser,
+# used to fit the number of render processes in an RSS budget before any have been started
+PROCESS_MB = 250
+TAB_MB = 150
+
+
+def parse_memory_settings(config_dict: Dict[str, Dict[str, str]]) -> Dict[str, Union[None, bool, int, str]]:
+    """
+    Reads the memory settings out of the extra section of the config dict, using the defaults for any not provided
+
+    :param config_dict: Dict parsed from the config.ini file
+    :return: A dict of low_memory, rss_budget in megabytes (0 for none), pages_per_worker (0 to never recycle the
+             workers), spill_dir (None for the temporary folder) and seen_capacity, the number of links the fixed size
+             filter of the links seen in low memory mode is sized for
+    """
+
+    settings = DEFAULT_MEMORY_SETTINGS.copy()
+    extra = config_dict.get('extra', {})
+
+    if 'low_memory' in extra:
+        settings['low_memory'] = str(extra['low_memory']).lower() in ('true', 'yes', '1')
+
+    for key in ('rss_budget', 'pages_per_worker', 'seen_capacity'):
+        if key in extra:
+            try:
+                settings[key] = int(extra[key])
+            except ValueError:
+                raise ValueError(f'{key} in config.ini must be of type int')
+            if settings[key] < 0:
+                raise ValueError(f'{key} in config.ini must not be negative')
+
+    if settings['seen_capacity'] < 1:
+        raise ValueError('seen_capacity in config.ini must be greater than 0')
+
+    if 'spill_dir' in extra:
+        settings['spill_dir'] = extra['spill_dir']
+
+    return settings
+
+
+def process_rss(pid: int = None) -> Union[None, int]:
+    """
+    :param pid: The process, this process if None
+    :return: The resident memory of the process in bytes, None if it can not be read, as on systems without /proc
+    """
+
+    try:
+        with open(f'/proc/{pid or os.getpid()}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _child_pids() -> Dict[int, list]:
+    children = dict()
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The name of the process is in parentheses and may hold spaces, the parent pid is the second field
+                # after it
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, list()).append(int(entry))
+
+    return children
+
+
+def tree_rss(pid: int = None) -> Union[None, int]:
+    """
+    :param pid: The process, this process if None
+    :return: The resident memory in bytes of the process and every process under it, such as worker processes and the
+             headless browsers they started, None if it can not be read
+    """
+
+    pid = pid or os.getpid()
+    total = process_rss(pid)
+    if total is None:
+        return None
+
+    children = _child_pids()
+    waiting = list(children.get(pid, ()))
+    while waiting:
+        child = waiting.pop()
+        total += process_rss(child) or 0
+        waiting.extend(children.get(child, ()))
+
+    return total
+
+
+class MemoryBudget(object):
+    """
+    An RSS budget for this process and every process under it. The number of render processes is fitted to it before
+    they are started, and over() tells when to stop handing out pages until memory is released.
+
+    >>> budget = MemoryBudget(4096)
+    >>> budget.processes(8, tabs=4)
+    3
+    """
+
+    def __init__(self, budget_mb: int, interval: float = 1.0):
+        """
+        :param budget_mb: The budget in megabytes
+        :param interval: Seconds the measured RSS is reused for, measuring walks every process
+        """
+
+        if not isinstance(budget_mb, int) or budget_mb < 1:
+            raise ValueError('budget_mb must be an int greater than 0')
+
+        self.budget = budget_mb * 2 ** 20
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._measured = None
+        self._rss = None
+
+    def rss(self) -> Union[None, int]:
+        """
+        :return: The resident memory of this process and the processes under it in bytes, measured at most every
+                 interval seconds
+        """
+
+        with self._lock:
+            if self._measured is None or time.monotonic() - self._measured >= self.interval:
+                self._rss = tree_rss()
+                self._measured = time.monotonic()
+
+            return self._rss
+
+    def over(self) -> bool:
+        """
+        :return: True if the processes use more than the budget, always False if the RSS can not be read
+        """
+
+        rss = self.rss()
+        return rss is not None and rss > self.budget
+
+    def processes(self, requested: int, tabs: int = None) -> int:
+        """
+        :param requested: The number of render processes asked for
+        :param tabs: The number of browser tabs of each process, None or 0 for one page at a time
+        :return: The most of the requested processes that fit in what is left of the budget, at least 1
+        """
+
+        used = self.rss() or 0
+        per_process = (PROCESS_MB + TAB_MB * max(1, tabs or 1)) * 2 ** 20
+
+        return max(1, min(requested, int((self.budget - used) // per_process)))
+
+
+class LinkSpool(object):
+    """
+    A list of links kept in a file rather than in memory, one per line, so the links of a whole crawl can be collected
+    and read back without holding them. The file is deleted by close.
+
+    >>> with LinkSpool() as links:
+    ...     links.extend(stream_process_links(schedule_links))
+    ...     for link in links:
+    ...         print(link)
+    """
+
+    def __init__(self, folder: str = None):
+        """
+        :param folder: The folder to write the file in, created if it does not exist, the temporary folder if None
+        """
+
+        if folder is not None:
+            os.makedirs(folder, exist_ok=True)
+
+        fd, self.path = tempfile.mkstemp(dir=folder, prefix='links-', suffix='.txt')
+        self._file = os.fdopen(fd, 'w+', encoding='utf-8')
+        self._lock = threading.Lock()
+        self._count = 0
+
+    def append(self, link: str) -> None:
+        with self._lock:
+            self._file.write(f'{link}\n')
+            self._count += 1
+
+    def extend(self, links: Iterable[str]) -> None:
+        for link in links:
+            self.append(link)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            self._file.flush()
+
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                yield line.rstrip('\n')
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.close()
+            os.remove(self.path)
+
+    def __enter__(self) -> 'LinkSpool':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
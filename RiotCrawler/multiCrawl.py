@@ -0,0 +1,180 @@
+import copy
+import os
+from typing import Dict, Iterable, Iterator, List, Union
+
+from RiotCrawler.RiotCrawl import RiotCrawl
+from RiotCrawler.jobLedger import DONE, GAME, MATCH, SCHEDULE
+from RiotCrawler.linkDedup import SeenSet, canonical_links
+from RiotCrawler.makeLinks import create_links, verify_setting
+from RiotCrawler.parseConfig import parse_config
+from RiotCrawler.seasonCalendar import SeasonCalendar, verify_plan
+
+
+class CrawlJob(object):
+    """
+    One config, for one year when a range of years is crawled, and the schedule links it asks for
+    """
+
+    def __init__(self, name: str, config_dict: Dict[str, Dict[str, str]], calendar: SeasonCalendar = None):
+        """
+        :param name: The name the job is reported by
+        :param config_dict: The parsed config of the job, see parseConfig.parse_config
+        :param calendar: The season calendar the links are planned from, see makeLinks.create_links
+        """
+
+        self.name = name
+        self.config_dict = config_dict
+        self.schedule_links = canonical_links(create_links(config_dict, calendar))
+
+    def __repr__(self) -> str:
+        return f'CrawlJob({self.name!r}, {len(self.schedule_links)} schedule links)'
+
+
+def make_jobs(config_file_paths: Iterable[str], years: Iterable[int] = None,
+              calendar: SeasonCalendar = None) -> List[CrawlJob]:
+    """
+    :param config_file_paths: Paths to config.ini files
+    :param years: If provided every config is crawled for each of these years, overriding the year it sets
+    :param calendar: The season calendar the links of every job are planned from
+    :return: A CrawlJob for each config and year
+    """
+
+    jobs = list()
+    for path in config_file_paths:
+        config_dict = parse_config(path)
+        name = os.path.splitext(os.path.basename(path))[0]
+
+        if years is None:
+            jobs.append(CrawlJob(name, config_dict, calendar))
+            continue
+
+        for year in years:
+            year_dict = copy.deepcopy(config_dict)
+            year_dict['extra']['year'] = str(year)
+            jobs.append(CrawlJob(f'{name} {year}', year_dict, calendar))
+
+    return jobs
+
+
+class MultiCrawl(RiotCrawl):
+    """
+    Crawls several configs, or one config over a range of years, as one crawl. The schedule links of every job are
+    merged without duplicates and crawled through one RiotCrawl: one session and rate limiter, one ledger, one output
+    sink and one set of seen links, so overlapping jobs never fetch a page or game twice and never compete for the
+    same servers. Session, link and output settings are read from the first config.
+
+    >>> mc = MultiCrawl(['./lck.ini', './na.ini'], years=range(2015, 2018))
+    >>> mc.run_all(path='path_to_folder')
+    >>> print(format_progress(mc.progress()))
+    """
+
+    def __init__(self, config_file_paths: List[str], years: Iterable[int] = None, ledger: str = None):
+        """
+        :param config_file_paths: Paths to the config.ini files of the jobs
+        :param years: If provided every config is crawled for each of these years
+        :param ledger: Path to a jobLedger.JobLedger file to checkpoint every stage in, needed by progress
+        """
+
+        if not config_file_paths:
+            raise ValueError('At least one config file is needed')
+
+        super().__init__(config_file_paths[0], ledger)
+        self.jobs = make_jobs(config_file_paths, years, self.calendar)
+
+    def make_links(self, inplace: bool = True, verify: bool = None, workers: int = 16) -> Union[None, tuple]:
+        """
+        Merges the schedule links of every job, each link once in the order of the jobs
+
+        :param inplace: Inplace tuple creation and stored in MultiCrawl.schedule_links. Else returns tuple of links.
+        :param verify: If True the links are checked, see RiotCrawl.make_links. If None they are checked unless
+                       verify = false in config.ini
+        :param workers: The number of pages checked at once
+        :return: None or a tuple of links to the schedule page
+        """
+
+        if verify is None:
+            verify = verify_setting(self.config_dict)
+
+        seen = SeenSet()
+        links = tuple(link for job in self.jobs for link in job.schedule_links if seen.add(link))
+
+        if verify:
+            links = verify_plan(links, self.calendar, self.session, workers)
+
+        if self.ledger is not None:
+            self.ledger.add(SCHEDULE, links)
+
+        if inplace:
+            self.schedule_links = links
+            return None
+        else:
+            return links
+
+    def progress(self) -> Dict[str, Dict[str, int]]:
+        """
+        Counts the progress of every job from the ledger. A page or game shared by several jobs counts for each of
+        them, and once in the total.
+
+        :return: {job name: counts, ..., 'total': counts}, the counts being schedule_pages, schedule_done,
+                 games_found and games_done
+        """
+
+        if self.ledger is None:
+            raise ValueError('progress requires a ledger, pass one to MultiCrawl or call use_ledger first')
+
+        schedule_results = self.ledger.results(SCHEDULE)
+        match_results = self.ledger.results(MATCH)
+        games_done = set(self.ledger.keys(GAME, DONE))
+
+        def _counts(pages: List[str]) -> Dict[str, int]:
+            done = [p for p in pages if p in schedule_results]
+            games = {g for p in done for m in schedule_results[p] for g in match_results.get(m, ())}
+            return {'schedule_pages': len(pages), 'schedule_done': len(done), 'games_found': len(games),
+                    'games_done': len(games & games_done)}
+
+        progress = {job.name: _counts(job.schedule_links) for job in self.jobs}
+        progress['total'] = _counts(list(dict.fromkeys(l for job in self.jobs for l in job.schedule_links)))
+
+        return progress
+
+    def run_all(self, path: str, *args, **kwargs) -> None:
+        """
+        Runs RiotCrawl.run_all over the merged links of every job and prints the progress of each
+
+        :param path: A path to a folder for saving the information
+        :return: None
+        """
+
+        super().run_all(path, *args, **kwargs)
+
+        if self.ledger is not None:
+            print(format_progress(self.progress()))
+
+    def stream(self, *args, report_every: int = 0, **kwargs) -> Iterator:
+        """
+        Runs RiotCrawl.stream over the merged links of every job
+
+        :param report_every: If provided the progress of every job is printed after each report_every games
+        :return: The iterator of RiotCrawl.stream
+        """
+
+        stream = super().stream(*args, **kwargs)
+
+        try:
+            for count, item in enumerate(stream, 1):
+                if report_every and self.ledger is not None and count % report_every == 0:
+                    print(format_progress(self.progress()))
+                yield item
+        finally:
+            stream.close()
+
+
+def format_progress(progress: Dict[str, Dict[str, int]]) -> str:
+    """
+    :param progress: The counts returned by MultiCrawl.progress
+    :return: A line for each job and the total
+    """
+
+    width = max(len(name) for name in progress)
+    return '\n'.join(f'{name:<{width}}  schedule {c["schedule_done"]}/{c["schedule_pages"]}  '
+                     f'games {c["games_done"]}/{c["games_found"]}' for name, c in progress.items())
@@ -0,0 +1,158 @@
+import json
+import statistics
+import time
+from collections import namedtuple
+from typing import Dict, List, Union
+
+from requests_html import HTML, HTMLSession
+
+from RiotCrawler.crawlMetrics import METRICS
+from RiotCrawler.responseCache import ResponseCache
+
+RenderTiming = namedtuple('RenderTiming', ['url', 'seconds', 'ready'])
+
+DEFAULT_READY_TIMEOUT = 10.0
+DEFAULT_FALLBACK_SLEEP = 10
+
+# Resolves true as soon as an element matching the selector is in the DOM, or false once the timeout passes. A
+# MutationObserver is used so the check runs when the page changes rather than on a fixed poll. The timeout counts
+# from the start of the navigation (performance.now() is 0 there), so the wait only gets what navigation left of it.
+_READY_SCRIPT = """
+() => new Promise(resolve => {
+    const selector = %s;
+    if (document.querySelector(selector)) {
+        resolve(true);
+        return;
+    }
+    const observer = new MutationObserver(() => {
+        if (document.querySelector(selector)) {
+            observer.disconnect();
+            clearTimeout(timer);
+            resolve(true);
+        }
+    });
+    const timer = setTimeout(() => {
+        observer.disconnect();
+        resolve(false);
+    }, Math.max(0, %d - performance.now()));
+    observer.observe(document.documentElement, {childList: true, subtree: true});
+})
+"""
+
+
+def href_selector(xpath: str) -> str:
+    """
+    Converts the href substring used by the xpath selector of get_match_history_links into a css selector
+
+    :param xpath: The substring the href of the links contain, for example '/matches/'
+    :return: A css selector for anchors whose href contains the substring
+    """
+
+    return f'a[href*={json.dumps(xpath)}]'
+
+
+def ready_script(ready_selector: str, ready_timeout: float = DEFAULT_READY_TIMEOUT) -> str:
+    """
+    Creates the script that waits in the page for ready_selector to appear
+
+    :param ready_selector: A css selector that is present once the page has finished rendering
+    :param ready_timeout: The number of seconds after the start of the navigation to wait for ready_selector
+    :return: JavaScript that resolves true once the selector appears or false after the timeout
+    """
+
+    return _READY_SCRIPT % (json.dumps(ready_selector), int(ready_timeout * 1000))
+
+
+def render_page(session: HTMLSession, url: str, ready_selector: str,
+                ready_timeout: float = DEFAULT_READY_TIMEOUT, fallback_sleep: int = DEFAULT_FALLBACK_SLEEP,
+                timings: list = None) -> HTML:
+    """
+    Fetches and renders a page, returning as soon as an element matching ready_selector appears instead of sleeping
+    for a fixed time. ready_timeout bounds the navigation and the wait for the selector together, the wait only gets
+    the time navigation left. If the selector has not appeared by then the page is rendered again with the old fixed
+    sleep of fallback_sleep seconds, unless fallback_sleep is 0.
+
+    When the session has a response cache, rendered pages that never expire are stored in it and are not rendered
+    again.
+
+    :param session: The session used to fetch and render the page
+    :param url: The url of the page
+    :param ready_selector: A css selector that is present once the page has finished rendering
+    :param ready_timeout: The number of seconds to navigate and wait for ready_selector
+    :param fallback_sleep: Seconds to sleep in the fallback render, 0 disables the fallback
+    :param timings: If provided a RenderTiming for the page is appended to it
+    :return: The rendered HTML
+    """
+
+    cache = getattr(session, 'response_cache', None)
+    html = cached_render(cache, url)
+    if html is not None:
+        return html
+
+    start = time.perf_counter()
+    r = session.get(url)
+    ready = bool(r.html.render(script=ready_script(ready_selector, ready_timeout), timeout=ready_timeout))
+
+    if not ready and fallback_sleep:
+        r.html.render(sleep=fallback_sleep)
+
+    if timings is not None:
+        timings.append(RenderTiming(url, time.perf_counter() - start, ready))
+
+    if ready:
+        store_render(cache, url, r.html.html)
+
+    return r.html
+
+
+def cached_render(cache: Union[None, ResponseCache], url: str) -> Union[None, HTML]:
+    """
+    Looks up a rendered page in the response cache
+
+    :param cache: The response cache, may be None
+    :param url: The url of the page
+    :return: The rendered HTML or None if it is not cached
+    """
+
+    if cache is None:
+        return None
+
+    entry = cache.get(url, 'render')
+    if entry is None or not entry.immutable:
+        return None
+
+    METRICS.count('cache_hits', stage='render')
+    return HTML(url=url, html=entry.body)
+
+
+def store_render(cache: Union[None, ResponseCache], url: str, html: str) -> None:
+    """
+    Stores a rendered page in the response cache if the cache policy says it never expires. Rendered pages can not be
+    revalidated with the server, so nothing else is worth storing.
+
+    :param cache: The response cache, may be None
+    :param url: The url of the page
+    :param html: The rendered HTML source
+    :return: None
+    """
+
+    if cache is not None and cache.policy(url):
+        cache.put(url, 200, {}, html.encode(), 'render')
+
+
+def summarize_timings(timings: List[RenderTiming]) -> Dict[str, Union[int, float]]:
+    """
+    Summarizes a list of render timings
+
+    :param timings: The RenderTimings recorded by render_page
+    :return: A dict of the page count, pages that were ready before the timeout, and mean, p50, p95 and max seconds
+    """
+
+    if not timings:
+        return {'pages': 0, 'ready': 0, 'mean': 0.0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+
+    seconds = sorted(t.seconds for t in timings)
+
+    return {'pages': len(seconds), 'ready': sum(1 for t in timings if t.ready),
+            'mean': statistics.mean(seconds), 'p50': seconds[int(0.50 * (len(seconds) - 1))],
+            'p95': seconds[int(0.95 * (len(seconds) - 1))], 'max': seconds[-1]}
@@ -0,0 +1,148 @@
+import asyncio
+import queue
+import threading
+from typing import Any, Callable, Iterator, List, Union
+
+from RiotCrawler.linkDedup import BloomFilter, SeenSet
+
+_DONE = object()
+
+
+class _Failure(object):
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+class PipelineStopped(Exception):
+    """
+    Raised inside the discovery stage when the consumer of the pipeline stopped early, to end the crawl of pages
+    """
+
+
+def _put(q: queue.Queue, item: Any, stop: threading.Event) -> None:
+    """
+    Puts an item on a bounded queue, giving up once the pipeline is stopped so a full queue can not block forever
+    """
+
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+    raise PipelineStopped()
+
+
+def _drain(q: queue.Queue) -> None:
+    while True:
+        try:
+            q.get_nowait()
+        except queue.Empty:
+            return
+
+
+def stream_pipeline(discover: Callable[[Callable[[List[str]], None]], Any], fetch: Callable[[str], Any],
+                    fetchers: int = 8, queue_size: int = 64,
+                    seen: Union[None, SeenSet, BloomFilter] = None) -> Iterator[Any]:
+    """
+    Runs the discovery of match history links and the fetch of their JSON at the same time. discover runs in its own
+    thread and hands each batch of links it finds to on_found, which puts them on a bounded queue that fetchers threads
+    take them from. The results of fetch are yielded as soon as they are ready, so the first games come out while the
+    schedule pages are still being crawled. Links are only fetched once, however they are written, and a None from
+    fetch is not yielded.
+
+    When the generator is closed early the threads are stopped, and an error in any stage is raised from the generator.
+
+    >>> for game in stream_pipeline(lambda on_found: get_match_history_links(links, xpath, css, on_found=on_found),
+    ...                             partial(fetch_game, session)):
+    ...     print(game['gameId'])
+
+    :param discover: Called with on_found, crawls the pages and calls on_found with the links as they are found
+    :param fetch: Called with a match history link, returns the result to yield or None
+    :param fetchers: The number of threads fetching at once
+    :param queue_size: The number of discovered links that may wait for a fetcher before discovery is paused
+    :param seen: The links already handed to the fetchers, a new linkDedup.SeenSet if None
+    :return: An iterator of the results of fetch in the order they finish
+    """
+
+    if not isinstance(fetchers, int) or fetchers < 1:
+        raise ValueError('fetchers must be an int greater than 0')
+
+    links = queue.Queue(maxsize=queue_size)
+    results = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    if seen is None:
+        seen = SeenSet()
+
+    def _on_found(found: List[str]) -> None:
+        for link in found:
+            if seen.add(link):
+                _put(links, link, stop)
+
+    def _discover() -> None:
+        # Rendering with pyppeteer needs an event loop in the thread it runs in
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            discover(_on_found)
+        except PipelineStopped:
+            pass
+        except Exception as e:
+            stop.set()
+            results.put(_Failure(e))
+        finally:
+            loop.close()
+            for _ in range(fetchers):
+                try:
+                    _put(links, _DONE, stop)
+                except PipelineStopped:
+                    break
+            results.put(_DONE)
+
+    def _fetch() -> None:
+        try:
+            while not stop.is_set():
+                try:
+                    link = links.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+
+                if link is _DONE:
+                    break
+
+                try:
+                    result = fetch(link)
+                except Exception as e:
+                    stop.set()
+                    results.put(_Failure(e))
+                    break
+
+                if result is not None:
+                    _put(results, result, stop)
+        except PipelineStopped:
+            pass
+        finally:
+            results.put(_DONE)
+
+    threads = [threading.Thread(target=_discover, daemon=True)]
+    threads.extend(threading.Thread(target=_fetch, daemon=True) for _ in range(fetchers))
+    for t in threads:
+        t.start()
+
+    try:
+        running = len(threads)
+        while running:
+            item = results.get()
+            if item is _DONE:
+                running -= 1
+            elif isinstance(item, _Failure):
+                raise item.error
+            else:
+                yield item
+    finally:
+        stop.set()
+        for t in threads:
+            while t.is_alive():
+                _drain(results)
+                t.join(0.1)
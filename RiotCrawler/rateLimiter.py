@@ -0,0 +1,222 @@
+import asyncio
+import email.utils
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Union
+from urllib.parse import urlsplit
+
+THROTTLE_STATUSES = (429, 503)
+
+
+def parse_retry_after(value: Union[None, str]) -> Union[None, float]:
+    """
+    Reads a Retry-After header, given either as seconds or as an HTTP date
+
+    :param value: The value of the header, may be None
+    :return: The seconds to wait or None if the header was missing or could not be read
+    """
+
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HostLimiter(object):
+    """
+    The token bucket and concurrency window of a single host. Requests take a token from a bucket refilled at rate
+    tokens a second and a slot in a window of concurrency requests in flight. The window and the rate are adjusted by
+    additive increase, multiplicative decrease: every throttled response halves both, and every window of successful
+    responses without one grows the window by a request and the rate by a tenth of its maximum. A Retry-After pauses the
+    host until it has passed.
+    """
+
+    def __init__(self, rate: float, max_concurrency: int, decrease: float = 0.5):
+        """
+        :param rate: The most requests a second, 0 disables the token bucket
+        :param max_concurrency: The most requests in flight at once, the window starts here
+        :param decrease: The factor the window and rate are multiplied by on a throttled response
+        """
+
+        self.max_rate = rate
+        self.rate = rate
+        self.max_concurrency = max_concurrency
+        self.concurrency = max_concurrency
+        self.decrease = decrease
+        self.in_flight = 0
+        self.throttled = 0
+        self._tokens = max(1.0, rate)
+        self._refilled = time.monotonic()
+        self._paused_until = 0.0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float) -> None:
+        if self.rate:
+            self._tokens = min(max(1.0, self.rate), self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def _wait_time(self, now: float) -> float:
+        """
+        :return: Seconds until a request may be sent, 0 if it may be sent now
+        """
+
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self.in_flight >= self.concurrency:
+            return 1.0
+        if self.rate and self._tokens < 1:
+            return (1 - self._tokens) / self.rate
+
+        return 0.0
+
+    def acquire(self) -> None:
+        """
+        Blocks until a request to the host may be sent and takes a token and a slot for it
+
+        :return: None
+        """
+
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._wait_time(now)
+                if not wait:
+                    break
+                self._cond.wait(wait)
+
+            if self.rate:
+                self._tokens -= 1
+            self.in_flight += 1
+
+    def release(self, status: int = None, retry_after: float = None) -> None:
+        """
+        Frees the slot of a finished request and adjusts the window from its status
+
+        :param status: The status code of the response, None if the request failed without one
+        :param retry_after: The seconds from the Retry-After header of the response
+        :return: None
+        """
+
+        with self._cond:
+            self.in_flight -= 1
+
+            if status in THROTTLE_STATUSES:
+                self.throttled += 1
+                self._successes = 0
+                self.concurrency = max(1, int(self.concurrency * self.decrease))
+                if self.max_rate:
+                    self.rate = max(self.max_rate / 100, self.rate * self.decrease)
+                    self._tokens = min(self._tokens, 0.0)
+                if retry_after:
+                    self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            elif status is not None and status < 400:
+                self._successes += 1
+                if self._successes >= self.concurrency:
+                    self._successes = 0
+                    self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+                    if self.max_rate:
+                        self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+            self._cond.notify_all()
+
+
+class RateLimiter(object):
+    """
+    Keeps a HostLimiter for every host requested so one slow or throttling host does not hold up the others. A single
+    limiter is shared by every session of a crawl through crawlSession.create_session, so the JSON downloads, the
+    direct link requests and the rendered pages all draw on the same budget for each host.
+
+    >>> limiter = RateLimiter(rate=10, max_concurrency=8)
+    >>> with limiter.request(url) as host:
+    ...     r = requests.get(url)
+    ...     host.status = r.status_code
+    """
+
+    def __init__(self, rate: float = 0.0, max_concurrency: int = 16, decrease: float = 0.5):
+        """
+        :param rate: The most requests a second to each host, 0 only limits the requests in flight
+        :param max_concurrency: The most requests in flight to each host
+        :param decrease: The factor the window and rate of a host are multiplied by when it throttles
+        """
+
+        if rate < 0:
+            raise ValueError('rate must not be negative')
+
+        if not isinstance(max_concurrency, int) or max_concurrency < 1:
+            raise ValueError('max_concurrency must be an int greater than 0')
+
+        self.rate = rate
+        self.max_concurrency = max_concurrency
+        self.decrease = decrease
+        self._hosts = dict()
+        self._lock = threading.Lock()
+
+    def host(self, url: str) -> HostLimiter:
+        """
+        :param url: Any url on the host
+        :return: The HostLimiter of the host of the url, created on first use
+        """
+
+        netloc = urlsplit(url).netloc
+        with self._lock:
+            if netloc not in self._hosts:
+                self._hosts[netloc] = HostLimiter(self.rate, self.max_concurrency, self.decrease)
+            return self._hosts[netloc]
+
+    @contextmanager
+    def request(self, url: str) -> Iterator['_Outcome']:
+        """
+        Waits for a token and a slot of the host of url, freeing the slot when the block exits. Set the status and
+        retry_after of the yielded object to the response received so the host can adapt.
+
+        :param url: The url being requested
+        :return: A context manager yielding the outcome to fill in
+        """
+
+        limiter = self.host(url)
+        outcome = _Outcome()
+        limiter.acquire()
+        try:
+            yield outcome
+        finally:
+            limiter.release(outcome.status, outcome.retry_after)
+
+    async def request_async(self, url: str) -> HostLimiter:
+        """
+        The same wait as request for use on an event loop, the caller must call release on the returned HostLimiter
+
+        :param url: The url being requested
+        :return: The HostLimiter of the host, a slot of which is held
+        """
+
+        limiter = self.host(url)
+        await asyncio.get_running_loop().run_in_executor(None, limiter.acquire)
+        return limiter
+
+    def summary(self) -> Dict[str, Dict[str, Union[int, float]]]:
+        """
+        :return: The current rate, window and number of throttled responses of every host
+        """
+
+        with self._lock:
+            hosts = dict(self._hosts)
+
+        return {netloc: {'rate': h.rate, 'concurrency': h.concurrency, 'throttled': h.throttled}
+                for netloc, h in hosts.items()}
+
+
+class _Outcome(object):
+    def __init__(self):
+        self.status = None
+        self.retry_after = None
@@ -0,0 +1,187 @@
+import datetime
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from typing import Callable, Dict, Union
+
+CachedResponse = namedtuple('CachedResponse', ['url', 'status', 'headers', 'body', 'etag', 'last_modified',
+                                               'immutable'])
+
+_STATS_GAME = re.compile(r'/v1/stats/game/[^/]+/\d+(/timeline)?\?gameHash=')
+_SCHEDULE_YEAR = re.compile(r'_(\d{4})_(spring|summer)/')
+
+DEFAULT_IMMUTABLE_TTL = 30 * 24 * 3600
+# Other processes may write to the same file, so the running total of the stored bodies is recounted every so often
+_RECOUNT_PUTS = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    immutable INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    stored REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+"""
+
+
+def finished_matches_policy(url: str) -> bool:
+    """
+    The default cache policy. The ACS game and timeline JSON of a game never change once the game has a hash, and the
+    schedule and match pages of a season from an earlier year are finished, so all of them never expire. Anything else
+    is revalidated with the server before it is used.
+
+    :param url: The url of the response
+    :return: True if the response never expires
+    """
+
+    if _STATS_GAME.search(url):
+        return True
+
+    year = _SCHEDULE_YEAR.search(url)
+    return year is not None and int(year.group(1)) < datetime.date.today().year
+
+
+class ResponseCache(object):
+    """
+    An on disk cache of HTTP responses and rendered pages kept in one SQLite file. Entries are keyed by a SHA-256 of
+    their kind and url, and the least recently used entries are evicted once the stored bodies pass max_bytes.
+
+    Responses the policy marks as never expiring are served from disk without a request for immutable_ttl seconds after
+    they were stored, so a bad body is not kept forever. Every other response, and an immutable one past its ttl, is
+    revalidated with If-None-Match and If-Modified-Since using the ETag and Last-Modified the server sent, so an
+    unchanged page costs a 304 rather than a full download.
+
+    The cache is safe to share between threads, and separate processes may open the same file.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 1024 ** 3, policy: Callable[[str], bool] = finished_matches_policy,
+                 immutable_ttl: float = DEFAULT_IMMUTABLE_TTL):
+        """
+        :param path: Path of the SQLite file, created along with its folder if it does not exist
+        :param max_bytes: The size of the stored bodies after which the least recently used entries are evicted
+        :param policy: Called with a url, returns True if the response for it never expires
+        :param immutable_ttl: Seconds an entry the policy marks as never expiring is used without revalidation
+        """
+
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.immutable_ttl = immutable_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(_SCHEMA)
+        self._total = self._stored_bytes()
+        self._puts = 0
+
+    @staticmethod
+    def _key(url: str, kind: str) -> str:
+        return hashlib.sha256(f'{kind}:{url}'.encode()).hexdigest()
+
+    def get(self, url: str, kind: str = 'http') -> Union[None, CachedResponse]:
+        """
+        Looks up the cached entry for a url
+
+        :param url: The url of the response
+        :param kind: 'http' for HTTP responses, 'render' for pages rendered in a browser
+        :return: The CachedResponse or None
+        """
+
+        key = self._key(url, kind)
+
+        with self._lock:
+            row = self._conn.execute('SELECT url, status, headers, body, etag, last_modified, immutable, stored '
+                                     'FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._conn.execute('UPDATE responses SET accessed = ? WHERE key = ?', (time.time(), key))
+            self._conn.commit()
+
+        immutable = bool(row[6]) and time.time() - row[7] < self.immutable_ttl
+        return CachedResponse(row[0], row[1], json.loads(row[2]), row[3], row[4], row[5], immutable)
+
+    def put(self, url: str, status: int, headers: Dict[str, str], body: bytes, kind: str = 'http') -> None:
+        """
+        Stores a response, replacing any previous entry for the url, and evicts entries if the cache is too large
+
+        :param url: The url of the response
+        :param status: The HTTP status code
+        :param headers: The response headers
+        :param body: The decoded response body
+        :param kind: 'http' for HTTP responses, 'render' for pages rendered in a browser
+        :return: None
+        """
+
+        headers = {k: v for k, v in headers.items() if k.lower() not in ('content-encoding', 'content-length',
+                                                                           'transfer-encoding')}
+        lower = {k.lower(): v for k, v in headers.items()}
+        now = time.time()
+
+        key = self._key(url, kind)
+
+        with self._lock:
+            old = self._conn.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+            self._conn.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                               (key, url, status, json.dumps(headers), body, lower.get('etag'),
+                                lower.get('last-modified'), int(self.policy(url)), len(body), now, now))
+            self._total += len(body) - (old[0] if old is not None else 0)
+            self._puts += 1
+            if self._puts % _RECOUNT_PUTS == 0:
+                self._total = self._stored_bytes()
+            self._evict()
+            self._conn.commit()
+
+    def _stored_bytes(self) -> int:
+        return self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    def _evict(self) -> None:
+        if self._total <= self.max_bytes:
+            return
+
+        total = self._stored_bytes()
+
+        rows = self._conn.execute('SELECT key, size FROM responses ORDER BY accessed').fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+            total -= size
+
+        self._total = total
+
+    def size(self) -> int:
+        """
+        :return: The total bytes of the stored bodies
+        """
+
+        with self._lock:
+            return self._stored_bytes()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
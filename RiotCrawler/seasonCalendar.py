@@ -0,0 +1,290 @@
+import datetime
+import json
+import os
+import re
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Tuple, Union
+from urllib.parse import quote, unquote
+
+from requests_html import HTMLSession
+
+from RiotCrawler.crawlSession import create_session
+
+CALENDAR_FILE = 'season_calendar.json'
+
+# In the order makeLinks has always put them in
+PLAYOFF_ROUNDS = ('Wild%20Card', 'Round%201', 'Round%202', 'Round%203', 'Finals', 'Quarterfinals', 'Semifinals')
+
+# The leagues makeLinks creates links for: the first and last year lolesports has schedule pages for them under that
+# name, None if it still does, the weeks of a regular season and the playoff rounds. Seasons checked with
+# verify_plan are stored in a SeasonCalendar and take the place of these.
+LEAGUES = {
+    'na-lcs': {'years': (2013, 2018), 'weeks': 9, 'playoffs': ('Finals', 'Quarterfinals', 'Semifinals')},
+    'eu-lcs': {'years': (2013, 2018), 'weeks': 9, 'playoffs': ('Finals', 'Quarterfinals', 'Semifinals')},
+    'na-academy': {'years': (2018, 2018), 'weeks': 9, 'playoffs': ('Finals', 'Quarterfinals', 'Semifinals')},
+    'lck': {'years': (2015, None), 'weeks': 10, 'playoffs': PLAYOFF_ROUNDS},
+    'lms': {'years': (2015, 2019), 'weeks': 10, 'playoffs': PLAYOFF_ROUNDS},
+}
+
+Season = namedtuple('Season', ['weeks', 'playoffs'])
+
+_SCHEDULE_LINK = re.compile(r'/(?P<league>[a-z-]+)/[a-z_]+?_(?P<year>\d{4})_(?P<split>spring|summer)/schedule/'
+                            r'(?:(?P<stage>regular_season|playoffs)/(?P<page>[^/?#]+))?$')
+_MISSING = (404, 410)
+
+
+def parse_schedule_link(link: str) -> Union[None, Tuple[str, int, str, str, str]]:
+    """
+    :param link: A schedule link made by makeLinks, with or without its week
+    :return: The league, year, split, stage and week or round of the link, stage and page are None without a week.
+             None if the link is not a schedule link
+    """
+
+    match = _SCHEDULE_LINK.search(link)
+    if match is None:
+        return None
+
+    return match['league'], int(match['year']), match['split'], match['stage'], match['page']
+
+
+def _round_order(playoff_round: str) -> Tuple[int, str]:
+    return (PLAYOFF_ROUNDS.index(playoff_round) if playoff_round in PLAYOFF_ROUNDS else len(PLAYOFF_ROUNDS)), \
+        playoff_round
+
+
+def round_name(name: str) -> str:
+    """
+    :param name: A playoff round as written in config.ini, as Round 1, round%201 or Wild%20Card
+    :return: The round as written in the links, as PLAYOFF_ROUNDS, or the name quoted if it is not one of them
+    """
+
+    quoted = quote(unquote(name))
+    for playoff_round in PLAYOFF_ROUNDS:
+        if playoff_round.lower() == quoted.lower():
+            return playoff_round
+
+    return quoted
+
+
+class SeasonCalendar(object):
+    """
+    The weeks and playoff rounds of every season, so only pages that exist are crawled. Seasons not checked yet come
+    from LEAGUES. Checking the planned pages with verify_plan stores the pages that exist and the ones that do not, and
+    with a path the table is kept in a JSON file so the next run knows them without checking again.
+
+    >>> calendar = SeasonCalendar('./season_calendar.json')
+    >>> calendar.season('lck', 2017, 'spring').weeks
+    (1, 2, 3, 4, 5, 6, 7, 8, 9, 10)
+    """
+
+    def __init__(self, path: str = None):
+        """
+        :param path: Path to the JSON file of the calendar, read if it exists and written by SeasonCalendar.save
+        """
+
+        self.path = path
+        self._seasons = dict()
+
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                self._seasons = json.load(f)
+
+    @staticmethod
+    def _key(league: str, year: int, split: str) -> str:
+        return f'{league}/{year}/{split}'
+
+    def _entry(self, league: str, year: int, split: str) -> dict:
+        key = self._key(league, year, split)
+        if key not in self._seasons:
+            default = self.default(league, year)
+            self._seasons[key] = {'weeks': list(default.weeks), 'playoffs': list(default.playoffs), 'checked': []}
+
+        return self._seasons[key]
+
+    @staticmethod
+    def default(league: str, year: int) -> Season:
+        """
+        :param league: The league as it is written in the links, as na-lcs or lck
+        :param year: The year of the season
+        :return: The season as LEAGUES has it, empty if lolesports had no such league that year
+        """
+
+        if league not in LEAGUES:
+            return Season((), ())
+
+        first, last = LEAGUES[league]['years']
+        if year < first or (last is not None and year > last):
+            return Season((), ())
+
+        return Season(tuple(range(1, LEAGUES[league]['weeks'] + 1)), LEAGUES[league]['playoffs'])
+
+    def season(self, league: str, year: int, split: str) -> Season:
+        """
+        :param league: The league as it is written in the links, as na-lcs or lck
+        :param year: The year of the season
+        :param split: spring or summer
+        :return: The weeks and playoff rounds of the season
+        """
+
+        key = self._key(league, year, split)
+        if key not in self._seasons:
+            return self.default(league, year)
+
+        entry = self._seasons[key]
+        return Season(tuple(entry['weeks']), tuple(sorted(entry['playoffs'], key=_round_order)))
+
+    def is_checked(self, link: str) -> bool:
+        parts = parse_schedule_link(link)
+        if parts is None or parts[3] is None:
+            return False
+
+        league, year, split, stage, page = parts
+        return f'{stage}/{page}' in self._seasons.get(self._key(league, year, split), {}).get('checked', ())
+
+    def record(self, link: str, exists: bool) -> None:
+        """
+        Records whether a schedule page exists. A page of a season that is not over yet is only recorded if it exists,
+        as a week that is missing now may still be added.
+
+        :param link: A schedule link made by makeLinks
+        :param exists: Whether the page exists
+        :return: None
+        """
+
+        parts = parse_schedule_link(link)
+        if parts is None or parts[3] is None:
+            return
+
+        league, year, split, stage, page = parts
+        if stage == 'regular_season' and not page.isdigit():
+            return
+        if not exists and year >= datetime.datetime.now().year:
+            return
+
+        entry = self._entry(league, year, split)
+        if stage == 'regular_season':
+            pages, page, key = entry['weeks'], int(page), None
+        else:
+            pages, key = entry['playoffs'], _round_order
+
+        if exists and page not in pages:
+            pages.append(page)
+            pages.sort(key=key)
+        elif not exists and page in pages:
+            pages.remove(page)
+
+        if f'{stage}/{page}' not in entry['checked']:
+            entry['checked'].append(f'{stage}/{page}')
+
+    def save(self) -> None:
+        """
+        Writes the calendar to its path, if it has one
+
+        :return: None
+        """
+
+        if self.path is None:
+            return
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self._seasons, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def _head(session: HTMLSession, link: str) -> Union[None, bool]:
+    try:
+        r = session.head(link, allow_redirects=True)
+    except Exception:
+        return None
+
+    r.close()
+    if r.status_code in _MISSING:
+        return False
+
+    return True if r.ok else None
+
+
+def verify_links(links: Iterable[str], session: HTMLSession = None, workers: int = 16) -> Dict[str, Union[None, bool]]:
+    """
+    Checks that pages exist with HEAD requests, workers of them at once
+
+    :param links: The links to check
+    :param session: The session to make the requests with, see crawlSession.create_session
+    :param workers: The number of requests made at once
+    :return: {link: True if the page exists, False if the server answered 404 or 410, None if it could not be told}
+    """
+
+    links = list(dict.fromkeys(links))
+    if not links:
+        return dict()
+
+    owned = session is None
+    if owned:
+        session = create_session()
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(links)))) as executor:
+            return dict(zip(links, executor.map(lambda link: _head(session, link), links)))
+    finally:
+        if owned:
+            session.close()
+
+
+def verify_plan(links: Tuple[str], calendar: SeasonCalendar, session: HTMLSession = None,
+                workers: int = 16) -> Tuple[str]:
+    """
+    Checks the planned schedule pages the calendar has not checked before, records what was found in it and saves it
+
+    :param links: Schedule links made by makeLinks
+    :param calendar: The calendar the links were planned from
+    :param session: The session to make the requests with
+    :param workers: The number of requests made at once
+    :return: The links without the pages that do not exist, pages that could not be checked are kept
+    """
+
+    found = verify_links([link for link in links if not calendar.is_checked(link)], session, workers)
+
+    for link, exists in found.items():
+        if exists is not None:
+            calendar.record(link, exists)
+    calendar.save()
+
+    return tuple(link for link in links if found.get(link) is not False)
+
+
+def plan_weeks(links: List[str], week: Union[int, range, str], calendar: SeasonCalendar) -> List[str]:
+    """
+    Adds the weeks or playoff rounds of each season to its schedule links, only those the calendar has
+
+    :param links: Links made by makeLinks._create_schedule_ext, ending in /schedule/
+    :param week: A week, a range of weeks, 'all', 'playoffs' or the name of a playoff round. A round that is not one
+                 of PLAYOFF_ROUNDS is planned for every season with playoffs, to be checked by verify_plan
+    :param calendar: The calendar of the seasons
+    :return: The links to the schedule pages, by week and then in the order of links
+    """
+
+    seasons = list()
+    for link in links:
+        parts = parse_schedule_link(link)
+        seasons.append((link, calendar.season(*parts[:3]) if parts is not None else Season((), ())))
+
+    weeks = sorted({w for _, season in seasons for w in season.weeks})
+    rounds = list(PLAYOFF_ROUNDS)
+
+    if isinstance(week, int):
+        weeks, rounds = [week], []
+    elif isinstance(week, range):
+        weeks, rounds = list(week), []
+    elif week.lower() == 'playoffs':
+        weeks = []
+    elif week.lower() != 'all':
+        weeks, rounds = [], [round_name(week)]
+
+    planned = [f'{link}regular_season/{w}' for w in weeks for link, season in seasons if w in season.weeks]
+    planned.extend(f'{link}playoffs/{r}' for r in rounds for link, season in seasons
+                   if r in season.playoffs or (r not in PLAYOFF_ROUNDS and season.playoffs))
+
+    return planned
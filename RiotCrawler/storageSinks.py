@@ -0,0 +1,352 @@
+import gzip
+import json
+import os
+import pathlib
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, IO, List, Tuple, Union
+
+from RiotCrawler import jsonCodec
+from RiotCrawler.gameRecord import GameRecord
+
+FORMATS = ('json', 'jsonl', 'jsonl.gz', 'jsonl.zst', 'parquet')
+TABLES = ('games', 'teams', 'participants', 'frames', 'events')
+
+
+def _atomic_write(path: str, write: Callable[[IO], None], mode: str = 'w') -> None:
+    """
+    Writes a file through a temporary file in the same folder that is renamed over path once complete, so a reader or
+    a crash never sees half a file
+
+    :param path: The path of the file
+    :param write: Called with the open temporary file to write its contents
+    :param mode: The mode the temporary file is opened in, 'w' or 'wb'
+    :return: None
+    """
+
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix='.', suffix='.tmp')
+
+    try:
+        with os.fdopen(fd, mode) as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class StorageSink(ABC):
+    """
+    Where the crawled games are written. A sink is given the gameRecord.GameRecord of each game and is closed once the
+    crawl is done. Sinks are safe to write to from several threads.
+
+    >>> with open_sink('./Json Downloads', 'jsonl.gz') as sink:
+    ...     crawl_json(links, sink)
+    """
+
+    @abstractmethod
+    def write(self, record: GameRecord) -> None:
+        """
+        :param record: The game and timeline JSON of the game
+        :return: None
+        """
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> 'StorageSink':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class JsonSink(StorageSink):
+    """
+    Writes every game to its own game_<key>.json file in a folder as {"game": ..., "timeline": ...}. Writing the same
+    game again replaces its file.
+    """
+
+    def __init__(self, folder: str, indent: int = None):
+        """
+        :param folder: The folder to write to, created if it does not exist
+        :param indent: Indent of the written JSON, None writes the response bytes without decoding them
+        """
+
+        pathlib.Path(folder).mkdir(parents=True, exist_ok=True)
+        self.folder = folder
+        self.indent = indent
+
+    def write(self, record: GameRecord) -> None:
+        data = record.to_json() if self.indent is None else json.dumps(record.to_dict(), indent=self.indent).encode()
+        _atomic_write(os.path.join(self.folder, f'game_{record.key}.json'), lambda f: f.write(data), 'wb')
+
+
+class JsonLinesSink(StorageSink):
+    """
+    Writes the games as JSON Lines, one {"game": ..., "timeline": ...} record per line, optionally gzip or zstd
+    compressed. Each file holds up to games_per_file games and only appears under its final name once it is complete.
+    """
+
+    def __init__(self, folder: str, compression: str = None, games_per_file: int = 1000):
+        """
+        :param folder: The folder to write to, created if it does not exist
+        :param compression: None, 'gzip' or 'zstd', zstd needs the zstandard package
+        :param games_per_file: The number of games after which a new file is started
+        """
+
+        if compression not in (None, 'gzip', 'zstd'):
+            raise ValueError('compression must be one of None, gzip or zstd')
+
+        if compression == 'zstd':
+            try:
+                import zstandard
+            except ImportError:
+                raise ImportError('zstd compression requires the zstandard package, pip install zstandard')
+            self._zstd = zstandard.ZstdCompressor()
+
+        pathlib.Path(folder).mkdir(parents=True, exist_ok=True)
+        self.folder = folder
+        self.compression = compression
+        self.games_per_file = games_per_file
+        self.files = list()
+        self._prefix = f'games-{time.strftime("%Y%m%dT%H%M%S")}-{os.getpid()}'
+        self._suffix = {None: '.jsonl', 'gzip': '.jsonl.gz', 'zstd': '.jsonl.zst'}[compression]
+        self._lock = threading.Lock()
+        self._raw = None
+        self._file = None
+        self._tmp_path = None
+        self._count = 0
+
+    def _open(self) -> None:
+        fd, self._tmp_path = tempfile.mkstemp(dir=self.folder, prefix='.', suffix='.tmp')
+        self._raw = os.fdopen(fd, 'wb')
+
+        if self.compression == 'gzip':
+            self._file = gzip.GzipFile(fileobj=self._raw, mode='wb')
+        elif self.compression == 'zstd':
+            self._file = self._zstd.stream_writer(self._raw, closefd=False)
+        else:
+            self._file = self._raw
+
+    def _finish(self) -> None:
+        if self._file is not self._raw:
+            self._file.close()
+        self._raw.close()
+
+        path = os.path.join(self.folder, f'{self._prefix}-{len(self.files):05d}{self._suffix}')
+        os.replace(self._tmp_path, path)
+        self.files.append(path)
+        self._raw = self._file = self._tmp_path = None
+        self._count = 0
+
+    def write(self, record: GameRecord) -> None:
+        line = record.to_json()
+        if b'\n' in line:
+            line = jsonCodec.dumps(record.to_dict())
+        line += b'\n'
+
+        with self._lock:
+            if self._file is None:
+                self._open()
+
+            self._file.write(line)
+            self._count += 1
+
+            if self._count >= self.games_per_file:
+                self._finish()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._finish()
+
+
+def _scalars(data: dict, prefix: str = '') -> Dict[str, Union[None, bool, int, float, str]]:
+    """
+    Flattens the nested dicts of a JSON object into one level, joining the keys with '_'. Lists are stored as JSON
+    strings so every value is a scalar a column can hold.
+
+    :param data: The JSON object
+    :param prefix: Prepended to every key
+    :return: A flat dict
+    """
+
+    row = dict()
+    for key, value in data.items():
+        if isinstance(value, dict):
+            row.update(_scalars(value, f'{prefix}{key}_'))
+        elif isinstance(value, list):
+            row[f'{prefix}{key}'] = jsonCodec.dumps(value).decode()
+        else:
+            row[f'{prefix}{key}'] = value
+
+    return row
+
+
+def flatten_game(record: GameRecord) -> Dict[str, List[dict]]:
+    """
+    Splits a game into rows of the tables games, teams, participants, frames and events. Every row carries the gameId
+    and platformId of its game so the tables can be joined.
+
+    :param record: The game and timeline JSON of a game
+    :return: A dict of table name to its rows
+    """
+
+    game = record.game
+    ids = {'gameId': game.get('gameId'), 'platformId': game.get('platformId')}
+    nested = ('teams', 'participants', 'participantIdentities')
+    tables = {name: list() for name in TABLES}
+
+    tables['games'].append(_scalars({k: v for k, v in game.items() if k not in nested}))
+
+    for team in game.get('teams', ()):
+        tables['teams'].append(dict(ids, **_scalars(team)))
+
+    players = {i.get('participantId'): i.get('player', {}) for i in game.get('participantIdentities', ())}
+    for participant in game.get('participants', ()):
+        row = dict(ids, **_scalars(participant))
+        row.update(_scalars(players.get(participant.get('participantId'), {}), 'player_'))
+        tables['participants'].append(row)
+
+    for frame in record.frames:
+        timestamp = frame.get('timestamp')
+        for participant_frame in frame.get('participantFrames', {}).values():
+            tables['frames'].append(dict(ids, frameTimestamp=timestamp, **_scalars(participant_frame)))
+        for event in frame.get('events', ()):
+            tables['events'].append(dict(ids, frameTimestamp=timestamp, **_scalars(event)))
+
+    return tables
+
+
+class ParquetSink(StorageSink):
+    """
+    Writes the games as Parquet tables, see flatten_game, in a folder for each table. The rows of games_per_file games
+    are buffered and written together as one file of each table. Needs the pyarrow package.
+    """
+
+    def __init__(self, folder: str, games_per_file: int = 500, compression: str = 'zstd'):
+        """
+        :param folder: The folder to write the table folders to, created if it does not exist
+        :param games_per_file: The number of games buffered before their rows are written
+        :param compression: The Parquet compression codec
+        """
+
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError('The parquet format requires the pyarrow package, pip install pyarrow')
+
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+
+        for name in TABLES:
+            pathlib.Path(folder, name).mkdir(parents=True, exist_ok=True)
+
+        self.folder = folder
+        self.games_per_file = games_per_file
+        self.compression = compression
+        self.files = list()
+        self._prefix = f'games-{time.strftime("%Y%m%dT%H%M%S")}-{os.getpid()}'
+        self._lock = threading.Lock()
+        self._rows = {name: list() for name in TABLES}
+        self._schemas = {name: self._pa.schema([]) for name in TABLES}
+        self._games = 0
+        self._parts = 0
+
+    def _schema(self, name: str, rows: List[dict]):
+        """
+        The schema of a table grown by the columns of rows. Rows of a table do not all have the same keys, as the
+        events of each type do not, so the columns are the union of the keys of every row rather than those of the
+        first. Columns are only ever added, so every file of a table has the columns of the files before it.
+
+        :param name: The name of the table
+        :param rows: The rows about to be written
+        :return: A pyarrow.Schema
+        """
+
+        schema = self._schemas[name]
+        columns = dict()
+        for row in rows:
+            for key, value in row.items():
+                if value is not None:
+                    columns.setdefault(key, list()).append(value)
+                else:
+                    columns.setdefault(key, list())
+
+        for key, values in columns.items():
+            index = schema.get_field_index(key)
+            if index >= 0 and not self._pa.types.is_null(schema.field(index).type):
+                continue
+
+            field = self._pa.field(key, self._pa.array(values).type if values else self._pa.null())
+            schema = schema.set(index, field) if index >= 0 else schema.append(field)
+
+        self._schemas[name] = schema
+        return schema
+
+    def _flush(self) -> None:
+        for name, rows in self._rows.items():
+            if not rows:
+                continue
+
+            table = self._pa.Table.from_pylist(rows, schema=self._schema(name, rows))
+            path = os.path.join(self.folder, name, f'{self._prefix}-{self._parts:05d}.parquet')
+            _atomic_write(path, lambda f: self._pq.write_table(table, f, compression=self.compression), 'wb')
+            self.files.append(path)
+
+        self._rows = {name: list() for name in TABLES}
+        self._games = 0
+        self._parts += 1
+
+    def write(self, record: GameRecord) -> None:
+        tables = flatten_game(record)
+
+        with self._lock:
+            for name, rows in tables.items():
+                self._rows[name].extend(rows)
+            self._games += 1
+
+            if self._games >= self.games_per_file:
+                self._flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._games:
+                self._flush()
+
+
+def open_sink(folder: str, fmt: str = 'json') -> StorageSink:
+    """
+    Creates the sink for an output format
+
+    :param folder: The folder to write to
+    :param fmt: One of json, jsonl, jsonl.gz, jsonl.zst or parquet
+    :return: A StorageSink
+    """
+
+    if fmt not in FORMATS:
+        raise ValueError(f'format must be one of {", ".join(FORMATS)}')
+
+    if fmt == 'json':
+        return JsonSink(folder)
+    if fmt == 'parquet':
+        return ParquetSink(folder)
+
+    return JsonLinesSink(folder, {'jsonl': None, 'jsonl.gz': 'gzip', 'jsonl.zst': 'zstd'}[fmt])
+
+
+def as_sink(path: Union[str, StorageSink]) -> Tuple[StorageSink, bool]:
+    """
+    :param path: A folder to write JSON files to or a StorageSink
+    :return: The sink and True if it was created here and must be closed by the caller
+    """
+
+    if isinstance(path, StorageSink):
+        return path, False
+
+    return JsonSink(path), True
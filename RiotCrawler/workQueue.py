@@ -0,0 +1,366 @@
+"""
+Crawls one config across several hosts through a work queue kept in a SQLite file they all share.
+
+    python -m RiotCrawler.workQueue coordinate config.ini /shared/queue.sqlite
+    python -m RiotCrawler.workQueue work config.ini /shared/queue.sqlite "/shared/Json Downloads" --backend direct
+    python -m RiotCrawler.workQueue status /shared/queue.sqlite
+"""
+import argparse
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Tuple, Union
+
+from RiotCrawler.jobLedger import DONE, FAILED, GAME, MATCH, PENDING, SCHEDULE, _timed
+
+QUEUE_FILE = 'work_queue.sqlite'
+
+LEASED = 'leased'
+
+# The stage the links found by a task of each stage are put on the queue as
+NEXT_STAGE = {SCHEDULE: MATCH, MATCH: GAME, GAME: None}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    stage TEXT NOT NULL,
+    key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated REAL NOT NULL,
+    PRIMARY KEY (stage, key)
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, stage);
+"""
+
+# Games are handed out before match pages and match pages before schedule pages, so the queue is drained downstream
+# first and results start landing in the sink as soon as the first schedule page is crawled
+_STAGE_ORDER = f"CASE stage WHEN '{GAME}' THEN 0 WHEN '{MATCH}' THEN 1 ELSE 2 END"
+
+
+def worker_name() -> str:
+    """
+    :return: A name for a worker that is unique across hosts, the host name and process id
+    """
+
+    return f'{socket.gethostname()}-{os.getpid()}'
+
+
+class WorkQueue(object):
+    """
+    A work queue of the schedule pages, match pages and games of a crawl kept in one SQLite file, so workers on every
+    host that can reach the file share it. A worker leases tasks for a number of seconds and reports each back as
+    complete, with the links it found, which are queued as tasks of the next stage, or as failed. A failed task, or
+    one whose lease ran out because its worker died, is handed out again until it has been tried max_attempts times.
+
+    The file has to be on a filesystem whose locks work from every host, the lease of a task is taken in one
+    transaction so no two workers get the same task.
+
+    >>> queue = WorkQueue('/shared/work_queue.sqlite')
+    >>> queue.put(SCHEDULE, schedule_links)
+    >>> for stage, key in queue.lease('worker-1', limit=4):
+    ...     queue.complete('worker-1', stage, key, find(stage, key))
+    """
+
+    def __init__(self, path: str, max_attempts: int = 3):
+        """
+        :param path: Path of the SQLite file, created along with its folder if it does not exist
+        :param max_attempts: The number of times a task is leased before it is left as failed
+        """
+
+        if not isinstance(max_attempts, int) or max_attempts < 1:
+            raise ValueError('max_attempts must be an int greater than 0')
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(_SCHEMA)
+
+    def put(self, stage: str, keys: Iterable[str]) -> int:
+        """
+        Queues tasks as pending, tasks already on the queue keep their status
+
+        :param stage: One of SCHEDULE, MATCH or GAME
+        :param keys: The links of the tasks
+        :return: The number of tasks added
+        """
+
+        now = time.time()
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany('INSERT OR IGNORE INTO tasks (stage, key, status, updated) VALUES (?, ?, ?, ?)',
+                                   [(stage, k, PENDING, now) for k in keys])
+            return self._conn.total_changes - before
+
+    def lease(self, worker: str, limit: int = 1, lease: float = 300.0,
+              stages: Iterable[str] = (SCHEDULE, MATCH, GAME)) -> List[Tuple[str, str]]:
+        """
+        Leases pending tasks, and tasks whose lease ran out, to a worker. Tasks whose lease ran out after their last
+        attempt are marked failed instead.
+
+        :param worker: The name of the worker, see worker_name
+        :param limit: The most tasks leased at once
+        :param lease: Seconds the worker has to report the tasks before they are handed to another worker
+        :param stages: The stages the worker takes tasks of
+        :return: A list of (stage, key) of the tasks leased, empty if none are waiting
+        """
+
+        stages = tuple(stages)
+        now = time.time()
+        marks = ', '.join('?' * len(stages))
+
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.execute('UPDATE tasks SET status = ?, error = ?, updated = ? WHERE status = ? AND '
+                                   'lease_until < ? AND attempts >= ?',
+                                   (FAILED, 'lease expired', now, LEASED, now, self.max_attempts))
+                rows = self._conn.execute(f'SELECT stage, key FROM tasks WHERE stage IN ({marks}) AND '
+                                          f'(status = ? OR (status = ? AND lease_until < ?)) '
+                                          f'ORDER BY {_STAGE_ORDER}, rowid LIMIT ?',
+                                          (*stages, PENDING, LEASED, now, limit)).fetchall()
+                self._conn.executemany('UPDATE tasks SET status = ?, worker = ?, lease_until = ?, '
+                                       'attempts = attempts + 1, updated = ? WHERE stage = ? AND key = ?',
+                                       [(LEASED, worker, now + lease, now, stage, key) for stage, key in rows])
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+        return [tuple(r) for r in rows]
+
+    def renew(self, worker: str, stage: str, key: str, lease: float = 300.0) -> bool:
+        """
+        Extends the lease of a task that is taking long
+
+        :return: False if the worker no longer holds the lease
+        """
+
+        with self._lock:
+            cursor = self._conn.execute('UPDATE tasks SET lease_until = ? WHERE stage = ? AND key = ? AND status = ? '
+                                        'AND worker = ?', (time.time() + lease, stage, key, LEASED, worker))
+
+        return cursor.rowcount > 0
+
+    def complete(self, worker: str, stage: str, key: str, found: List[str] = None) -> bool:
+        """
+        Marks a leased task as done and queues the links found by it as tasks of the next stage
+
+        :param worker: The name of the worker that leased the task
+        :param stage: One of SCHEDULE, MATCH or GAME
+        :param key: The link of the task
+        :param found: The links found on the page
+        :return: False if the worker no longer held the lease, in which case nothing is recorded
+        """
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                cursor = self._conn.execute('UPDATE tasks SET status = ?, error = NULL, updated = ? WHERE stage = ? '
+                                            'AND key = ? AND status = ? AND worker = ?',
+                                            (DONE, now, stage, key, LEASED, worker))
+                if cursor.rowcount and found and NEXT_STAGE[stage] is not None:
+                    self._conn.executemany('INSERT OR IGNORE INTO tasks (stage, key, status, updated) '
+                                           'VALUES (?, ?, ?, ?)', [(NEXT_STAGE[stage], k, PENDING, now) for k in found])
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+        return cursor.rowcount > 0
+
+    def fail(self, worker: str, stage: str, key: str, error: Union[str, Exception]) -> bool:
+        """
+        Returns a leased task to the queue to be tried again, or marks it failed after its last attempt
+
+        :param worker: The name of the worker that leased the task
+        :param stage: One of SCHEDULE, MATCH or GAME
+        :param key: The link of the task
+        :param error: The error the task failed with
+        :return: False if the worker no longer held the lease
+        """
+
+        error = f'{type(error).__name__}: {error}' if isinstance(error, Exception) else str(error)
+        with self._lock:
+            cursor = self._conn.execute('UPDATE tasks SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, '
+                                        'worker = NULL, lease_until = NULL, error = ?, updated = ? WHERE stage = ? '
+                                        'AND key = ? AND status = ? AND worker = ?',
+                                        (self.max_attempts, FAILED, PENDING, error, time.time(), stage, key, LEASED,
+                                         worker))
+
+        return cursor.rowcount > 0
+
+    def retry_failed(self, stage: str = None) -> int:
+        """
+        Returns the failed tasks to the queue with their attempts reset
+
+        :param stage: If provided only the tasks of this stage
+        :return: The number of tasks returned to the queue
+        """
+
+        with self._lock:
+            if stage is None:
+                cursor = self._conn.execute('UPDATE tasks SET status = ?, attempts = 0, updated = ? WHERE status = ?',
+                                            (PENDING, time.time(), FAILED))
+            else:
+                cursor = self._conn.execute('UPDATE tasks SET status = ?, attempts = 0, updated = ? WHERE status = ? '
+                                            'AND stage = ?', (PENDING, time.time(), FAILED, stage))
+
+        return cursor.rowcount
+
+    def keys(self, stage: str, status: str = None) -> List[str]:
+        """
+        :param stage: One of SCHEDULE, MATCH or GAME
+        :param status: If provided only the tasks with this status are returned
+        :return: The links of the tasks in the stage
+        """
+
+        with self._lock:
+            if status is None:
+                rows = self._conn.execute('SELECT key FROM tasks WHERE stage = ? ORDER BY rowid', (stage,)).fetchall()
+            else:
+                rows = self._conn.execute('SELECT key FROM tasks WHERE stage = ? AND status = ? ORDER BY rowid',
+                                          (stage, status)).fetchall()
+
+        return [r[0] for r in rows]
+
+    def errors(self, stage: str = None) -> Dict[str, str]:
+        """
+        :param stage: If provided only the tasks of this stage
+        :return: The last error of every failed task, {key: error}
+        """
+
+        with self._lock:
+            rows = self._conn.execute('SELECT stage, key, error FROM tasks WHERE status = ?', (FAILED,)).fetchall()
+
+        return {key: error for s, key, error in rows if stage is None or s == stage}
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        """
+        :return: The number of tasks of each status in each stage, {stage: {status: count}}
+        """
+
+        with self._lock:
+            rows = self._conn.execute('SELECT stage, status, COUNT(*) FROM tasks GROUP BY stage, status').fetchall()
+
+        summary = dict()
+        for stage, status, count in rows:
+            summary.setdefault(stage, dict())[status] = count
+
+        return summary
+
+    def is_finished(self) -> bool:
+        """
+        :return: True once no task is pending or leased
+        """
+
+        with self._lock:
+            row = self._conn.execute('SELECT COUNT(*) FROM tasks WHERE status IN (?, ?)', (PENDING, LEASED)).fetchone()
+
+        return row[0] == 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> 'WorkQueue':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def run_worker(queue: WorkQueue, handlers: Dict[str, Callable[[str], List[str]]], worker: str = None,
+               batch: int = 1, lease: float = 300.0, poll: float = 1.0, idle_timeout: float = None,
+               stop: threading.Event = None) -> Dict[str, int]:
+    """
+    Leases tasks from the queue and runs the handler of their stage on them until the queue is finished. The links a
+    handler returns are reported with its task and queued as the next stage, an error is reported as a failure so the
+    task is handed out again.
+
+    :param queue: The work queue of the crawl
+    :param handlers: {stage: called with the link of a task, returns the links found}, the worker only takes tasks of
+                     these stages
+    :param worker: The name of the worker, worker_name() if None
+    :param batch: The number of tasks leased at once
+    :param lease: Seconds the worker has to finish a task before it is handed to another worker
+    :param poll: Seconds to wait before asking again when no task is waiting
+    :param idle_timeout: If provided the worker stops after this many seconds without a task, even if tasks of other
+                         stages are still leased
+    :param stop: If provided the worker stops once it is set
+    :return: The number of tasks done and failed, {'done': count, 'failed': count}
+    """
+
+    if not handlers:
+        raise ValueError('handlers must have a handler for at least one stage')
+
+    worker = worker or worker_name()
+    counts = {'done': 0, 'failed': 0}
+    idle_since = time.monotonic()
+
+    while stop is None or not stop.is_set():
+        tasks = queue.lease(worker, batch, lease, handlers)
+        if not tasks:
+            if queue.is_finished() or (idle_timeout is not None and time.monotonic() - idle_since > idle_timeout):
+                break
+            time.sleep(poll)
+            continue
+
+        for stage, key in tasks:
+            try:
+                found = _timed(stage, handlers[stage], key)
+            except Exception as e:
+                queue.fail(worker, stage, key, e)
+                counts['failed'] += 1
+            else:
+                queue.complete(worker, stage, key, found)
+                counts['done'] += 1
+
+        idle_since = time.monotonic()
+
+    return counts
+
+
+def format_summary(summary: Dict[str, Dict[str, int]]) -> str:
+    return ', '.join(f'{stage} ' + ' '.join(f'{count} {status}' for status, count in sorted(summary[stage].items()))
+                     for stage in (SCHEDULE, MATCH, GAME) if stage in summary)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=('coordinate', 'work', 'status'))
+    parser.add_argument('paths', nargs='+', help='config.ini and the queue for coordinate, config.ini, the queue and '
+                                                 'the download folder for work, the queue for status')
+    parser.add_argument('--backend', default='direct', choices=('direct', 'render'), help='backend of the workers')
+    parser.add_argument('--batch', type=int, default=1, help='Tasks a worker leases at once')
+    parser.add_argument('--lease', type=float, default=300.0, help='Seconds before an unreported task is handed out '
+                                                                  'again')
+    parser.add_argument('--no-wait', action='store_true', help='coordinate only queues the schedule links')
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        with WorkQueue(args.paths[0]) as queue:
+            print(format_summary(queue.summary()))
+        return
+
+    from RiotCrawler.RiotCrawl import RiotCrawl
+
+    with RiotCrawl(args.paths[0]) as rc:
+        if args.command == 'coordinate':
+            print(format_summary(rc.coordinate(args.paths[1], wait=not args.no_wait)))
+        else:
+            counts = rc.work(args.paths[1], args.paths[2], backend=args.backend, batch=args.batch, lease=args.lease)
+            print(f'{counts["done"]} tasks done, {counts["failed"]} failed')
+
+
+if __name__ == '__main__':
+    main()
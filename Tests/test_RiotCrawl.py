@@ -0,0 +1,141 @@
+import os
+import threading
+
+from Benchmarks.bench_crawl import write_config
+from Benchmarks.stub_server import StubServer
+from RiotCrawler.RiotCrawl import RiotCrawl
+from RiotCrawler.crawlMetrics import METRICS
+
+
+def test_run_all_against_the_stub_server(tmpdir):
+    with StubServer(error_rate=0.05, matches=2, games=2) as server:
+        config = write_config(str(tmpdir), server, region='lck', week='playoffs')
+        with RiotCrawl(config) as rc:
+            rc.run_all(str(tmpdir.join('out')), max_concurrency=4, backend='direct')
+            games = len(rc.match_links)
+            schedule = len(rc.schedule_links)
+            assert rc.ledger.summary()['game'] == {'done': games}
+
+    assert games == schedule * 2 * 2
+    assert len([f for f in os.listdir(str(tmpdir.join('out'))) if f.endswith('.json')]) == games
+
+
+def test_tiered_run_sizes_tiers_from_config(tmpdir, monkeypatch):
+    sizes = dict()
+
+    def tiered(links, fetch, render_processes, json_workers, queue_size, *args, **kwargs):
+        sizes.update(render_processes=render_processes, json_workers=json_workers, queue_size=queue_size)
+        return iter(links)
+
+    monkeypatch.setattr('RiotCrawler.RiotCrawl.tiered_process_links', tiered)
+
+    with StubServer() as server:
+        config = write_config(str(tmpdir), server, region='lck', week='playoffs')
+        with open(config, 'a') as f:
+            f.write('\n[WORKERS]\nrender_processes = 2\njson_workers = 48\n')
+
+        with RiotCrawl(config) as rc:
+            assert list(rc.tiered_run(schedule_links=('schedule',), queue_size=16)) == ['schedule']
+
+    assert sizes == {'render_processes': 2, 'json_workers': 48, 'queue_size': 16}
+
+
+def test_batch_run_is_static(monkeypatch):
+    calls = list()
+    monkeypatch.setattr('RiotCrawler.RiotCrawl.batch_process_links', lambda *args, **kwargs: calls.append(args) or [])
+
+    assert RiotCrawl.batch_run(['schedule'], None, 2) == []
+    assert calls == [(['schedule'], None, 2)]
+
+
+def test_batch_crawl_uses_the_crawler_settings(tmpdir, monkeypatch):
+    calls = list()
+    monkeypatch.setattr('RiotCrawler.RiotCrawl.batch_process_links', lambda *args, **kwargs: calls.append(args) or [])
+
+    with StubServer() as server:
+        config = write_config(str(tmpdir), server, region='lck', week='playoffs')
+        with RiotCrawl(config) as rc:
+            rc.schedule_links = ('schedule',)
+            assert rc.batch_crawl(num_process=2) == []
+            assert calls[0][:4] == (('schedule',), None, 2, rc.session_settings)
+
+
+def test_workers_crawl_a_coordinated_queue(tmpdir):
+    queue = str(tmpdir.join('queue.sqlite'))
+    out = str(tmpdir.join('out'))
+
+    with StubServer(matches=2, games=2) as server:
+        config = write_config(str(tmpdir), server, region='lck', week='playoffs')
+        with RiotCrawl(config) as rc:
+            rc.make_links()
+            schedule = len(rc.schedule_links)
+            assert rc.coordinate(queue, wait=False) == {'schedule': {'pending': schedule}}
+
+        def work(name):
+            with RiotCrawl(config) as worker:
+                worker.work(queue, out, worker=name, poll=0.01)
+
+        threads = [threading.Thread(target=work, args=(f'host-{i}',)) for i in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(30)
+
+        with RiotCrawl(config) as rc:
+            summary = rc.coordinate(queue, poll=0.01)
+            games = len(rc.match_links)
+
+    assert summary['game'] == {'done': games}
+    assert games == schedule * 2 * 2
+    assert len([f for f in os.listdir(out) if f.endswith('.json')]) == games
+
+
+def test_low_memory_run_all_spills_links(tmpdir):
+    with StubServer(matches=2, games=2) as server:
+        config = write_config(str(tmpdir), server, region='lck', week='playoffs')
+        with open(config, 'a') as f:
+            f.write(f'\n[MEMORY]\nlow_memory = true\nspill_dir = {tmpdir.join("spill")}\n')
+
+        with RiotCrawl(config) as rc:
+            rc.run_all(str(tmpdir.join('out')), backend='direct', resume=False, index=False)
+            spool = rc.match_links
+            games = sorted(spool)
+            schedule = len(rc.schedule_links)
+            assert os.path.exists(spool.path)
+
+        assert not os.path.exists(spool.path)
+
+    assert len(games) == schedule * 2 * 2
+    assert len([f for f in os.listdir(str(tmpdir.join('out'))) if f.endswith('.json')]) == len(games)
+
+
+def test_get_json_after_a_low_memory_run(tmpdir):
+    with StubServer(matches=2, games=2) as server:
+        config = write_config(str(tmpdir), server, region='lck', week='playoffs')
+        with open(config, 'a') as f:
+            f.write('\n[MEMORY]\nlow_memory = true\nseen_capacity = 1000\n')
+
+        with RiotCrawl(config) as rc:
+            rc.run_all(str(tmpdir.join('out')), backend='direct', resume=False, index=False)
+            games = list(rc.get_json(max_concurrency=2))
+            rc.get_json(path=str(tmpdir.join('again')), max_concurrency=2)
+            links = sorted(rc.match_links)
+
+    assert sorted(g.link for g in games) == links
+    assert len(os.listdir(str(tmpdir.join('again')))) == len(links)
+
+
+def test_low_memory_run_all_keeps_to_the_rss_budget(tmpdir):
+    with StubServer(matches=2, games=2) as server:
+        config = write_config(str(tmpdir), server, region='lck', week='playoffs')
+        with open(config, 'a') as f:
+            f.write('\n[MEMORY]\nlow_memory = true\nrss_budget = 1\npages_per_worker = 1\n')
+
+        with RiotCrawl(config) as rc:
+            rc.run_all(str(tmpdir.join('out')), backend='direct', resume=False, index=False)
+            games = len(rc.match_links)
+            schedule = len(rc.schedule_links)
+
+    assert METRICS.summary()['memory']['throttled'] > 0
+    assert games == schedule * 2 * 2
+    assert len([f for f in os.listdir(str(tmpdir.join('out'))) if f.endswith('.json')]) == games
@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+import warnings
+
+import pytest
+
+from RiotCrawler.Exceptions.errors import BatchError
+from RiotCrawler.batchProcessing import (DEFAULT_TIER_SETTINGS, _page_processor, batch_process_links,
+                                         parse_tier_settings, stream_process_links, tiered_process_links)
+from RiotCrawler.jobLedger import MATCH, SCHEDULE
+from RiotCrawler.memoryBudget import MemoryBudget
+
+PAGES = {
+    'schedule_1': ['match_1', 'match_2'],
+    'schedule_2': ['match_2', 'match_3'],
+    'match_1': ['game_1', 'game_2'],
+    'match_2': ['game_2', 'game_3'],
+    'match_3': ['game_4'],
+}
+
+
+def _fake_processor(stage, link):
+    if link == 'schedule_1':
+        time.sleep(0.2)
+    return stage, PAGES.get(link, []), [link]
+
+
+def _pid_processor(stage, link):
+    return stage, [f'{link}-{os.getpid()}'], []
+
+
+def _failing_processor(stage, link):
+    raise KeyError(link)
+
+
+def test_stream_type_error():
+    with pytest.raises(TypeError):
+        list(stream_process_links('schedule_1'))
+
+
+def test_stream_flattens_and_dedupes():
+    timings = list()
+    links = list(stream_process_links(['schedule_1', 'schedule_2', 'schedule_1'], 2, timings=timings,
+                                      processor=_fake_processor))
+
+    assert sorted(links) == ['game_1', 'game_2', 'game_3', 'game_4']
+    assert sorted(timings) == ['match_1', 'match_2', 'match_3', 'schedule_1', 'schedule_2']
+
+
+def test_slow_page_does_not_hold_up_others():
+    stream = stream_process_links(['schedule_1', 'schedule_2'], 2, processor=_fake_processor)
+    assert next(stream) in ('game_2', 'game_3', 'game_4')
+    stream.close()
+
+
+def test_stream_raises_worker_errors():
+    with pytest.raises(KeyError):
+        list(stream_process_links(['schedule_1'], 1, processor=_failing_processor))
+
+
+def test_batch_requires_links():
+    with pytest.raises(BatchError):
+        batch_process_links(None, num_process=1)
+
+
+def test_batch_size_is_deprecated(monkeypatch):
+    monkeypatch.setattr('RiotCrawler.batchProcessing.stream_process_links', lambda *args: iter(['game_1']))
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        assert batch_process_links(['schedule_1'], 2, 1) == ['game_1']
+
+    assert caught[0].category is DeprecationWarning
+
+
+def test_page_processor_uses_the_selectors_given(monkeypatch):
+    calls = list()
+    monkeypatch.setattr('RiotCrawler.batchProcessing._worker_session', object())
+    monkeypatch.setattr('RiotCrawler.batchProcessing.render_match_pages',
+                        lambda link, session, xpath, timings: calls.append(xpath) or ['match_1'])
+    monkeypatch.setattr('RiotCrawler.batchProcessing.render_stats_links',
+                        lambda link, session, css_selector, timings: calls.append(css_selector) or ['game_1'])
+
+    assert _page_processor(SCHEDULE, 'schedule_1', xpath='/games/')[1] == ['match_1']
+    assert _page_processor(MATCH, 'match_1', css_selector='.game-link')[1] == ['game_1']
+    assert calls == ['/games/', '.game-link']
+
+
+def test_tier_settings():
+    assert parse_tier_settings({'extra': {}}) == DEFAULT_TIER_SETTINGS
+    settings = parse_tier_settings({'extra': {'render_processes': '2', 'json_workers': '64'}})
+    assert settings['render_processes'] == 2 and settings['json_workers'] == 64
+
+
+@pytest.mark.parametrize('value', ['two', '0'])
+def test_tier_settings_error(value):
+    with pytest.raises(ValueError):
+        parse_tier_settings({'extra': {'json_workers': value}})
+
+
+def test_tiered_fetches_every_link_once():
+    fetched = list()
+    lock = threading.Lock()
+
+    def fetch(link):
+        with lock:
+            fetched.append(link)
+        return link.upper()
+
+    games = list(tiered_process_links(['schedule_1', 'schedule_2'], fetch, 2, json_workers=4,
+                                      processor=_fake_processor))
+
+    assert sorted(games) == ['GAME_1', 'GAME_2', 'GAME_3', 'GAME_4']
+    assert sorted(fetched) == ['game_1', 'game_2', 'game_3', 'game_4']
+
+
+def test_tiered_raises_fetch_errors():
+    def fetch(link):
+        raise KeyError(link)
+
+    with pytest.raises(KeyError):
+        list(tiered_process_links(['schedule_1'], fetch, 1, processor=_fake_processor))
+
+
+def test_workers_are_replaced_after_pages_per_worker():
+    links = list(stream_process_links(['schedule_1', 'schedule_2', 'schedule_3'], 1, processor=_pid_processor,
+                                      pages_per_worker=1))
+    assert len({link.rsplit('-', 1)[1] for link in links}) == 3
+
+
+def test_pages_wait_while_over_memory_budget():
+    links = list(stream_process_links(['schedule_1', 'schedule_2'], 2, processor=_fake_processor,
+                                      memory=MemoryBudget(1)))
+    assert sorted(links) == ['game_1', 'game_2', 'game_3', 'game_4']
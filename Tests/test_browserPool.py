@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+from requests_html import HTML
+
+from RiotCrawler.browserPool import BrowserPagePool, discover_links
+
+BASE = 'https://www.lolesports.com/en_US/'
+PAGES = {f'{BASE}schedule/1': '<a href="/en_US/matches/a">a</a><a href="/en_US/matches/b">b</a>',
+         f'{BASE}schedule/2': '<a href="/en_US/matches/c">c</a>',
+         f'{BASE}matches/a': '<a class="stats-link" href="https://matchhistory/a1">1</a>',
+         f'{BASE}matches/b': '<a class="stats-link" href="https://matchhistory/b1">1</a>',
+         f'{BASE}matches/c': '<a class="stats-link" href="https://matchhistory/c1">1</a>'
+                             '<a class="stats-link" href="https://matchhistory/c2">2</a>'}
+
+
+class FakePool(object):
+    def __init__(self):
+        self.rendered = list()
+
+    async def render(self, url, ready_selector, timings=None):
+        self.rendered.append(url)
+        await asyncio.sleep(0)
+        return HTML(url=url, html=PAGES[url])
+
+
+def test_pool_size_error():
+    with pytest.raises(ValueError):
+        BrowserPagePool(size=0)
+
+
+def test_discover_links_order():
+    pool = FakePool()
+    res = asyncio.run(discover_links(pool, (f'{BASE}schedule/1', f'{BASE}schedule/2'), '/matches/', '.stats-link'))
+    assert res == ['https://matchhistory/a1', 'https://matchhistory/b1', 'https://matchhistory/c1',
+                   'https://matchhistory/c2']
+    assert len(pool.rendered) == 5
+
+
+def test_discover_links_skips_failing_pages():
+    class FailingPool(FakePool):
+        async def render(self, url, ready_selector, timings=None):
+            if url.endswith('/b'):
+                raise ValueError(url)
+            return await super().render(url, ready_selector, timings)
+
+    errors = dict()
+    res = asyncio.run(discover_links(FailingPool(), (f'{BASE}schedule/1', f'{BASE}schedule/2'), '/matches/',
+                                     '.stats-link', errors=errors))
+    assert res == ['https://matchhistory/a1', 'https://matchhistory/c1', 'https://matchhistory/c2']
+    assert list(errors) == [f'{BASE}matches/b']
@@ -0,0 +1,100 @@
+import os
+
+import pytest
+
+from Benchmarks.fixtures import make_match_links
+from Benchmarks.stub_server import StubServer
+from RiotCrawler.crawlJSON import _create_json_links, crawl_json, crawl_json_async
+from RiotCrawler.storageSinks import as_sink
+
+MATCH_LINK = 'https://matchhistory.na.leagueoflegends.com/en/#match-details/TRLH1/1002440062?gameHash=a3b08c115923f00d'
+
+
+@pytest.fixture(scope='module')
+def server():
+    with StubServer() as s:
+        yield s
+
+
+def test_create_json_links():
+    game, timeline = _create_json_links(MATCH_LINK)
+    assert game == 'https://acs.leagueoflegends.com/v1/stats/game/TRLH1/1002440062?gameHash=a3b08c115923f00d'
+    assert timeline == ('https://acs.leagueoflegends.com/v1/stats/game/TRLH1/1002440062/timeline'
+                        '?gameHash=a3b08c115923f00d')
+
+
+def test_create_json_links_base():
+    game, _ = _create_json_links(MATCH_LINK, 'http://127.0.0.1:8000/')
+    assert game.startswith('http://127.0.0.1:8000/v1/stats/game/TRLH1/')
+
+
+def test_async_type_error():
+    with pytest.raises(TypeError):
+        crawl_json_async('not a tuple')
+
+
+def test_async_concurrency_error():
+    with pytest.raises(ValueError):
+        crawl_json_async(make_match_links(1), max_concurrency=0)
+
+
+def test_async_returns_every_game(server):
+    links = make_match_links(6)
+    res = crawl_json_async(links, max_concurrency=3, acs_base=server.url)
+    assert [r['gameId'] for r in res] == [1002440000 + i for i in range(6)]
+    assert all('frames' in r for r in res)
+
+
+def test_async_saves_every_game(server, tmpdir):
+    links = make_match_links(4)
+    res = crawl_json(links, str(tmpdir), max_concurrency=2, acs_base=server.url)
+    assert res is None
+    assert len(os.listdir(str(tmpdir))) == 4
+
+
+def test_short_game_id_key(server, tmpdir):
+    links = make_match_links(1, realm='ESPORTSTMNT01', first_id=690260)
+    record = next(crawl_json(links, acs_base=server.url))
+    assert record.key == 'ESPORTSTMNT01_690260'
+
+    crawl_json(links, str(tmpdir), acs_base=server.url)
+    assert os.listdir(str(tmpdir)) == ['game_ESPORTSTMNT01_690260.json']
+
+
+@pytest.mark.parametrize('max_concurrency', [None, 2])
+def test_folder_sink_is_opened_once(server, tmpdir, monkeypatch, max_concurrency):
+    opened = list()
+
+    def _as_sink(path):
+        sink, owned = as_sink(path)
+        if owned:
+            opened.append(path)
+        return sink, owned
+
+    monkeypatch.setattr('RiotCrawler.crawlJSON.as_sink', _as_sink)
+    crawl_json(iter(make_match_links(3)), str(tmpdir), max_concurrency=max_concurrency, acs_base=server.url)
+
+    assert opened == [str(tmpdir)]
+    assert len(os.listdir(str(tmpdir))) == 3
+
+
+def test_returns_every_game_lazily(server):
+    links = make_match_links(3)
+    res = crawl_json(links, acs_base=server.url)
+    assert not isinstance(res, (list, dict))
+    assert [r['gameId'] for r in res] == [1002440000 + i for i in range(3)]
+
+
+def test_concurrent_iterator_keeps_order_and_bounds_requests(server):
+    links = make_match_links(8)
+    start = server.requests
+    res = crawl_json(links, max_concurrency=2, acs_base=server.url)
+
+    assert next(res)['gameId'] == 1002440000
+    assert server.requests - start <= 6
+    assert [r['gameId'] for r in res] == [1002440000 + i for i in range(1, 8)]
+
+
+def test_iterator_concurrency_error():
+    with pytest.raises(ValueError):
+        crawl_json(make_match_links(1), max_concurrency=0)
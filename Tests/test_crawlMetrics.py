@@ -0,0 +1,99 @@
+import io
+import json
+
+import pytest
+
+from Benchmarks.fixtures import make_match_links
+from Benchmarks.stub_server import StubServer
+from RiotCrawler.crawlJSON import crawl_json
+from RiotCrawler.crawlMetrics import METRICS, Histogram, Metrics, MetricsReporter, format_summary
+from RiotCrawler.jobLedger import SCHEDULE, JobLedger, checkpoint
+
+
+@pytest.fixture
+def metrics():
+    METRICS.reset()
+    yield METRICS
+    METRICS.reset()
+
+
+def test_histogram_quantiles():
+    h = Histogram()
+    for value in [0.02] * 90 + [2.0] * 10:
+        h.observe(value)
+    assert 0.01 <= h.quantile(0.5) <= 0.025
+    assert 1.0 <= h.quantile(0.95) <= 2.5
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_timer_counts_done_and_errors():
+    m = Metrics()
+    with m.timer(stage='fetch'):
+        pass
+    with pytest.raises(ValueError):
+        with m.timer(stage='fetch'):
+            raise ValueError
+    row = m.summary()['fetch']
+    assert row['done'] == 1 and row['errors'] == 1
+    assert row['per_sec'] > 0
+
+
+def test_drain_and_merge():
+    worker, parent = Metrics(), Metrics()
+    worker.count('bytes', 10, stage='fetch')
+    worker.observe('seconds', 0.3, stage='fetch')
+    parent.count('bytes', 5, stage='fetch')
+    parent.merge(json.loads(json.dumps(worker.drain())))
+    assert parent.summary()['fetch']['bytes'] == 15
+    assert parent.histograms[('seconds', (('stage', 'fetch'),))].count == 1
+    assert worker.counters == {}
+
+
+def test_summary_in_stage_order():
+    m = Metrics()
+    for stage in ['save', 'links', 'http', 'schedule']:
+        m.count('done', stage=stage)
+    assert list(m.summary()) == ['links', 'schedule', 'save', 'http']
+    assert format_summary(m.summary()).startswith('links 1 (')
+
+
+def test_prometheus_text():
+    m = Metrics()
+    m.count('done', 3, stage='match')
+    m.observe('seconds', 0.2, stage='match')
+    text = m.to_prometheus()
+    assert '# TYPE riotcrawler_done_total counter' in text
+    assert 'riotcrawler_done_total{stage="match"} 3' in text
+    assert 'riotcrawler_seconds_bucket{stage="match",le="+Inf"} 1' in text
+    assert 'riotcrawler_seconds_count{stage="match"} 1' in text
+
+
+def test_checkpoint_records_stage(metrics, tmpdir):
+    ledger = JobLedger(str(tmpdir.join('ledger.sqlite')))
+    checkpoint(ledger, SCHEDULE, 'page', lambda link: ['a', 'b'])
+    checkpoint(ledger, SCHEDULE, 'page', lambda link: ['a', 'b'])
+    row = metrics.summary()[SCHEDULE]
+    assert (row['done'], row['found'], row['skipped']) == (1, 2, 1)
+    ledger.close()
+
+
+def test_fetch_and_save_are_measured(metrics, tmpdir):
+    with StubServer() as server:
+        crawl_json(make_match_links(3), str(tmpdir), acs_base=server.url)
+    summary = metrics.summary()
+    assert summary['fetch']['done'] == 6
+    assert summary['fetch']['bytes'] > 0
+    assert summary['save']['done'] == 3
+    assert summary['http']['requests'] == 6
+
+
+def test_reporter_writes_every_export(tmpdir):
+    m = Metrics()
+    m.count('done', stage='fetch')
+    stream = io.StringIO()
+    jsonl, prom = str(tmpdir.join('metrics.jsonl')), str(tmpdir.join('crawl.prom'))
+    with MetricsReporter(m, interval=60, jsonl=jsonl, prometheus=prom, stream=stream):
+        pass
+    assert 'fetch 1' in stream.getvalue()
+    assert json.loads(open(jsonl).readline())['summary']['fetch']['done'] == 1
+    assert 'riotcrawler_done_total' in open(prom).read()
@@ -0,0 +1,46 @@
+import pytest
+
+from RiotCrawler.crawlSession import DEFAULT_SESSION_SETTINGS, create_session, parse_session_settings
+
+
+def test_default_settings():
+    assert parse_session_settings({'default_init': {}, 'extra': {}}) == DEFAULT_SESSION_SETTINGS
+
+
+def test_config_settings():
+    res = parse_session_settings({'extra': {'timeout': '5', 'retries': '2', 'year': '2017'}})
+    assert res['timeout'] == 5.0
+    assert res['retries'] == 2
+    assert res['pool_size'] == DEFAULT_SESSION_SETTINGS['pool_size']
+
+
+def test_config_settings_error():
+    with pytest.raises(ValueError):
+        parse_session_settings({'extra': {'retries': 'many'}})
+
+
+def test_session_adapter():
+    session = create_session(timeout=3, retries=4, pool_size=7)
+    adapter = session.get_adapter('https://acs.leagueoflegends.com/')
+    assert adapter.timeout == 3
+    assert adapter.max_retries.total == 4
+    assert 429 not in adapter.max_retries.status_forcelist
+    assert adapter.throttle_retries == 4
+    assert adapter._pool_maxsize == 7
+    session.close()
+
+
+def test_session_without_limiter():
+    session = create_session(host_concurrency=0)
+    adapter = session.get_adapter('https://acs.leagueoflegends.com/')
+    assert session.rate_limiter is None
+    assert 429 in adapter.max_retries.status_forcelist
+    session.close()
+
+
+def test_sessions_share_limiter():
+    session = create_session(rate=5.0)
+    other = create_session(limiter=session.rate_limiter)
+    assert other.get_adapter('https://acs.leagueoflegends.com/').limiter is session.rate_limiter
+    session.close()
+    other.close()
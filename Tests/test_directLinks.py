@@ -0,0 +1,79 @@
+from collections import Counter
+from urllib.parse import urlsplit
+
+import pytest
+from requests_html import HTML
+
+from Benchmarks.fixtures import match_page_games, match_page_paths
+from Benchmarks.stub_server import StubServer
+from RiotCrawler.crawlSession import create_session
+from RiotCrawler.Exceptions.errors import LinksNotFoundError
+from RiotCrawler.directLinks import _links_from_payload, direct_stats_links, extract_stats_links, \
+    get_direct_match_history_links
+
+LINK = 'https://matchhistory.na.leagueoflegends.com/en/#match-details/TRLH1/1002440062?gameHash=a3b08c115923f00d'
+
+
+def test_links_in_source():
+    html = HTML(html=f'<div><a class="stats-link" href="{LINK}">Stats</a><a href="{LINK}">Again</a></div>')
+    assert extract_stats_links(html) == [LINK]
+
+
+def test_escaped_links_in_script():
+    escaped = LINK.replace('/', '\\/')
+    html = HTML(html=f'<script>var data = {{"url": "{escaped}"}};</script>')
+    assert extract_stats_links(html) == [LINK]
+
+
+def test_links_in_embedded_state():
+    state = ('{"games": {"a1": {"id": "a1", "gameId": "1002440062", "gameRealm": "TRLH1"}},'
+             ' "gameIdMappings": [{"id": "a1", "gameHash": "a3b08c115923f00d"}]}')
+    html = HTML(html=f'<script>window.__INITIAL_STATE__ = {state};</script>')
+    assert extract_stats_links(html) == [LINK]
+
+
+def test_payload_missing_hash():
+    assert _links_from_payload({'games': [{'id': 'a1', 'gameId': '1', 'gameRealm': 'TRLH1'}]}) == []
+
+
+def test_no_links():
+    assert extract_stats_links(HTML(html='<div><script></script></div>')) == []
+
+
+def test_crawls_the_stub_server():
+    with StubServer(error_rate=0.2, matches=3, games=2, seed=1) as server:
+        schedule_links = [f'{server.lolesports}na-lcs/na_2017_spring/schedule/regular_season/{week}'
+                          for week in (1, 2)]
+        session = create_session(backoff=0.001)
+        links = get_direct_match_history_links(schedule_links, '/matches/', '.stats-link', session, fallback=False)
+        session.close()
+
+    expected = [game_id for link in schedule_links for path in match_page_paths(urlsplit(link).path, 3)
+                for game_id in match_page_games(path, 2)]
+    assert [int(link.split('/')[-1].split('?')[0]) for link in links] == expected
+    assert server.errors > 0
+
+
+def test_workers_crawl_the_stub_server_in_order():
+    with StubServer(latency=0.01, matches=3, games=2) as server:
+        schedule_links = [f'{server.lolesports}lck/lck_2017_spring/schedule/regular_season/{week}' for week in range(4)]
+        session = create_session()
+        serial = get_direct_match_history_links(schedule_links, '/matches/', '.stats-link', session, fallback=False)
+        concurrent = get_direct_match_history_links(schedule_links, '/matches/', '.stats-link', session,
+                                                    fallback=False, workers=6)
+        session.close()
+
+    assert concurrent == serial
+    assert len(serial) == 4 * 3 * 2
+
+
+def test_page_without_links_fails_without_fallback():
+    class Session(object):
+        def get(self, link):
+            return type('Response', (), {'html': HTML(url=link, html='<div></div>')})
+
+    stats = Counter()
+    with pytest.raises(LinksNotFoundError):
+        direct_stats_links('https://x.com/matches/1', Session(), '.stats-link', 'https://api.x.com/', False, 1, 0,
+                           None, stats)
+    assert stats == Counter()
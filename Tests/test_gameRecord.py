@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from Benchmarks.fixtures import make_game, make_timeline
+from RiotCrawler.gameRecord import GameRecord
+
+
+@pytest.fixture
+def record():
+    game = json.dumps(make_game(1002440062)).encode()
+    timeline = json.dumps(make_timeline(1002440062, minutes=3)).encode()
+    return GameRecord('TRLH1_1002440062', game, timeline)
+
+
+def test_game_is_decoded_without_timeline(record):
+    assert record.game['gameId'] == 1002440062
+    assert record.is_decoded('game')
+    assert not record.is_decoded('timeline')
+
+
+def test_frames_decode_timeline(record):
+    assert len(record.frames) == 4
+    assert record.is_decoded('timeline')
+
+
+def test_mapping_prefers_game_keys():
+    record = GameRecord('k', {'gameId': 1, 'frameInterval': 'game'}, {'frames': [], 'frameInterval': 60000})
+
+    assert record['frameInterval'] == 'game'
+    assert record['frames'] == []
+    assert 'frames' in record
+    assert sorted(record) == ['frameInterval', 'frames', 'gameId']
+
+    with pytest.raises(KeyError):
+        record['missing']
+
+
+def test_to_json_keeps_response_bytes(record):
+    assert record.to_json() == b'{"game":' + record.raw('game') + b',"timeline":' + record.raw('timeline') + b'}'
+    assert not record.is_decoded('game')
+    assert json.loads(record.to_json()) == record.to_dict()
+
+
+def test_from_dict():
+    saved = GameRecord.from_dict({'game': {'gameId': 1, 'platformId': 'TRLH1'}, 'timeline': {'frames': []}})
+    assert saved.key == 'TRLH1_1'
+    assert saved.frames == []
+
+    merged = GameRecord.from_dict({'gameId': 2, 'platformId': 'TRLH1', 'frames': [{}], 'frameInterval': 60000})
+    assert merged.game == {'gameId': 2, 'platformId': 'TRLH1'}
+    assert merged.timeline == {'frames': [{}], 'frameInterval': 60000}
@@ -0,0 +1,104 @@
+import pytest
+
+from Benchmarks.fixtures import make_match_links
+from Benchmarks.stub_server import StubServer
+from RiotCrawler.crawlJSON import crawl_json
+from RiotCrawler.jobLedger import DONE, FAILED, GAME, MATCH, PENDING, SCHEDULE, JobLedger
+from RiotCrawler.matchCrawler import crawl_schedule_pages
+
+PAGES = {'s1': ['m1', 'm2'], 's2': ['m3'], 'm1': ['g1'], 'm2': ['g2', 'g3'], 'm3': []}
+
+
+@pytest.fixture
+def ledger(tmpdir):
+    l = JobLedger(str(tmpdir.join('ledger.sqlite')))
+    yield l
+    l.close()
+
+
+class Finder(object):
+    def __init__(self, broken=()):
+        self.calls = list()
+        self.broken = broken
+
+    def __call__(self, link):
+        self.calls.append(link)
+        if link in self.broken:
+            raise IOError(f'{link} did not load')
+        return PAGES[link]
+
+
+def test_add_keeps_status(ledger):
+    ledger.complete(SCHEDULE, 's1', ['m1'])
+    ledger.add(SCHEDULE, ['s1', 's2'])
+    assert ledger.status(SCHEDULE, 's1') == DONE
+    assert ledger.status(SCHEDULE, 's2') == PENDING
+    assert ledger.result(SCHEDULE, 's1') == ['m1']
+    assert ledger.result(SCHEDULE, 's2') is None
+
+
+def test_parent(ledger):
+    crawl_schedule_pages(['s1', 's2'], Finder(), Finder(), ledger)
+    assert ledger.parent(GAME, 'g3') == 'm2'
+    assert ledger.parent(MATCH, 'm2') == 's1'
+    assert ledger.parent(GAME, 'g4') is None
+
+
+def test_parent_of_ledger_without_parents(ledger):
+    ledger.complete(SCHEDULE, 's1', ['m1', 'm2'])
+    ledger.complete(MATCH, 'm2', ['g2', 'g3'])
+    ledger.add(GAME, ['g2', 'g3'])
+    assert ledger.parent(GAME, 'g3') == 'm2'
+    assert ledger.parent(MATCH, 'm1') == 's1'
+
+
+def test_fail_and_summary(ledger):
+    ledger.fail(GAME, 'g1', IOError('timeout'))
+    ledger.complete(GAME, 'g2')
+    assert ledger.summary() == {GAME: {FAILED: 1, DONE: 1}}
+
+
+def test_reopen(ledger):
+    ledger.complete(SCHEDULE, 's1', ['m1'])
+    ledger.complete(SCHEDULE, 's2', [])
+    assert ledger.reopen(SCHEDULE, lambda link, found: not found) == 1
+    assert ledger.status(SCHEDULE, 's2') == PENDING
+    assert ledger.keys(SCHEDULE, DONE) == ['s1']
+
+
+def test_crawl_without_ledger_raises():
+    with pytest.raises(IOError):
+        crawl_schedule_pages(('s1',), Finder(), Finder(broken=('m2',)))
+
+
+def test_crawl_resumes(ledger):
+    find_stats = Finder(broken=('m2',))
+    res = crawl_schedule_pages(('s1', 's2'), Finder(), find_stats, ledger)
+    assert res == ('g1',)
+    assert ledger.status(MATCH, 'm2') == FAILED
+    assert ledger.keys(GAME) == ['g1']
+
+    find_matches, find_stats = Finder(), Finder()
+    res = crawl_schedule_pages(('s1', 's2'), find_matches, find_stats, ledger)
+    assert res == ('g1', 'g2', 'g3')
+    assert find_matches.calls == []
+    assert find_stats.calls == ['m2']
+
+
+def test_crawl_json_resumes(ledger, tmpdir):
+    links = make_match_links(3)
+    with StubServer() as server:
+        crawl_json(links[:2], str(tmpdir), acs_base=server.url, ledger=ledger)
+        crawl_json(links, str(tmpdir), max_concurrency=2, acs_base=server.url, ledger=ledger)
+        requests = server.requests
+
+    assert requests == 6
+    assert sorted(ledger.keys(GAME, DONE)) == sorted(links)
+
+
+def test_crawl_json_records_failures(ledger, tmpdir):
+    with StubServer() as server:
+        crawl_json(['https://matchhistory.na.leagueoflegends.com/en/#match-details/TRLH1/bad?gameHash=1'],
+                   str(tmpdir), acs_base=server.url, ledger=ledger)
+
+    assert ledger.summary() == {GAME: {FAILED: 1}}
@@ -0,0 +1,38 @@
+import pytest
+
+from Benchmarks.fixtures import make_timeline
+from RiotCrawler import jsonCodec
+
+
+@pytest.fixture
+def codec():
+    name = jsonCodec.CODEC
+    yield
+    jsonCodec.use_codec(name)
+
+
+def test_stdlib_is_always_available():
+    assert jsonCodec.available_codecs()[-1] == 'json'
+    assert jsonCodec.CODEC == jsonCodec.available_codecs()[0]
+
+
+def test_use_codec_errors(codec):
+    with pytest.raises(ValueError):
+        jsonCodec.use_codec('simplejson')
+
+
+@pytest.mark.parametrize('name', jsonCodec.available_codecs())
+def test_round_trip(codec, name):
+    jsonCodec.use_codec(name)
+    timeline = make_timeline(1002440062, minutes=2)
+
+    data = jsonCodec.dumps(timeline)
+    assert isinstance(data, bytes)
+    assert jsonCodec.loads(data) == timeline
+    assert jsonCodec.loads(data.decode()) == timeline
+
+
+@pytest.mark.parametrize('name', jsonCodec.available_codecs())
+def test_dumps_is_compact(codec, name):
+    jsonCodec.use_codec(name)
+    assert jsonCodec.dumps({'a': [1, 2], 'b': 'x'}) == b'{"a":[1,2],"b":"x"}'
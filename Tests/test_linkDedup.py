@@ -0,0 +1,99 @@
+import pytest
+
+from Benchmarks.fixtures import make_match_links
+from Benchmarks.stub_server import StubServer
+from RiotCrawler.crawlJSON import crawl_json
+from RiotCrawler.linkDedup import BloomFilter, SeenSet, canonical_link, canonical_links, link_game_key, unique_links
+from RiotCrawler.matchCrawler import crawl_schedule_pages
+
+STATS = 'https://matchhistory.na.leagueoflegends.com/en/#match-details/TRLH1/1002440062?gameHash=a3b08c115923f00d'
+SCHEDULE = 'https://www.lolesports.com/en_US/na-lcs/na_2017_spring/schedule/playoffs/Round%201'
+
+
+@pytest.mark.parametrize('link', [
+    STATS,
+    'http://matchhistory.euw.leagueoflegends.com/de/#match-details/trlh1/1002440062?gameHash=A3B08C115923F00D',
+    'https://matchhistory.na.leagueoflegends.com/en/#match-details/TRLH1/1002440062?gameHash=a3b08c115923f00d&tab=1',
+])
+def test_match_history_links(link):
+    assert canonical_link(link) == STATS
+
+
+@pytest.mark.parametrize('link', [
+    SCHEDULE,
+    'HTTP://WWW.LOLESPORTS.COM:80/en_US//na-lcs/na_2017_spring/schedule/playoffs/Round 1/',
+    'https://www.lolesports.com/en_US/na-lcs/na_2017_spring/schedule/playoffs/Round%201#top',
+])
+def test_pages(link):
+    assert canonical_link(link) == SCHEDULE
+
+
+def test_local_server_keeps_its_scheme():
+    assert canonical_link('http://127.0.0.1:8080/en_US//schedule/1/') == 'http://127.0.0.1:8080/en_US/schedule/1'
+    assert canonical_link('http://example.com:80/a') == 'https://example.com/a'
+
+
+def test_query_is_sorted_without_tracking():
+    assert canonical_link('https://a.com/p?b=2&utm_source=x&a=1') == 'https://a.com/p?a=1&b=2'
+    assert canonical_link('schedule_1') == 'schedule_1'
+
+
+def test_canonical_links():
+    assert canonical_links([STATS, STATS.replace('https', 'http'), SCHEDULE]) == [STATS, SCHEDULE]
+
+
+@pytest.mark.parametrize('seen', [SeenSet(), BloomFilter(1000)])
+def test_seen(seen):
+    assert seen.add(SCHEDULE)
+    assert not seen.add(SCHEDULE + '/')
+    assert SCHEDULE in seen
+    assert STATS not in seen
+    assert unique_links([STATS, SCHEDULE, STATS], seen) == [STATS]
+    assert len(seen) == 2
+
+
+def test_bloom_filter_error_rate():
+    seen = BloomFilter(10000, error_rate=0.01)
+    for i in range(10000):
+        seen.add(f'https://a.com/{i}')
+
+    false_positives = sum(f'https://b.com/{i}' in seen for i in range(10000))
+    assert false_positives < 200
+
+    with pytest.raises(ValueError):
+        BloomFilter(0)
+
+
+def test_crawl_schedule_pages_crawls_each_page_once():
+    crawled = list()
+
+    def _match_pages(link):
+        crawled.append(link)
+        return ['https://x.com/match/1', 'https://x.com/match/2/']
+
+    def _stats_links(link):
+        crawled.append(link)
+        return [STATS, f'https://x.com/game/{link.rstrip("/")[-1]}']
+
+    links = crawl_schedule_pages([SCHEDULE, SCHEDULE.replace('%20', ' '), 'https://x.com/schedule/2'],
+                                 _match_pages, _stats_links)
+
+    assert links == (STATS, 'https://x.com/game/1', 'https://x.com/game/2')
+    assert crawled == [SCHEDULE, 'https://x.com/match/1', 'https://x.com/match/2/', 'https://x.com/schedule/2']
+
+
+def test_crawl_json_fetches_each_game_once():
+    links = make_match_links(3)
+
+    with StubServer() as server:
+        games = list(crawl_json(links + [links[0].replace('https', 'http')], max_concurrency=2, acs_base=server.url))
+        requests = server.requests
+
+    assert [g.key for g in games] == [f'TRLH1_{1002440000 + i}' for i in range(3)]
+    assert requests == 6
+
+
+def test_link_game_key():
+    link = 'https://matchhistory.na.leagueoflegends.com/en/#match-details/ESPORTSTMNT01/690260?gameHash=a3b0'
+    assert link_game_key(link) == 'ESPORTSTMNT01_690260'
+    assert link_game_key('https://www.lolesports.com/en_US/lck/') is None
@@ -0,0 +1,153 @@
+import random
+import threading
+import time
+
+import pytest
+
+from RiotCrawler.Exceptions.errors import LinksNotFoundError
+from RiotCrawler.jobLedger import DONE, MATCH, SCHEDULE as SCHEDULE_STAGE, JobLedger
+from RiotCrawler.matchCrawler import crawl_schedule_pages
+
+SCHEDULE = [f'https://x.com/schedule/{s}' for s in range(6)]
+MATCHES = {link: [f'https://x.com/matches/{s}/{m}' for m in range(3)] + ['https://x.com/matches/shared']
+           for s, link in enumerate(SCHEDULE)}
+STATS = {match: [f'{match}/game/{g}' for g in range(2)] + ['https://x.com/game/shared']
+         for matches in MATCHES.values() for match in matches}
+
+
+def _slow(pages):
+    rng = random.Random(0)
+    lock = threading.Lock()
+
+    def _find(link):
+        with lock:
+            delay = rng.random() / 100
+        time.sleep(delay)
+        return pages[link]
+
+    return _find
+
+
+def test_workers_keep_the_order_of_one_worker():
+    serial = crawl_schedule_pages(SCHEDULE, MATCHES.get, STATS.get)
+    concurrent = crawl_schedule_pages(SCHEDULE, _slow(MATCHES), _slow(STATS), workers=8)
+    assert concurrent == serial
+    assert len(serial) == len(set(serial)) == 6 * 3 * 2 + 2 + 1
+
+
+def test_workers_call_on_found_with_every_link_once():
+    found = list()
+    links = crawl_schedule_pages(SCHEDULE, _slow(MATCHES), _slow(STATS), on_found=found.extend, workers=4)
+    assert sorted(found) == sorted(links)
+
+
+def test_workers_run_pages_at_once():
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def _find(link):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+        return STATS.get(link, MATCHES.get(link))
+
+    crawl_schedule_pages(SCHEDULE, _find, _find, workers=4)
+    assert peak[0] == 4
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_failing_pages_are_skipped(workers):
+    def _find_stats(link):
+        if link.endswith('/1'):
+            raise ValueError(link)
+        return STATS[link]
+
+    errors = dict()
+    links = crawl_schedule_pages(SCHEDULE, MATCHES.get, _find_stats, workers=workers, errors=errors)
+    assert sorted(errors) == sorted(m for matches in MATCHES.values() for m in matches if m.endswith('/1'))
+    assert all(isinstance(e, ValueError) for e in errors.values())
+    assert len(links) == 6 * 2 * 2 + 2 + 1
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_errors_are_raised_without_errors_or_ledger(workers):
+    def _fail(link):
+        raise ValueError(link)
+
+    with pytest.raises(ValueError):
+        crawl_schedule_pages(SCHEDULE, MATCHES.get, _fail, workers=workers)
+
+
+def test_workers_error():
+    with pytest.raises(ValueError):
+        crawl_schedule_pages(SCHEDULE, MATCHES.get, STATS.get, workers=0)
+
+
+def test_pages_without_links_fall_back_after_the_threads(tmpdir):
+    unreadable = {SCHEDULE[2], MATCHES[SCHEDULE[0]][1]}
+    threads = set()
+
+    def _direct(pages):
+        def _find(link):
+            if link in unreadable:
+                raise LinksNotFoundError(link)
+            return pages[link]
+        return _find
+
+    def _render(pages):
+        def _find(link):
+            threads.add(threading.current_thread())
+            return pages[link]
+        return _find
+
+    ledger = JobLedger(str(tmpdir.join('ledger.sqlite')))
+    errors = dict()
+    links = crawl_schedule_pages(SCHEDULE, _direct(MATCHES), _direct(STATS), ledger, workers=4, errors=errors,
+                                 fallback=(_render(MATCHES), _render(STATS)))
+
+    assert links == crawl_schedule_pages(SCHEDULE, MATCHES.get, STATS.get)
+    assert threads == {threading.current_thread()}
+    assert errors == {}
+    assert all(ledger.status(stage, link) == DONE for stage, link in ((SCHEDULE_STAGE, SCHEDULE[2]),
+                                                                      (MATCH, MATCHES[SCHEDULE[0]][1])))
+    ledger.close()
+
+
+def test_only_the_pages_without_links_fall_back():
+    unreadable = {SCHEDULE[2], MATCHES[SCHEDULE[2]][0]}
+    rendered = list()
+
+    def _direct(pages):
+        def _find(link):
+            if link in unreadable:
+                raise LinksNotFoundError(link)
+            return pages[link]
+        return _find
+
+    def _render(pages):
+        def _find(link):
+            rendered.append(link)
+            return pages[link]
+        return _find
+
+    links = crawl_schedule_pages(SCHEDULE, _direct(MATCHES), _direct(STATS), workers=4,
+                                 fallback=(_render(MATCHES), _render(STATS)))
+
+    assert links == crawl_schedule_pages(SCHEDULE, MATCHES.get, STATS.get)
+    assert sorted(rendered) == sorted(unreadable)
+
+
+def test_pages_without_links_are_not_done_without_fallback(tmpdir):
+    def _find(link):
+        if link == SCHEDULE[1]:
+            raise LinksNotFoundError(link)
+        return MATCHES[link]
+
+    ledger = JobLedger(str(tmpdir.join('ledger.sqlite')))
+    crawl_schedule_pages(SCHEDULE, _find, STATS.get, ledger, workers=4)
+
+    assert ledger.status(SCHEDULE_STAGE, SCHEDULE[1]) == 'failed'
+    ledger.close()
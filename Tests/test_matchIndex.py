@@ -0,0 +1,158 @@
+import io
+import json
+import os
+
+import pytest
+
+from Benchmarks.fixtures import make_game, make_match_links, make_timeline
+from Benchmarks.stub_server import StubServer
+from RiotCrawler.crawlJSON import crawl_json
+from RiotCrawler.gameRecord import GameRecord
+from RiotCrawler.jobLedger import GAME, LEDGER_FILE, MATCH, SCHEDULE, JobLedger
+from RiotCrawler.matchCrawler import crawl_schedule_pages
+from RiotCrawler.matchIndex import (INDEX_FILE, IndexingSink, MatchIndex, _lines, game_row, rebuild_index,
+                                    schedule_context)
+from RiotCrawler.storageSinks import JsonLinesSink, JsonSink
+
+SCHEDULE_LINK = 'https://www.lolesports.com/en_US/lck/lck_2017_summer/schedule/regular_season/3'
+PLAYOFF_LINK = 'https://www.lolesports.com/en_US/na-lcs/na_2017_spring/schedule/playoffs/Round%201'
+
+
+def _record(link):
+    game_id = int(link.split('/')[-1].split('?')[0])
+    return GameRecord(f'TRLH1_{game_id}', json.dumps(make_game(game_id)).encode(),
+                      json.dumps(make_timeline(game_id, minutes=2)).encode(), link)
+
+
+def _ledger(path, links):
+    ledger = JobLedger(path)
+    ledger.complete(SCHEDULE, SCHEDULE_LINK, ['match-page-1'])
+    ledger.complete(MATCH, 'match-page-1', links[:2])
+    ledger.complete(SCHEDULE, PLAYOFF_LINK, ['match-page-2'])
+    ledger.complete(MATCH, 'match-page-2', links[2:])
+    ledger.add(GAME, links)
+    return ledger
+
+
+def test_schedule_context():
+    assert schedule_context(SCHEDULE_LINK) == {'region': 'lck', 'year': 2017, 'split': 'summer', 'week': '3'}
+    assert schedule_context(PLAYOFF_LINK)['week'] == 'Round 1'
+    assert schedule_context(PLAYOFF_LINK)['region'] == 'na'
+    assert schedule_context(None) == {'region': None, 'year': None, 'split': None, 'week': None}
+
+
+def test_game_row_does_not_decode_timeline():
+    link = make_match_links(1)[0]
+    record = _record(link)
+    game = make_game(1002440000)
+
+    row = game_row(record, SCHEDULE_LINK)
+
+    assert not record.is_decoded('timeline')
+    assert row['game_hash'] == f'{1002440000:016x}'
+    assert row['blue'] == game['participantIdentities'][0]['player']['summonerName'].split()[0]
+    assert row['winner'] in (row['blue'], row['red'])
+    assert row['patch'] == '.'.join(game['gameVersion'].split('.')[:2])
+    assert row['region'] == 'lck'
+
+
+def test_query(tmpdir):
+    links = make_match_links(4)
+    ledger = _ledger(str(tmpdir.join(LEDGER_FILE)), links)
+    index = MatchIndex(str(tmpdir.join(INDEX_FILE)), ledger)
+
+    for link in links:
+        index.add(_record(link))
+    index.add(_record(links[0]))
+
+    assert len(index) == 4
+    assert [r['link'] for r in index.query(region='lck', year=2017, split='summer', week=3)] == links[:2]
+    assert [r['link'] for r in index.query(week='Round 1')] == links[2:]
+
+    team = index.query()[0]['blue']
+    assert all(team in (r['blue'], r['red']) for r in index.query(team=team.lower()))
+    assert index.query(game_id=1002440001)[0]['key'] == 'TRLH1_1002440001'
+    assert index.query(min_duration=10 ** 6) == []
+
+    index.close()
+    ledger.close()
+
+
+def test_crawl_through_indexing_sink(tmpdir):
+    links = make_match_links(3)
+    index = MatchIndex(str(tmpdir.join(INDEX_FILE)))
+
+    with StubServer() as server:
+        with IndexingSink(JsonSink(str(tmpdir)), index) as sink:
+            crawl_json(links, sink, max_concurrency=2, acs_base=server.url)
+
+    rows = index.query()
+    assert sorted(r['link'] for r in rows) == links
+    assert all(os.path.exists(r['path']) for r in rows)
+    index.close()
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_rebuild_index(tmpdir, processes):
+    links = make_match_links(5)
+    _ledger(str(tmpdir.join(LEDGER_FILE)), links).close()
+
+    with JsonSink(str(tmpdir)) as sink:
+        for link in links[:2]:
+            sink.write(_record(link))
+    with JsonLinesSink(str(tmpdir), 'gzip', games_per_file=2) as sink:
+        for link in links[2:]:
+            sink.write(_record(link))
+
+    assert rebuild_index(str(tmpdir), processes=processes) == 5
+
+    index = MatchIndex(str(tmpdir.join(INDEX_FILE)))
+    rows = index.query()
+    assert [r['link'] for r in rows] == links
+    assert [r['region'] for r in rows] == ['lck'] * 2 + ['na'] * 3
+    assert rows[4]['path'].endswith('.jsonl.gz')
+
+    assert rebuild_index(str(tmpdir), processes=processes) == 5
+    assert len(index) == 5
+    index.close()
+
+
+def test_live_and_rebuilt_index_agree(tmpdir):
+    links = make_match_links(4, realm='ESPORTSTMNT01', first_id=690260)
+    ledger = _ledger(str(tmpdir.join(LEDGER_FILE)), links)
+    index = MatchIndex(str(tmpdir.join(INDEX_FILE)), ledger)
+
+    with StubServer() as server:
+        with IndexingSink(JsonSink(str(tmpdir)), index) as sink:
+            crawl_json(links, sink, acs_base=server.url)
+    ledger.close()
+
+    rebuilt = MatchIndex(str(tmpdir.join('rebuilt.sqlite')))
+    assert rebuild_index(str(tmpdir), rebuilt.path, processes=1) == 4
+
+    columns = ('key', 'link', 'game_hash', 'schedule_link', 'region', 'week', 'path')
+    live_rows = [tuple(r[c] for c in columns) for r in index.query()]
+    assert live_rows == [tuple(r[c] for c in columns) for r in rebuilt.query()]
+    assert [r[0] for r in live_rows] == [f'ESPORTSTMNT01_{690260 + i}' for i in range(4)]
+    assert [r[3] for r in live_rows] == [SCHEDULE_LINK] * 2 + [PLAYOFF_LINK] * 2
+    index.close()
+    rebuilt.close()
+
+
+def test_schedule_link_of_games_found_by_a_crawl(tmpdir):
+    links = make_match_links(3)
+    ledger = JobLedger(str(tmpdir.join(LEDGER_FILE)))
+    pages = {SCHEDULE_LINK: ['match-page-1'], PLAYOFF_LINK: ['match-page-2'], 'match-page-1': links[:1],
+             'match-page-2': links[1:]}
+    crawl_schedule_pages([SCHEDULE_LINK, PLAYOFF_LINK], pages.get, pages.get, ledger)
+
+    index = MatchIndex(str(tmpdir.join(INDEX_FILE)), ledger)
+    assert [index.schedule_link(link) for link in links] == [SCHEDULE_LINK, PLAYOFF_LINK, PLAYOFF_LINK]
+    assert index.schedule_link('https://x.com/unknown') is None
+    index.close()
+    ledger.close()
+
+
+def test_lines_across_chunks():
+    data = io.BytesIO(b'{"a": 1}\n{"b": 2}\n\n{"c": 3}')
+    assert list(_lines(data, chunk_size=3)) == [b'{"a": 1}', b'{"b": 2}', b'', b'{"c": 3}']
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from Benchmarks.fixtures import make_game, make_timeline
+from RiotCrawler.gameRecord import GameRecord
+from RiotCrawler.matchModel import Game, frame_arrays, participant_arrays
+
+
+def _record(game_id, minutes=3):
+    return GameRecord(f'TRLH1_{game_id}', json.dumps(make_game(game_id)).encode(),
+                      json.dumps(make_timeline(game_id, minutes=minutes, events_per_frame=2)).encode())
+
+
+def test_game_from_record():
+    game = Game.from_record(_record(1002440062))
+    raw = make_game(1002440062)
+
+    assert game.key == 'TRLH1_1002440062'
+    assert [t.team_id for t in game.teams] == [100, 200]
+    assert len(game.teams[0].bans) == 5
+    assert game.participants[0].kills == raw['participants'][0]['stats']['kills']
+    assert game.participants[0].summoner_name.endswith('Player1')
+    assert len(game.frames) == 4
+    assert [p.participant_id for p in game.frames[1].participants] == list(range(1, 11))
+    assert all(e.data['itemId'] > 1000 for f in game.frames for e in f.events if e.type == 'ITEM_PURCHASED')
+
+    with pytest.raises(AttributeError):
+        game.extra = 1
+
+
+def test_game_without_frames_skips_timeline():
+    record = _record(1002440062)
+    assert Game.from_record(record, frames=False).frames == ()
+    assert not record.is_decoded('timeline')
+
+
+def test_frame_arrays_pad_shorter_games():
+    np = pytest.importorskip('numpy')
+    timeline = make_timeline(1002440001, minutes=3, events_per_frame=2)
+
+    arrays = frame_arrays([_record(1002440000, minutes=5), _record(1002440001, minutes=3)], ('total_gold', 'xp'))
+
+    assert arrays['total_gold'].shape == (2, 6, 10)
+    assert arrays['xp'][1, 3, 9] == timeline['frames'][3]['participantFrames']['10']['xp']
+    assert np.isnan(arrays['total_gold'][1, 4:]).all()
+    assert frame_arrays([_record(1002440000, minutes=5)], minutes=2)['minions_killed'].shape == (1, 3, 10)
+
+    with pytest.raises(ValueError):
+        frame_arrays([], ('gold',))
+
+
+def test_frame_arrays_read_frames_without_building_games(monkeypatch):
+    np = pytest.importorskip('numpy')
+    fields = ('total_gold', 'level', 'x', 'y')
+    records = [_record(1002440000, minutes=4), _record(1002440001, minutes=2)]
+    games = [Game.from_record(r) for r in records]
+
+    def _no_game(*args, **kwargs):
+        raise AssertionError('frame_arrays built a Game')
+
+    monkeypatch.setattr(Game, 'from_record', _no_game)
+    arrays = frame_arrays(records, fields)
+
+    for field, values in frame_arrays(games, fields).items():
+        assert np.array_equal(arrays[field], values, equal_nan=True)
+
+
+def test_participant_arrays():
+    pytest.importorskip('numpy')
+    raw = make_game(1002440062)
+
+    arrays = participant_arrays([_record(1002440062), raw], ('kills', 'deaths'))
+
+    assert arrays['kills'].shape == (2, 10)
+    assert list(arrays['deaths'][1]) == [p['stats']['deaths'] for p in raw['participants']]
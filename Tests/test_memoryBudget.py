@@ -0,0 +1,60 @@
+import os
+import sys
+
+import pytest
+
+from RiotCrawler.memoryBudget import (DEFAULT_MEMORY_SETTINGS, LinkSpool, MemoryBudget, parse_memory_settings,
+                                      process_rss, tree_rss)
+
+linux = pytest.mark.skipif(not sys.platform.startswith('linux'), reason='reads /proc')
+
+
+def test_default_settings():
+    assert parse_memory_settings({'extra': {}}) == DEFAULT_MEMORY_SETTINGS
+
+
+def test_config_settings():
+    settings = parse_memory_settings({'extra': {'low_memory': 'true', 'rss_budget': '2048', 'pages_per_worker': '50',
+                                                'spill_dir': './spill', 'seen_capacity': '5000'}})
+    assert settings == {'low_memory': True, 'rss_budget': 2048, 'pages_per_worker': 50, 'spill_dir': './spill',
+                        'seen_capacity': 5000}
+
+
+@pytest.mark.parametrize('value', ['lots', '-1'])
+def test_config_settings_error(value):
+    with pytest.raises(ValueError):
+        parse_memory_settings({'extra': {'rss_budget': value}})
+
+
+@linux
+def test_rss():
+    assert process_rss() > 0
+    assert tree_rss() >= process_rss()
+    assert process_rss(2 ** 30) is None
+
+
+def test_budget_error():
+    with pytest.raises(ValueError):
+        MemoryBudget(0)
+
+
+@linux
+def test_budget():
+    assert MemoryBudget(2 ** 20).processes(4) == 4
+    assert MemoryBudget(2 ** 20, interval=0).processes(4, tabs=2 ** 20) == 1
+    assert not MemoryBudget(2 ** 20).over()
+    assert MemoryBudget(1).over()
+
+
+def test_link_spool(tmpdir):
+    folder = str(tmpdir.join('spill'))
+    with LinkSpool(folder) as spool:
+        spool.extend(['a', 'b'])
+        assert list(spool) == ['a', 'b']
+        spool.append('c')
+        assert list(spool) == ['a', 'b', 'c']
+        assert len(spool) == 3
+        path = spool.path
+
+    assert not os.path.exists(path)
+    spool.close()
@@ -0,0 +1,64 @@
+import pytest
+
+from RiotCrawler.jobLedger import GAME, MATCH, SCHEDULE
+from RiotCrawler.multiCrawl import MultiCrawl, format_progress, make_jobs
+
+CONFIG = """[DEFAULT_INIT]
+region = {region}
+split = spring
+week = {week}
+
+[OTHERS]
+year = 2017
+"""
+
+
+@pytest.fixture
+def configs(tmpdir):
+    paths = list()
+    for name, region, week in (('lck', 'lck', '1'), ('all', 'all', '1')):
+        path = tmpdir.join(f'{name}.ini')
+        path.write(CONFIG.format(region=region, week=week))
+        paths.append(str(path))
+    return paths
+
+
+def test_make_jobs_over_years(configs):
+    jobs = make_jobs(configs[:1], years=range(2015, 2018))
+
+    assert [j.name for j in jobs] == ['lck 2015', 'lck 2016', 'lck 2017']
+    assert jobs[0].schedule_links == ['https://www.lolesports.com/en_US/lck/lck_2015_spring/schedule/regular_season/1']
+
+
+def test_links_are_merged_once(configs, tmpdir):
+    with MultiCrawl(configs, ledger=str(tmpdir.join('ledger.sqlite'))) as mc:
+        links = mc.make_links(inplace=False, verify=False)
+
+        assert len(links) == 4
+        assert len(set(links)) == 4
+        assert links[0] == mc.jobs[0].schedule_links[0]
+        assert len(mc.ledger.keys(SCHEDULE)) == 4
+
+
+def test_progress(configs, tmpdir):
+    with MultiCrawl(configs, ledger=str(tmpdir.join('ledger.sqlite'))) as mc:
+        lck = mc.jobs[0].schedule_links[0]
+        na = mc.jobs[1].schedule_links[0]
+        mc.ledger.complete(SCHEDULE, lck, ['match_1'])
+        mc.ledger.complete(SCHEDULE, na, ['match_2'])
+        mc.ledger.complete(MATCH, 'match_1', ['game_1', 'game_2'])
+        mc.ledger.complete(MATCH, 'match_2', ['game_3'])
+        mc.ledger.complete(GAME, 'game_1')
+        mc.ledger.complete(GAME, 'game_3')
+
+        progress = mc.progress()
+
+    assert progress['lck'] == {'schedule_pages': 1, 'schedule_done': 1, 'games_found': 2, 'games_done': 1}
+    assert progress['all'] == {'schedule_pages': 4, 'schedule_done': 2, 'games_found': 3, 'games_done': 2}
+    assert progress['total'] == progress['all']
+    assert format_progress(progress).splitlines()[0] == 'lck    schedule 1/1  games 1/2'
+
+
+def test_requires_configs():
+    with pytest.raises(ValueError):
+        MultiCrawl([])
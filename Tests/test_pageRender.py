@@ -0,0 +1,29 @@
+from RiotCrawler.pageRender import RenderTiming, _READY_SCRIPT, href_selector, ready_script, summarize_timings
+
+
+def test_href_selector():
+    assert href_selector('/matches/') == 'a[href*="/matches/"]'
+
+
+def test_ready_script_format():
+    script = _READY_SCRIPT % ('".stats-link"', 5000)
+    assert 'const selector = ".stats-link";' in script
+    assert '}, Math.max(0, 5000 - performance.now()));' in script
+
+
+def test_ready_script_counts_from_navigation():
+    assert 'Math.max(0, 2500 - performance.now())' in ready_script('.stats-link', 2.5)
+
+
+def test_summarize_empty():
+    assert summarize_timings([])['pages'] == 0
+
+
+def test_summarize_timings():
+    timings = [RenderTiming(f'page{i}', float(i), i % 2 == 0) for i in range(1, 21)]
+    res = summarize_timings(timings)
+    assert res['pages'] == 20
+    assert res['ready'] == 10
+    assert res['p50'] == 10.0
+    assert res['p95'] == 19.0
+    assert res['max'] == 20.0
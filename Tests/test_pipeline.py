@@ -0,0 +1,87 @@
+import threading
+from functools import partial
+
+import pytest
+
+from Benchmarks.fixtures import make_match_links
+from Benchmarks.stub_server import StubServer
+from RiotCrawler.crawlJSON import fetch_game
+from RiotCrawler.crawlSession import create_session
+from RiotCrawler.matchCrawler import crawl_schedule_pages
+from RiotCrawler.pipeline import stream_pipeline
+
+
+def test_fetchers_error():
+    with pytest.raises(ValueError):
+        list(stream_pipeline(lambda on_found: None, lambda link: link, fetchers=0))
+
+
+def test_streams_every_link_once():
+    def discover(on_found):
+        on_found(['a', 'b'])
+        on_found(['b', 'c'])
+
+    assert sorted(stream_pipeline(discover, str.upper, fetchers=2)) == ['A', 'B', 'C']
+
+
+def test_none_is_not_yielded():
+    assert list(stream_pipeline(lambda on_found: on_found(['a', 'b']), lambda link: None)) == []
+
+
+def test_fetch_starts_before_discovery_ends():
+    fetched = threading.Event()
+
+    def discover(on_found):
+        on_found(['a'])
+        assert fetched.wait(5)
+        on_found(['b'])
+
+    def fetch(link):
+        fetched.set()
+        return link
+
+    assert sorted(stream_pipeline(discover, fetch)) == ['a', 'b']
+
+
+@pytest.mark.parametrize('fail', ['discover', 'fetch'])
+def test_errors_are_raised(fail):
+    def discover(on_found):
+        on_found(['a'])
+        if fail == 'discover':
+            raise KeyError('page')
+
+    def fetch(link):
+        if fail == 'fetch':
+            raise KeyError('game')
+        return link
+
+    with pytest.raises(KeyError):
+        list(stream_pipeline(discover, fetch))
+
+
+def test_close_stops_discovery():
+    found = list()
+
+    def discover(on_found):
+        for i in range(10000):
+            found.append(i)
+            on_found([str(i)])
+
+    stream = stream_pipeline(discover, lambda link: link, fetchers=2, queue_size=4)
+    next(stream)
+    stream.close()
+    assert len(found) < 10000
+
+
+def test_streams_crawled_pages_to_stub_server():
+    links = make_match_links(6)
+    pages = {'schedule': ['m1', 'm2'], 'm1': links[:3], 'm2': links[3:]}
+
+    with StubServer() as server:
+        session = create_session()
+        discover = partial(crawl_schedule_pages, ['schedule'], pages.get, pages.get)
+        games = list(stream_pipeline(lambda on_found: discover(on_found=on_found),
+                                     partial(fetch_game, session, acs_base=server.url), fetchers=3))
+        session.close()
+
+    assert sorted(g['gameId'] for g in games) == [1002440000 + i for i in range(6)]
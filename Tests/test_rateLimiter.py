@@ -0,0 +1,80 @@
+import time
+
+import pytest
+
+from Benchmarks.fixtures import make_match_links
+from Benchmarks.stub_server import StubServer
+from RiotCrawler.crawlJSON import crawl_json_async
+from RiotCrawler.crawlSession import create_session
+from RiotCrawler.rateLimiter import HostLimiter, RateLimiter, parse_retry_after
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('3') == 3.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0
+
+
+def test_limiter_errors():
+    with pytest.raises(ValueError):
+        RateLimiter(rate=-1)
+
+    with pytest.raises(ValueError):
+        RateLimiter(max_concurrency=0)
+
+
+def test_hosts_are_separate():
+    limiter = RateLimiter()
+    assert limiter.host('https://acs.leagueoflegends.com/a') is limiter.host('https://acs.leagueoflegends.com/b')
+    assert limiter.host('https://acs.leagueoflegends.com/') is not limiter.host('https://lolesports.com/')
+
+
+def test_token_bucket_paces_requests():
+    host = HostLimiter(rate=20.0, max_concurrency=100)
+    host._tokens = 1.0
+    start = time.monotonic()
+
+    for _ in range(5):
+        host.acquire()
+        host.release(200)
+
+    assert time.monotonic() - start >= 0.15
+
+
+def test_throttle_decreases_and_success_increases():
+    host = HostLimiter(rate=10.0, max_concurrency=8)
+    host.acquire()
+    host.release(429)
+    assert host.concurrency == 4
+    assert host.rate == 5.0
+    assert host.throttled == 1
+
+    for _ in range(4):
+        host.acquire()
+        host.release(200)
+    assert host.concurrency == 5
+    assert host.rate == 6.0
+
+
+def test_retry_after_pauses_host():
+    host = HostLimiter(rate=0.0, max_concurrency=4)
+    host.acquire()
+    host.release(429, 0.2)
+    start = time.monotonic()
+    host.acquire()
+    assert time.monotonic() - start >= 0.15
+
+
+def test_crawl_adapts_to_throttling():
+    links = make_match_links(12)
+
+    with StubServer(latency=0.02, max_in_flight=4, retry_after=0) as server:
+        session = create_session(backoff=0.01, host_concurrency=16)
+        res = crawl_json_async(links, max_concurrency=8, acs_base=server.url, session=session)
+        summary = session.rate_limiter.summary()
+        session.close()
+
+    assert [r['gameId'] for r in res] == [1002440000 + i for i in range(12)]
+    assert server.throttled > 0
+    assert list(summary.values())[0]['throttled'] == server.throttled
@@ -0,0 +1,89 @@
+import pytest
+
+from Benchmarks.stub_server import StubServer
+from RiotCrawler.crawlSession import create_session
+from RiotCrawler.responseCache import ResponseCache, finished_matches_policy
+
+GAME = 'https://acs.leagueoflegends.com/v1/stats/game/TRLH1/1002440062?gameHash=a3b08c115923f00d'
+
+
+@pytest.fixture
+def cache(tmpdir):
+    c = ResponseCache(str(tmpdir.join('cache.sqlite')), max_bytes=100)
+    yield c
+    c.close()
+
+
+def test_policy_game_json():
+    assert finished_matches_policy(GAME)
+    assert finished_matches_policy(GAME.replace('?', '/timeline?'))
+
+
+def test_policy_schedule():
+    assert finished_matches_policy('https://www.lolesports.com/en_US/na-lcs/na_2017_spring/schedule/regular_season/1')
+    assert not finished_matches_policy('https://www.lolesports.com/en_US/na-lcs/na_9999_spring/schedule/')
+
+
+def test_put_get(cache):
+    cache.put(GAME, 200, {'ETag': '"abc"', 'Content-Encoding': 'gzip'}, b'{}')
+    entry = cache.get(GAME)
+    assert entry.body == b'{}'
+    assert entry.etag == '"abc"'
+    assert entry.immutable
+    assert 'Content-Encoding' not in entry.headers
+    assert cache.get(GAME, 'render') is None
+
+
+def test_lru_eviction(cache):
+    cache.put('a', 200, {}, b'a' * 40)
+    cache.put('b', 200, {}, b'b' * 40)
+    cache.get('a')
+    cache.put('c', 200, {}, b'c' * 40)
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+    assert cache.size() <= 100
+
+
+def test_running_total_follows_replaces(cache):
+    cache.put('a', 200, {}, b'a' * 40)
+    cache.put('a', 200, {}, b'a' * 10)
+    cache.put('b', 200, {}, b'b' * 60)
+    cache.put('c', 200, {}, b'c' * 50)
+    assert cache._total == cache.size() <= 100
+    assert cache.get('a') is None
+
+
+def test_immutable_entries_expire(tmpdir):
+    cache = ResponseCache(str(tmpdir.join('cache.sqlite')), immutable_ttl=0)
+    cache.put(GAME, 200, {}, b'{}')
+    entry = cache.get(GAME)
+    cache.close()
+
+    assert entry is not None
+    assert not entry.immutable
+
+
+def test_session_serves_finished_games(tmpdir):
+    with StubServer() as server:
+        session = create_session(cache=str(tmpdir.join('cache.sqlite')))
+        url = f'{server.url}v1/stats/game/TRLH1/1002440000?gameHash=1'
+        first = session.get(url).json()
+        second = session.get(url).json()
+        session.close()
+
+    assert first == second
+    assert server.requests == 1
+
+
+def test_session_revalidates(tmpdir):
+    with StubServer() as server:
+        session = create_session(cache=str(tmpdir.join('cache.sqlite')))
+        url = f'{server.url}v1/stats/game/TRLH1/1002440000'
+        first = session.get(url)
+        second = session.get(url)
+        session.close()
+
+    assert second.status_code == 200
+    assert second.from_cache
+    assert second.content == first.content
+    assert server.requests == 2
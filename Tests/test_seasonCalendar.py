@@ -0,0 +1,140 @@
+import json
+
+import pytest
+
+from Benchmarks.bench_crawl import write_config
+from Benchmarks.stub_server import StubServer
+from RiotCrawler.RiotCrawl import RiotCrawl
+from RiotCrawler.crawlSession import create_session
+from RiotCrawler.makeLinks import create_links, verify_setting
+from RiotCrawler.seasonCalendar import SeasonCalendar, parse_schedule_link, plan_weeks, round_name, verify_links, \
+    verify_plan
+
+LCK = 'https://www.lolesports.com/en_US/lck/lck_2017_spring/schedule/'
+NA = 'https://www.lolesports.com/en_US/na-lcs/na_2017_spring/schedule/'
+
+
+def _config(region='all', week='all', year='2017', lolesports=None):
+    extra = {'year': year}
+    if lolesports is not None:
+        extra['lolesports'] = lolesports
+    return {'default_init': {'region': region, 'split': 'spring', 'week': week}, 'extra': extra}
+
+
+def test_parse_schedule_link():
+    assert parse_schedule_link(f'{LCK}playoffs/Round%201') == ('lck', 2017, 'spring', 'playoffs', 'Round%201')
+    assert parse_schedule_link(NA) == ('na-lcs', 2017, 'spring', None, None)
+    assert parse_schedule_link('https://x.com/matches/1') is None
+
+
+@pytest.mark.parametrize('name', ['Round 1', 'round%201', 'ROUND%201'])
+def test_round_name(name):
+    assert round_name(name) == 'Round%201'
+
+
+def test_defaults():
+    calendar = SeasonCalendar()
+    assert calendar.season('lck', 2017, 'spring').weeks == tuple(range(1, 11))
+    assert calendar.season('na-lcs', 2017, 'spring').playoffs == ('Finals', 'Quarterfinals', 'Semifinals')
+    assert calendar.season('na-academy', 2017, 'spring') == ((), ())
+    assert calendar.season('na-lcs', 2019, 'spring') == ((), ())
+
+
+@pytest.mark.parametrize('week, count', [(3, 2), (range(1, 4), 6), ('playoffs', 3 + 7), ('Round 1', 1),
+                                         ('all', 9 + 10 + 3 + 7)])
+def test_plan_weeks(week, count):
+    planned = plan_weeks([NA, LCK], week, SeasonCalendar())
+    assert len(planned) == count
+    assert len(set(planned)) == count
+
+
+def test_plan_is_by_week_then_region():
+    planned = plan_weeks([NA, LCK], 'all', SeasonCalendar())
+    assert planned[:3] == [f'{NA}regular_season/1', f'{LCK}regular_season/1', f'{NA}regular_season/2']
+    assert planned[18:20] == [f'{LCK}regular_season/10', f'{LCK}playoffs/Wild%20Card']
+
+
+def test_no_pages_warns():
+    with pytest.warns(UserWarning):
+        assert create_links(_config(region='na', week='Round%201')) == ()
+
+
+def test_record_and_reload(tmpdir):
+    path = str(tmpdir.join('calendar.json'))
+    calendar = SeasonCalendar(path)
+    calendar.record(f'{LCK}regular_season/10', False)
+    calendar.record(f'{LCK}playoffs/Quarterfinals', False)
+    calendar.record(f'{LCK}regular_season/1', True)
+    calendar.save()
+
+    calendar = SeasonCalendar(path)
+    assert calendar.season('lck', 2017, 'spring').weeks == tuple(range(1, 10))
+    assert 'Quarterfinals' not in calendar.season('lck', 2017, 'spring').playoffs
+    assert calendar.is_checked(f'{LCK}regular_season/1')
+    assert not calendar.is_checked(f'{LCK}regular_season/2')
+    assert 'lck/2017/spring' in json.load(open(path))
+
+
+def test_missing_pages_of_a_current_season_are_not_recorded():
+    calendar = SeasonCalendar()
+    link = f'https://www.lolesports.com/en_US/lck/lck_{2100}_spring/schedule/regular_season/1'
+    calendar.record(link, False)
+    assert not calendar.is_checked(link)
+
+
+def test_verify_against_the_stub_server(tmpdir):
+    with StubServer(weeks=7) as server:
+        calendar = SeasonCalendar(str(tmpdir.join('calendar.json')))
+        session = create_session()
+        links = create_links(_config(region='lck', lolesports=server.lolesports), calendar, True, session)
+        checked = server.requests
+
+        assert [int(l.rsplit('/', 1)[1]) for l in links if 'regular_season' in l] == list(range(1, 8))
+        assert checked == 10 + 7
+
+        again = create_links(_config(region='lck', lolesports=server.lolesports),
+                             SeasonCalendar(str(tmpdir.join('calendar.json'))), True, session)
+        session.close()
+
+    assert again == links
+    assert server.requests == checked
+
+
+def test_create_links_makes_no_requests_without_verify():
+    with StubServer(weeks=7) as server:
+        planned = create_links(_config(region='lck', lolesports=server.lolesports), SeasonCalendar())
+        requests = server.requests
+
+    assert len([l for l in planned if 'regular_season' in l]) == 10
+    assert requests == 0
+
+
+def test_make_links_verifies_unless_turned_off(tmpdir):
+    with StubServer(weeks=7) as server:
+        config = write_config(str(tmpdir), server, region='lck', week='all')
+        with RiotCrawl(config) as rc:
+            links = rc.make_links(inplace=False)
+        checked = server.requests
+
+        with open(config, 'a') as f:
+            f.write('\n[CHECKS]\nverify = false\n')
+        with RiotCrawl(config) as rc:
+            unchecked = rc.make_links(inplace=False)
+
+    assert [int(l.rsplit('/', 1)[1]) for l in links if 'regular_season' in l] == list(range(1, 8))
+    assert checked == len(unchecked) > len(links)
+    assert server.requests == checked
+    assert not verify_setting({'extra': {'verify': 'False'}})
+    assert verify_setting({'extra': {}})
+
+
+def test_pages_that_can_not_be_checked_are_kept():
+    with StubServer(error_rate=1.0) as server:
+        links = (f'{server.lolesports}lck/lck_2017_spring/schedule/regular_season/1',)
+        session = create_session(retries=0)
+        found = verify_links(links, session)
+        planned = verify_plan(links, SeasonCalendar(), session)
+        session.close()
+
+    assert found == {links[0]: None}
+    assert planned == links
@@ -0,0 +1,143 @@
+import gzip
+import json
+import os
+
+import pytest
+
+from Benchmarks.fixtures import make_game, make_match_links, make_timeline
+from Benchmarks.stub_server import StubServer
+from RiotCrawler.crawlJSON import crawl_json
+from RiotCrawler.gameRecord import GameRecord
+from RiotCrawler.storageSinks import JsonLinesSink, JsonSink, ParquetSink, StorageSink, as_sink, flatten_game, \
+    open_sink
+
+
+def _game(game_id=1002440000):
+    return GameRecord(f'TRLH1_{game_id}', make_game(game_id), make_timeline(game_id, minutes=3, events_per_frame=2))
+
+
+def test_json_sink_is_compact_and_replaces(tmpdir):
+    sink = JsonSink(str(tmpdir))
+    sink.write(GameRecord('TRLH1_1', {'gameId': 1}, {}))
+    sink.write(GameRecord('TRLH1_1', b'{"gameId": 2}', b'{"frames": []}'))
+
+    assert os.listdir(str(tmpdir)) == ['game_TRLH1_1.json']
+    with open(os.path.join(str(tmpdir), 'game_TRLH1_1.json')) as f:
+        assert f.read() == '{"game":{"gameId": 2},"timeline":{"frames": []}}'
+
+
+def test_json_sink_indent(tmpdir):
+    JsonSink(str(tmpdir), indent=1).write(GameRecord('k', {'gameId': 1}, {}))
+    with open(os.path.join(str(tmpdir), 'game_k.json')) as f:
+        assert f.read() == '{\n "game": {\n  "gameId": 1\n },\n "timeline": {}\n}'
+
+
+def test_jsonl_sink_rotates_and_only_shows_complete_files(tmpdir):
+    sink = JsonLinesSink(str(tmpdir), 'gzip', games_per_file=2)
+    for i in range(3):
+        sink.write(GameRecord(str(i), {'gameId': i}, b'{\n}'))
+
+    assert [f for f in os.listdir(str(tmpdir)) if not f.startswith('.')] == [os.path.basename(sink.files[0])]
+    sink.close()
+
+    games = list()
+    for path in sink.files:
+        with gzip.open(path, 'rt') as f:
+            games.extend(json.loads(line)['game']['gameId'] for line in f)
+
+    assert len(sink.files) == 2
+    assert games == [0, 1, 2]
+    assert sorted(os.listdir(str(tmpdir))) == sorted(os.path.basename(p) for p in sink.files)
+
+
+def test_jsonl_sink_errors(tmpdir):
+    with pytest.raises(ValueError):
+        JsonLinesSink(str(tmpdir), 'bz2')
+
+
+def test_open_sink(tmpdir):
+    assert isinstance(open_sink(str(tmpdir)), JsonSink)
+    assert open_sink(str(tmpdir), 'jsonl.gz').compression == 'gzip'
+
+    with pytest.raises(ValueError):
+        open_sink(str(tmpdir), 'csv')
+
+
+def test_as_sink(tmpdir):
+    sink = JsonLinesSink(str(tmpdir))
+    assert as_sink(sink) == (sink, False)
+    assert isinstance(as_sink(str(tmpdir))[0], JsonSink)
+
+
+def test_sink_must_write():
+    class Sink(StorageSink):
+        pass
+
+    with pytest.raises(TypeError):
+        Sink()
+
+
+def test_flatten_game():
+    tables = flatten_game(_game())
+
+    assert len(tables['games']) == 1
+    assert tables['games'][0]['gameId'] == 1002440000
+    assert 'frames' not in tables['games'][0]
+    assert len(tables['teams']) == 2
+    assert len(tables['participants']) == 10
+    assert tables['participants'][0]['stats_kills'] >= 0
+    assert tables['participants'][0]['player_summonerName'].endswith('Player1')
+    assert len(tables['frames']) == 40
+    assert 'position_x' in tables['frames'][0]
+    assert len(tables['events']) == 6
+    assert all(row['gameId'] == 1002440000 for rows in tables.values() for row in rows)
+
+
+def test_parquet_sink(tmpdir):
+    pq = pytest.importorskip('pyarrow.parquet')
+
+    with ParquetSink(str(tmpdir), games_per_file=2) as sink:
+        for i in range(3):
+            sink.write(_game(1002440000 + i))
+
+    table = pq.read_table(os.path.join(str(tmpdir), 'participants'))
+    assert table.num_rows == 30
+
+
+def test_parquet_sink_keeps_keys_of_every_event_type(tmpdir):
+    pq = pytest.importorskip('pyarrow.parquet')
+
+    timeline = {'frames': [{'timestamp': 0, 'participantFrames': {}, 'events': [
+        {'type': 'ITEM_PURCHASED', 'timestamp': 10, 'participantId': 1, 'itemId': 1055},
+        {'type': 'CHAMPION_KILL', 'timestamp': 20, 'killerId': 2, 'victimId': 7, 'position': {'x': 1, 'y': 2},
+         'assistingParticipantIds': [3, 4]}]}]}
+    later = {'frames': [{'timestamp': 0, 'participantFrames': {}, 'events': [
+        {'type': 'WARD_PLACED', 'timestamp': 30, 'creatorId': 5, 'wardType': 'CONTROL_WARD'}]}]}
+
+    with ParquetSink(str(tmpdir), games_per_file=1) as sink:
+        sink.write(GameRecord('TRLH1_1', make_game(1), timeline))
+        sink.write(GameRecord('TRLH1_2', make_game(2), later))
+
+    first, second = sorted(os.listdir(os.path.join(str(tmpdir), 'events')))
+    events = pq.read_table(os.path.join(str(tmpdir), 'events', first)).to_pylist()
+    assert [e['itemId'] for e in events] == [1055, None]
+    assert [e['victimId'] for e in events] == [None, 7]
+    assert events[1]['position_x'] == 1 and json.loads(events[1]['assistingParticipantIds']) == [3, 4]
+
+    events = pq.read_table(os.path.join(str(tmpdir), 'events', second)).to_pylist()
+    assert events[0]['creatorId'] == 5 and events[0]['wardType'] == 'CONTROL_WARD'
+    assert events[0]['killerId'] is None and events[0]['itemId'] is None
+
+
+def test_crawl_json_to_sink(tmpdir):
+    links = make_match_links(5)
+
+    with StubServer() as server:
+        with JsonLinesSink(str(tmpdir)) as sink:
+            crawl_json(links, sink, max_concurrency=2, acs_base=server.url)
+
+    with open(sink.files[0]) as f:
+        games = [json.loads(line) for line in f]
+
+    assert sorted(g['game']['gameId'] for g in games) == [1002440000 + i for i in range(5)]
+    assert all('frames' in g['timeline'] for g in games)
@@ -0,0 +1,153 @@
+import threading
+import time
+
+import pytest
+
+from RiotCrawler.jobLedger import DONE, FAILED, GAME, MATCH, PENDING, SCHEDULE
+from RiotCrawler.workQueue import LEASED, WorkQueue, run_worker
+
+PAGES = {
+    'schedule_1': ['match_1', 'match_2'],
+    'schedule_2': ['match_2', 'match_3'],
+    'match_1': ['game_1', 'game_2'],
+    'match_2': ['game_2', 'game_3'],
+    'match_3': ['game_4'],
+}
+
+
+@pytest.fixture
+def queue(tmpdir):
+    q = WorkQueue(str(tmpdir.join('queue.sqlite')))
+    yield q
+    q.close()
+
+
+def test_max_attempts_error(tmpdir):
+    with pytest.raises(ValueError):
+        WorkQueue(str(tmpdir.join('queue.sqlite')), max_attempts=0)
+
+
+def test_put_skips_queued_tasks(queue):
+    assert queue.put(SCHEDULE, ['a', 'b']) == 2
+    assert queue.put(SCHEDULE, ['b', 'c']) == 1
+    assert queue.keys(SCHEDULE) == ['a', 'b', 'c']
+
+
+def test_lease_hands_out_downstream_first(queue):
+    queue.put(SCHEDULE, ['s'])
+    queue.put(GAME, ['g'])
+    queue.put(MATCH, ['m'])
+
+    assert queue.lease('w1', limit=2) == [(GAME, 'g'), (MATCH, 'm')]
+    assert queue.lease('w2', limit=2) == [(SCHEDULE, 's')]
+    assert queue.lease('w3') == []
+
+
+def test_complete_queues_next_stage(queue):
+    queue.put(SCHEDULE, ['s'])
+    queue.lease('w1')
+
+    assert queue.complete('w1', SCHEDULE, 's', ['m1', 'm2'])
+    assert queue.keys(SCHEDULE, DONE) == ['s']
+    assert queue.keys(MATCH, PENDING) == ['m1', 'm2']
+
+
+def test_expired_lease_is_handed_out_again(queue):
+    queue.put(SCHEDULE, ['s'])
+    assert queue.lease('w1', lease=0.01) == [(SCHEDULE, 's')]
+    time.sleep(0.05)
+
+    assert queue.lease('w2') == [(SCHEDULE, 's')]
+    assert not queue.complete('w1', SCHEDULE, 's', ['m'])
+    assert queue.complete('w2', SCHEDULE, 's', ['m'])
+    assert queue.keys(MATCH) == ['m']
+
+
+def test_fail_retries_until_max_attempts(tmpdir):
+    with WorkQueue(str(tmpdir.join('queue.sqlite')), max_attempts=2) as queue:
+        queue.put(GAME, ['g'])
+
+        queue.lease('w1')
+        assert queue.fail('w1', GAME, 'g', KeyError('g'))
+        assert queue.keys(GAME, PENDING) == ['g']
+
+        queue.lease('w1')
+        queue.fail('w1', GAME, 'g', KeyError('g'))
+        assert queue.keys(GAME, FAILED) == ['g']
+        assert queue.errors() == {'g': "KeyError: 'g'"}
+        assert queue.is_finished()
+
+        assert queue.retry_failed() == 1
+        assert queue.lease('w1') == [(GAME, 'g')]
+
+
+def test_expired_last_attempt_fails(tmpdir):
+    with WorkQueue(str(tmpdir.join('queue.sqlite')), max_attempts=1) as queue:
+        queue.put(GAME, ['g'])
+        queue.lease('w1', lease=0.01)
+        time.sleep(0.05)
+
+        assert queue.lease('w2') == []
+        assert queue.summary() == {GAME: {FAILED: 1}}
+
+
+def test_renew(queue):
+    queue.put(GAME, ['g'])
+    queue.lease('w1', lease=0.01)
+    assert queue.renew('w1', GAME, 'g', lease=60)
+    assert not queue.renew('w2', GAME, 'g')
+    time.sleep(0.05)
+    assert queue.lease('w2') == []
+    assert queue.summary() == {GAME: {LEASED: 1}}
+
+
+def test_run_worker_requires_handlers(queue):
+    with pytest.raises(ValueError):
+        run_worker(queue, {})
+
+
+def test_workers_share_the_queue(tmpdir):
+    path = str(tmpdir.join('queue.sqlite'))
+    fetched = list()
+    lock = threading.Lock()
+
+    def fetch(link):
+        if link == 'game_3' and 'game_3' not in fetched:
+            with lock:
+                fetched.append(link)
+            raise ConnectionError(link)
+        with lock:
+            fetched.append(link)
+        return []
+
+    handlers = {SCHEDULE: PAGES.get, MATCH: PAGES.get, GAME: fetch}
+    with WorkQueue(path) as queue:
+        queue.put(SCHEDULE, ['schedule_1', 'schedule_2'])
+
+    counts = list()
+
+    def work(name):
+        with WorkQueue(path) as q:
+            counts.append(run_worker(q, handlers, name, batch=2, poll=0.01))
+
+    threads = [threading.Thread(target=work, args=(f'w{i}',)) for i in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+
+    with WorkQueue(path) as queue:
+        assert queue.is_finished()
+        assert sorted(queue.keys(GAME, DONE)) == ['game_1', 'game_2', 'game_3', 'game_4']
+
+    assert sorted(fetched) == ['game_1', 'game_2', 'game_3', 'game_3', 'game_4']
+    assert sum(c['done'] for c in counts) == 9
+    assert sum(c['failed'] for c in counts) == 1
+
+
+def test_stop_ends_worker(queue):
+    queue.put(GAME, ['g'])
+    stop = threading.Event()
+    stop.set()
+    assert run_worker(queue, {GAME: lambda link: []}, stop=stop) == {'done': 0, 'failed': 0}
+    assert queue.keys(GAME, PENDING) == ['g']